@@ -0,0 +1,220 @@
+# area_parallel.py
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from grid_map import EMPTY, GridMap
+from map_cache import NO_AREA
+from path_search import bfs_search
+from render_backend import HEADLESS_ENV
+
+# 공유 메모리에 올리는 레이어 (이름 -> 자료형)
+SHARED_LAYERS = {'passable': 'uint8', 'category': 'uint8', 'area': 'int16'}
+
+
+class SharedGrid:
+    """컴파일된 지도의 레이어를 공유 메모리 하나에 올려 두는 객체
+
+    작업 프로세스에는 DataFrame 대신 spec(이름, 모양, 오프셋)만 넘기고,
+    각 프로세스는 같은 메모리를 복사 없이 붙여서(attach) 읽는다.
+    """
+
+    def __init__(self, compiled):
+        shape = (compiled.height, compiled.width)
+        cells = shape[0] * shape[1]
+        offsets = {}
+        total = 0
+        for name, dtype in SHARED_LAYERS.items():
+            offsets[name] = total
+            total += cells * np.dtype(dtype).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+        for name, dtype in SHARED_LAYERS.items():
+            view = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offsets[name])
+            view[:] = getattr(compiled, name)
+        self.spec = {
+            'name': self.shm.name,
+            'shape': shape,
+            'offsets': offsets,
+            'min_x': compiled.min_x,
+            'min_y': compiled.min_y,
+            'struct_names': dict(compiled.categories),
+        }
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared(spec):
+    """spec 으로 공유 메모리를 붙여 (SharedMemory, 레이어 dict) 를 돌려주는 함수"""
+    # 작업 프로세스는 만든 프로세스와 같은 resource tracker 를 쓰므로
+    # 정리(unlink)는 SharedGrid 를 만든 쪽에서 한 번만 한다
+    shm = shared_memory.SharedMemory(name=spec['name'])
+    layers = {name: np.ndarray(spec['shape'], dtype=dtype, buffer=shm.buf,
+                               offset=spec['offsets'][name])
+              for name, dtype in SHARED_LAYERS.items()}
+    return shm, layers
+
+
+def area_boxes(area_layer):
+    """area 마다 해당 칸들을 감싸는 (행 시작, 행 끝, 열 시작, 열 끝) 범위를 한 번에 구하는 함수"""
+    rows, cols = np.nonzero(area_layer != NO_AREA)
+    if len(rows) == 0:
+        return {}
+    areas = area_layer[rows, cols]
+    order = np.argsort(areas, kind='stable')
+    areas, rows, cols = areas[order], rows[order], cols[order]
+    starts = np.flatnonzero(np.r_[True, areas[1:] != areas[:-1]])
+    row_min = np.minimum.reduceat(rows, starts)
+    row_max = np.maximum.reduceat(rows, starts)
+    col_min = np.minimum.reduceat(cols, starts)
+    col_max = np.maximum.reduceat(cols, starts)
+    return {int(areas[s]): (int(r0), int(r1), int(c0), int(c1))
+            for s, r0, r1, c0, c1 in zip(starts, row_min, row_max, col_min, col_max)}
+
+
+def area_grid(spec, layers, area, box):
+    """한 area 만 남긴 독립 격자를 만드는 함수 (다른 area 칸은 이동 불가)"""
+    r0, r1, c0, c1 = box
+    inside = layers['area'][r0:r1 + 1, c0:c1 + 1] == area
+    passable = (layers['passable'][r0:r1 + 1, c0:c1 + 1] & inside).astype(np.uint8)
+    category = np.where(inside, layers['category'][r0:r1 + 1, c0:c1 + 1], EMPTY).astype(np.uint8)
+    return GridMap(spec['min_x'] + c0, spec['min_y'] + r0, passable, category,
+                   spec['struct_names']), inside
+
+
+def process_area(spec, area, box, render=False, output_dir='renders', dpi=150):
+    """area 하나에 대해 분석, 경로 탐색, (선택) 렌더링을 수행하는 함수"""
+    started = time.perf_counter()
+    shm, layers = attach_shared(spec)
+    try:
+        grid, inside = area_grid(spec, layers, area, box)
+    finally:
+        del layers
+        shm.close()
+
+    codes = {name: code for code, name in grid.struct_names.items()}
+    construction = inside & (grid.passable == 0)
+    counts = {}
+    for code, name in grid.struct_names.items():
+        count = int(np.count_nonzero((grid.struct_code == code) & inside))
+        if count:
+            counts[name] = count
+
+    def cells_of(name):
+        if name not in codes:
+            return []
+        rows, cols = np.nonzero(grid.struct_code == codes[name])
+        return [(int(c) + grid.min_x, int(r) + grid.min_y) for r, c in zip(rows, cols)]
+
+    homes = cells_of('MyHome')
+    shops = cells_of('BandalgomCoffee')
+    routes = []
+    if shops:
+        for home in homes:
+            path, _ = bfs_search(grid, home, shops)
+            routes.append({'home': home,
+                           'distance': len(path) - 1 if path else None,
+                           'shop': path[-1] if path else None})
+
+    image = None
+    if render:
+        from map_draw import draw_map_fast
+        # 다른 area 칸은 건설현장으로 그리지 않도록 이동 가능으로 둔 격자로 그린다
+        view = GridMap(grid.min_x, grid.min_y, (grid.passable | ~inside).astype(np.uint8),
+                       grid.struct_code, grid.struct_names)
+        image = draw_map_fast(view, os.path.join(output_dir, f"map_area_{area}.png"),
+                              f"Bandalgom Coffee Map - Area {area}", show=False, dpi=dpi)
+
+    return {
+        'area': area,
+        'cells': int(np.count_nonzero(inside)),
+        'construction': int(np.count_nonzero(construction)),
+        'structures': counts,
+        'routes': routes,
+        'image': image,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def _init_worker():
+    # 작업 프로세스에서는 화면 없는 백엔드로 그린다
+    os.environ[HEADLESS_ENV] = '1'
+
+
+def run_areas(context=None, workers=None, render=False, output_dir='renders', dpi=150):
+    """모든 area 를 프로세스 풀에서 독립적으로 처리하고 결과를 area 순서로 모으는 함수
+
+    workers=1 이면 현재 프로세스에서 차례로 처리한다.
+    """
+    from map_context import MapContext
+    if context is None:
+        context = MapContext()
+    compiled = context.compiled
+    boxes = area_boxes(np.asarray(compiled.area))
+    if render:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with SharedGrid(compiled) as shared:
+        if workers == 1 or len(boxes) <= 1:
+            return [process_area(shared.spec, area, box, render, output_dir, dpi)
+                    for area, box in boxes.items()]
+        workers = min(workers or os.cpu_count() or 1, len(boxes))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(process_area, shared.spec, area, box, render, output_dir, dpi)
+                       for area, box in boxes.items()]
+            return [future.result() for future in futures]
+
+
+def print_summary(results):
+    """area 별 결과를 요약해서 출력하는 함수"""
+    for result in results:
+        structures = ', '.join(f"{name} {count}" for name, count in result['structures'].items())
+        print(f"area {result['area']}: 칸 {result['cells']}개, 건설현장 {result['construction']}개, "
+              f"구조물 [{structures or '없음'}]")
+        for route in result['routes']:
+            if route['distance'] is None:
+                print(f"  집 {route['home']} -> 도달 가능한 카페 없음")
+            else:
+                print(f"  집 {route['home']} -> 카페 {route['shop']}: {route['distance']} 단계")
+
+
+def main():
+    """area 별 병렬 처리를 실행하고 (선택) 순차 처리와의 속도를 비교하는 함수"""
+    parser = argparse.ArgumentParser(description='area 별 분석/경로 탐색/렌더링 병렬 처리')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='작업 프로세스 수')
+    parser.add_argument('--render', action='store_true', help='area 별 지도 이미지 저장')
+    parser.add_argument('--compare', action='store_true', help='순차 처리와 소요 시간 비교')
+    args = parser.parse_args()
+
+    try:
+        from map_context import MapContext
+        context = MapContext()
+        context.compiled
+
+        started = time.perf_counter()
+        results = run_areas(context, args.workers, args.render)
+        parallel = time.perf_counter() - started
+        print_summary(results)
+        print(f"\n{len(results)}개 area 병렬 처리: {parallel:.3f}초")
+
+        if args.compare:
+            started = time.perf_counter()
+            run_areas(context, 1, args.render)
+            serial = time.perf_counter() - started
+            print(f"순차 처리: {serial:.3f}초 (속도 향상 {serial / parallel:.2f}배)")
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+
+
+if __name__ == "__main__":
+    main()
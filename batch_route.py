@@ -0,0 +1,151 @@
+# batch_route.py
+
+import argparse
+import csv
+import time
+from distance_field import load_or_build
+from map_context import MapContext
+from poi_index import as_poi_index
+
+# 결과 파일 컬럼 (path 는 with_path=True 일 때만 채운다)
+RESULT_COLUMNS = ['x', 'y', 'distance', 'shop_x', 'shop_y', 'path']
+# Parquet 로 쓸 때 한 번에 모아서 쓰는 행 수
+PARQUET_CHUNK_ROWS = 65536
+
+
+def struct_cells(merged_data, struct_name):
+    """병합 데이터(또는 PoiIndex)에서 특정 구조물이 있는 칸 좌표 목록을 뽑는 함수"""
+    return as_poi_index(merged_data).positions(struct_name)
+
+
+def read_starts(filename):
+    """x, y 컬럼이 있는 CSV 에서 출발 칸을 한 줄씩 읽는 함수 (파일 전체를 올리지 않음)"""
+    with open(filename, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        x_index, y_index = header.index('x'), header.index('y')
+        for row in reader:
+            if row:
+                yield int(row[x_index]), int(row[y_index])
+
+
+def format_path(path):
+    """경로를 'x:y x:y ...' 형식의 문자열로 바꾸는 함수"""
+    return ' '.join(f"{x}:{y}" for x, y in path)
+
+
+def route_many(starts, field, with_path=False):
+    """여러 출발 칸에 대해 가장 가까운 카페까지의 거리와 카페 위치를 차례로 돌려주는 함수
+
+    모든 출발 칸이 같은 거리 지도(카페에서 시작한 한 번의 BFS)를 공유하므로
+    질의 하나는 표 조회로 끝난다. 도달할 수 없으면 거리와 카페는 None 이다.
+    """
+    for x, y in starts:
+        distance = field.distance(x, y)
+        shop = field.nearest_source(x, y) if distance is not None else None
+        row = {
+            'x': x,
+            'y': y,
+            'distance': distance,
+            'shop_x': shop[0] if shop else None,
+            'shop_y': shop[1] if shop else None,
+            'path': None,
+        }
+        if with_path and distance is not None:
+            row['path'] = format_path(field.route(x, y))
+        yield row
+
+
+def _write_csv(rows, filename):
+    count = 0
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_parquet(rows, filename):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet 로 저장하려면 pyarrow 가 필요합니다: pip install pyarrow") from None
+
+    schema = pa.schema([
+        ('x', pa.int32()), ('y', pa.int32()), ('distance', pa.int32()),
+        ('shop_x', pa.int32()), ('shop_y', pa.int32()), ('path', pa.string()),
+    ])
+    count = 0
+    chunk = []
+    with pq.ParquetWriter(filename, schema) as writer:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= PARQUET_CHUNK_ROWS:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def write_results(rows, filename):
+    """결과를 스트리밍으로 파일에 쓰는 함수 (.parquet 이면 Parquet, 그 외는 CSV)"""
+    if filename.endswith('.parquet'):
+        return _write_parquet(rows, filename)
+    return _write_csv(rows, filename)
+
+
+def run_batch(starts=None, output='batch_routes.csv', with_path=False, context=None):
+    """여러 출발 칸을 한 번에 처리해 파일로 저장하고 처리량을 돌려주는 함수
+
+    starts 를 주지 않으면 지도에 있는 모든 MyHome 칸을 출발 칸으로 사용한다.
+    """
+    if context is None:
+        context = MapContext()
+    poi = context.poi
+    coffee_shops = poi.positions('BandalgomCoffee')
+    if not coffee_shops:
+        raise ValueError("반달곰 커피 위치를 찾을 수 없습니다.")
+    if starts is None:
+        starts = poi.positions('MyHome')
+
+    # 격자 구성과 카페에서의 탐색은 모든 질의가 한 번만 공유
+    field, _ = load_or_build(context.grid, coffee_shops, context.source_paths,
+                             signature=context.compiled.signature)
+
+    started = time.perf_counter()
+    count = write_results(route_many(starts, field, with_path), output)
+    elapsed = time.perf_counter() - started
+    return {
+        'queries': count,
+        'seconds': elapsed,
+        'queries_per_second': count / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+def main():
+    """명령행에서 여러 출발 칸의 최단 경로를 한 번에 계산하는 함수"""
+    parser = argparse.ArgumentParser(description='여러 집에서 가장 가까운 반달곰 커피 찾기')
+    parser.add_argument('starts', nargs='?', help='x, y 컬럼이 있는 출발 칸 CSV (없으면 모든 MyHome)')
+    parser.add_argument('-o', '--output', default='batch_routes.csv',
+                        help='결과 파일 (.csv 또는 .parquet)')
+    parser.add_argument('--with-path', action='store_true', help='경로까지 함께 저장')
+    args = parser.parse_args()
+
+    try:
+        starts = read_starts(args.starts) if args.starts else None
+        stats = run_batch(starts, args.output, args.with_path)
+        print(f"{stats['queries']}개의 질의를 {stats['seconds']:.3f}초 동안 처리했습니다 "
+              f"({stats['queries_per_second']:.0f} 질의/초).")
+        print(f"결과가 {args.output} 파일로 저장되었습니다.")
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+
+
+if __name__ == "__main__":
+    main()
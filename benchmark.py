@@ -0,0 +1,239 @@
+# benchmark.py
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from render_backend import HEADLESS_ENV
+
+DEFAULT_OUTPUT_DIR = 'bench'
+DEFAULT_SIZES = [64, 256, 1024]
+MAX_SIZE = 4096
+# 기존 draw_map 은 칸마다 도형을 만들어 이보다 큰 지도는 기본으로 건너뛴다
+DEFAULT_MAX_DRAW_CELLS = 64 * 64
+STAGES = ['load_data', 'merge_data', 'find_positions', 'bfs_shortest_path', 'draw_map']
+
+CATEGORIES = [(1, 'Apartment'), (2, 'Building'), (3, 'MyHome'), (4, 'BandalgomCoffee')]
+
+
+def generate_map(output_dir, size, construction=0.2, structures=None, shops=2, areas=4, seed=0):
+    """기존 CSV 형식과 같은 size x size 가상 지도를 만들어 저장하는 함수
+
+    construction 은 건설현장 비율, structures 는 Apartment/Building 개수
+    (없으면 칸 수의 0.5%), shops 는 반달곰 커피 개수이며 MyHome 은 하나이다.
+    area 는 지도를 areas 개의 가로 띠로 나눠 붙인다. 같은 seed 면 같은 지도가 나온다.
+    저장한 (area_map, area_struct, area_category) 경로를 돌려준다.
+    """
+    if not 1 <= size <= MAX_SIZE:
+        raise ValueError(f"지도 크기는 1 ~ {MAX_SIZE} 사이여야 합니다: {size}")
+    rng = np.random.default_rng(seed)
+    cells = size * size
+    if structures is None:
+        structures = max(2, cells // 200)
+    poi_count = 1 + shops + structures
+    if poi_count > cells:
+        raise ValueError("구조물 수가 칸 수보다 많습니다.")
+
+    # 원본 CSV 와 같이 x, y 순서 (x 가 바깥 반복)
+    x = np.repeat(np.arange(1, size + 1, dtype=np.int32), size)
+    y = np.tile(np.arange(1, size + 1, dtype=np.int32), size)
+    construction_site = (rng.random(cells) < construction).astype(np.uint8)
+
+    category = np.zeros(cells, dtype=np.uint8)
+    poi = rng.choice(cells, size=poi_count, replace=False)
+    category[poi[0]] = 3
+    category[poi[1:1 + shops]] = 4
+    category[poi[1 + shops:]] = rng.choice([1, 2], size=structures)
+    # 집과 카페는 이동 가능한 칸에 둔다
+    construction_site[poi[:1 + shops]] = 0
+    area = ((y - 1) * areas // size).astype(np.int16)
+
+    os.makedirs(output_dir, exist_ok=True)
+    paths = tuple(os.path.join(output_dir, name) for name in
+                  ('area_map.csv', 'area_struct.csv', 'area_category.csv'))
+    # 원본 데이터와 같이 area_map/area_struct 는 BOM 이 붙은 UTF-8 로 저장한다
+    pd.DataFrame({'x': x, 'y': y, 'ConstructionSite': construction_site}).to_csv(
+        paths[0], index=False, encoding='utf-8-sig')
+    pd.DataFrame({'x': x, 'y': y, 'category': category, 'area': area}).to_csv(
+        paths[1], index=False, encoding='utf-8-sig')
+    with open(paths[2], 'w', encoding='utf-8') as f:
+        f.write('category, struct\n')
+        for code, name in CATEGORIES:
+            f.write(f'{code}, {name}\n')
+    return paths
+
+
+def measure(func, *args, repeat=1, memory=True, **kwargs):
+    """func 를 실행해 (결과, 가장 빠른 초, 최대 메모리 바이트) 를 돌려주는 함수
+
+    tracemalloc 은 실행을 느리게 하므로 시간은 repeat 번 추적 없이 재고,
+    memory=True 이면 메모리는 한 번 더 추적하며 실행해 따로 잰다.
+    """
+    result, best = None, None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best:
+            best = elapsed
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return result, best, peak
+
+
+def run_size(size, workdir, construction=0.2, seed=0, repeat=1,
+             max_draw_cells=DEFAULT_MAX_DRAW_CELLS, stages=STAGES, memory=True,
+             structures=None, shops=2):
+    """size 크기의 가상 지도에서 단계별 소요 시간과 최대 메모리를 재는 함수
+
+    structures, shops 는 generate_map 에 그대로 넘기는 구조물 / 반달곰 커피 개수이다.
+    """
+    from utils import load_data, merge_data
+    from map_direct_save import bfs_shortest_path, find_positions
+
+    paths = generate_map(os.path.join(workdir, f"map_{size}"), size, construction,
+                         structures, shops, seed=seed)
+    results = []
+
+    def record(stage, seconds=None, peak=None, skipped=None):
+        entry = {'size': size, 'cells': size * size, 'stage': stage,
+                 'seconds': seconds, 'peak_bytes': peak}
+        if skipped:
+            entry['skipped'] = skipped
+        results.append(entry)
+
+    data, seconds, peak = measure(load_data, *paths, repeat=repeat, memory=memory)
+    if 'load_data' in stages:
+        record('load_data', seconds, peak)
+    merged, seconds, peak = measure(merge_data, *data, repeat=repeat, memory=memory)
+    if 'merge_data' in stages:
+        record('merge_data', seconds, peak)
+    del data
+
+    positions = None
+    if 'find_positions' in stages or 'bfs_shortest_path' in stages:
+        positions, seconds, peak = measure(find_positions, merged, repeat=repeat,
+                                            memory=memory)
+        if 'find_positions' in stages:
+            record('find_positions', seconds, peak)
+
+    if 'bfs_shortest_path' in stages:
+        my_home, coffee_shops, _ = positions
+        path, seconds, peak = measure(bfs_shortest_path, my_home, coffee_shops, merged,
+                                      repeat=repeat, memory=memory)
+        record('bfs_shortest_path', seconds, peak)
+        results[-1]['path_length'] = len(path) - 1 if path else None
+
+    if 'draw_map' in stages:
+        if size * size > max_draw_cells:
+            record('draw_map', skipped=f"칸 수가 {max_draw_cells}개를 넘습니다")
+        else:
+            from map_draw import draw_map
+            # draw_map 은 현재 폴더에 map.png 를 저장하므로 작업 폴더에서 실행한다
+            cwd = os.getcwd()
+            os.chdir(os.path.dirname(paths[0]))
+            try:
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    _, seconds, peak = measure(draw_map, merged, show=False, repeat=repeat,
+                                               memory=memory)
+            finally:
+                os.chdir(cwd)
+            record('draw_map', seconds, peak)
+    return results
+
+
+def environment():
+    """결과를 비교할 때 참고할 실행 환경 정보"""
+    return {
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(current, baseline):
+    """두 결과에서 같은 (크기, 단계) 의 소요 시간 비율을 출력하는 함수"""
+    before = {(r['size'], r['stage']): r for r in baseline['results']}
+    print("\n기준 결과 대비 (현재 / 기준, 1보다 크면 느려짐)")
+    for result in current['results']:
+        old = before.get((result['size'], result['stage']))
+        if not old or not old.get('seconds') or result.get('seconds') is None:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        print(f"  {result['size']:>5} {result['stage']:<18} {ratio:6.2f}x "
+              f"({old['seconds'] * 1000:.1f} ms -> {result['seconds'] * 1000:.1f} ms)")
+
+
+def print_results(report):
+    for result in report['results']:
+        if result.get('skipped'):
+            print(f"  {result['size']:>5} {result['stage']:<18} 건너뜀 ({result['skipped']})")
+            continue
+        line = f"  {result['size']:>5} {result['stage']:<18} {result['seconds'] * 1000:10.1f} ms"
+        if result['peak_bytes'] is not None:
+            line += f", 최대 메모리 {result['peak_bytes'] / (1 << 20):8.1f} MiB"
+        print(line)
+
+
+def main():
+    """가상 지도로 로딩, 병합, 위치 찾기, 경로 탐색, 그리기 시간을 재는 벤치마크"""
+    parser = argparse.ArgumentParser(description='반달곰 커피 핫 패스 벤치마크')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f'지도 한 변 크기 목록 (최대 {MAX_SIZE})')
+    parser.add_argument('--construction', type=float, default=0.2, help='건설현장 비율')
+    parser.add_argument('--structures', type=int,
+                        help='Apartment/Building 개수 (기본: 칸 수의 0.5%%)')
+    parser.add_argument('--shops', type=int, default=2, help='반달곰 커피 개수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='단계별 반복 횟수 (가장 빠른 값 사용)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--max-draw-cells', type=int, default=DEFAULT_MAX_DRAW_CELLS)
+    parser.add_argument('--no-memory', action='store_true', help='최대 메모리 측정 생략')
+    parser.add_argument('--workdir', default=DEFAULT_OUTPUT_DIR, help='가상 지도와 그림을 저장할 폴더')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='결과 JSON 파일')
+    parser.add_argument('--compare', help='비교할 기준 결과 JSON 파일')
+    args = parser.parse_args()
+
+    os.environ.setdefault(HEADLESS_ENV, '1')
+    report = {
+        'environment': environment(),
+        'parameters': {'construction': args.construction, 'structures': args.structures,
+                       'shops': args.shops, 'seed': args.seed, 'repeat': args.repeat},
+        'results': [],
+    }
+    for size in args.sizes:
+        print(f"{size}x{size} 지도 측정 중...")
+        report['results'].extend(run_size(size, args.workdir, args.construction, args.seed,
+                                          args.repeat, args.max_draw_cells, args.stages,
+                                          not args.no_memory, args.structures, args.shops))
+    print_results(report)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과가 {args.output} 파일로 저장되었습니다.")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,108 @@
+import argparse
+import json
 import pandas as pd
-from utils import load_data, merge_data
+import instrument
+from utils import merge_data_fast
+from map_context import MapContext
 
-def analyze_data(area_map, area_struct, area_category):
-    """데이터를 확인 및 병합하고 area 1 데이터만 필터링 후 통계 분석"""
-    
-    print("area_map.csv 내용:")
-    print(area_map.head())
-    print()
-    
-    print("area_struct.csv 내용:")
-    print(area_struct.head())
-    print()
+
+class AreaAnalysis:
+    """area 별 구조물 통계 묶음
+
+    structures 는 (area, struct) 별 개수, 중심 좌표, 범위, 건설현장 비율,
+    areas 는 area 별 칸 수와 건설현장 비율을 담은 DataFrame 이다.
+    """
+
+    def __init__(self, structures, areas):
+        self.structures = structures
+        self.areas = areas
+
+    def to_dict(self):
+        """JSON 으로 바꿀 수 있는 dict 로 만드는 함수"""
+        by_area = {}
+        for (area, struct), row in self.structures.iterrows():
+            by_area.setdefault(area, []).append({
+                'struct': str(struct),
+                'count': int(row['count']),
+                'centroid': [float(row['x_mean']), float(row['y_mean'])],
+                'bbox': [int(row['x_min']), int(row['y_min']), int(row['x_max']), int(row['y_max'])],
+                'construction_ratio': float(row['construction_ratio']),
+            })
+        return {'areas': [{
+            'area': int(area),
+            'cells': int(row['count']),
+            'construction_ratio': float(row['construction_ratio']),
+            'structures': by_area.get(area, []),
+        } for area, row in self.areas.iterrows()]}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+
+
+def analyze_areas(merged_data, default_label="None"):
+    """모든 area 의 구조물 통계를 (area, struct) groupby 한 번으로 구하는 함수
+
+    빈 칸(default_label)도 같은 groupby 에 포함해 area 별 합계를 함께 얻는다.
+    구조물 정보가 없는(area 가 비어 있는) 칸은 제외된다.
+    """
+    grouped = merged_data.groupby(['area', 'struct'], observed=True, sort=True).agg(
+        count=('x', 'size'),
+        x_mean=('x', 'mean'),
+        y_mean=('y', 'mean'),
+        x_min=('x', 'min'),
+        y_min=('y', 'min'),
+        x_max=('x', 'max'),
+        y_max=('y', 'max'),
+        construction=('ConstructionSite', 'sum'),
+    )
+    grouped['construction_ratio'] = grouped['construction'] / grouped['count']
+
+    areas = grouped.groupby(level='area')[['count', 'construction']].sum()
+    areas['construction_ratio'] = areas['construction'] / areas['count']
+    structures = grouped[grouped.index.get_level_values('struct') != default_label]
+    return AreaAnalysis(structures, areas)
+
+
+def analyze_data(area_map, area_struct, area_category, merged_data=None, verbose=False):
+    """데이터를 확인 및 병합하고 area 1 데이터만 필터링 후 통계 분석
+
+    이미 병합된 데이터(merged_data)가 있으면 다시 병합하지 않는다.
+    verbose=True 일 때만 데이터와 통계를 출력한다.
+    """
     
-    print("area_category.csv 내용:")
-    print(area_category)
-    print()
+    if verbose:
+        print("area_map.csv 내용:")
+        print(area_map.head())
+        print()
+        
+        print("area_struct.csv 내용:")
+        print(area_struct.head())
+        print()
+        
+        print("area_category.csv 내용:")
+        print(area_category)
+        print()
     
-    merged_data = merge_data(area_map, area_struct, area_category)
+    if merged_data is None:
+        merged_data = merge_data_fast(area_map, area_struct, area_category)
     
-    print("병합된 전체 데이터:")
-    print(merged_data.head(10))
-    print()
+    if verbose:
+        print("병합된 전체 데이터:")
+        print(merged_data.head(10))
+        print()
     
     # area 1에 대한 데이터만 필터링
     # area가 1인 곳으로 필터링
     target_areas = [1]  # area 1만 선택
     
-    print(f"BandalgomCoffee가 있는 분석 대상 area들: area 1")
-    
     # 대상 area들의 데이터 필터링
     target_data = merged_data[merged_data['area'].isin(target_areas)].copy()
     
+    if not verbose:
+        return merged_data, target_data
+
+    print(f"BandalgomCoffee가 있는 분석 대상 area들: area 1")
+    
     print("대상 area 데이터:")
     print(target_data)
     print()
@@ -46,15 +118,14 @@ def analyze_data(area_map, area_struct, area_category):
         structures = target_data[target_data['category'] != 0]
         
         if not structures.empty:
-            structure_summary = structures.groupby('struct').size().reset_index(name='count')
+            structure_summary = structures.groupby('struct', observed=True).size().reset_index(name='count')
             
             print("구조물 종류별 개수:")
             print(structure_summary.to_string(index=False))
             print()
             
-            # 각 구조물의 위치 정보
-            for struct_type in structures['struct'].unique():
-                struct_locations = structures[structures['struct'] == struct_type][['x', 'y']]
+            # 각 구조물의 위치 정보 (종류별로 한 번에 나눔)
+            for struct_type, struct_locations in structures.groupby('struct', observed=True)[['x', 'y']]:
                 print(f"{struct_type} 위치:")
                 print(struct_locations.to_string(index=False))
                 print()
@@ -62,23 +133,56 @@ def analyze_data(area_map, area_struct, area_category):
     return merged_data, target_data
 
 
-def main():
-    """메인 함수"""
-    area_map_path = 'data/area_map.csv'
-    area_struct_path = 'data/area_struct.csv'
-    area_category_path = 'data/area_category.csv'
+def print_analysis(analysis):
+    """analyze_areas 결과를 area 별로 요약해서 출력하는 함수"""
+    summary = analysis.to_dict()
+    for area in summary['areas']:
+        print(f"area {area['area']}: 칸 {area['cells']}개, "
+              f"건설현장 비율 {area['construction_ratio']:.1%}")
+        for item in area['structures']:
+            cx, cy = item['centroid']
+            print(f"  {item['struct']}: {item['count']}개, 중심 ({cx:.1f}, {cy:.1f}), "
+                  f"범위 {tuple(item['bbox'])}, 건설현장 겹침 {item['construction_ratio']:.1%}")
+
+
+def main(context=None, verbose=True, json_path=None):
+    """메인 함수 (context 를 주면 이미 불러온 지도 데이터를 재사용)
+
+    verbose=False 이면 데이터 출력 없이 area 별 통계만 계산한다.
+    json_path 를 주면 area 별 통계를 JSON 파일로 저장한다.
+    """
+    if context is None:
+        context = MapContext()
 
     try:
-        area_map, area_struct, area_category = \
-            load_data(area_map_path, area_struct_path, area_category_path)
-        merged_data, target_data = \
-            analyze_data(area_map, area_struct, area_category)
+        merged_data = context.merged_data
+        if verbose:
+            area_map, area_struct, area_category = context.frames
+            merged_data, target_data = \
+                analyze_data(area_map, area_struct, area_category, merged_data, verbose=True)
+        else:
+            target_data = merged_data[merged_data['area'].isin([1])].copy()
+
+        analysis = analyze_areas(merged_data)
+        if verbose:
+            print("=== area 별 구조물 통계 ===")
+            print_analysis(analysis)
+            print()
+        if json_path:
+            with open(json_path, 'w', encoding='utf-8') as f:
+                f.write(analysis.to_json())
+            print(f"area 별 통계가 {json_path} 파일로 저장되었습니다.")
         print("데이터 분석이 완료되었습니다.")
         return merged_data, target_data
     except Exception as e:
+        instrument.record_error('caffee_map.main', e)
         print(f"오류가 발생했습니다: {e}")
         return None, None
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='지도 데이터 분석')
+    parser.add_argument('-q', '--quiet', action='store_true', help='데이터 출력 없이 통계만 계산')
+    parser.add_argument('--json', help='area 별 통계를 저장할 JSON 파일')
+    args = parser.parse_args()
+    main(verbose=not args.quiet, json_path=args.json)
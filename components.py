@@ -0,0 +1,144 @@
+# components.py
+
+import numpy as np
+from grid_map import EMPTY, as_grid_map
+
+# 이동 불가 칸의 연결 요소 번호
+NO_COMPONENT = -1
+
+
+def label_components(passable):
+    """이동 가능 칸(값 1)을 상하좌우 연결 요소로 나눠 번호를 붙이는 함수
+
+    배열 연산으로 하는 union-find: 이웃한 두 칸의 대표를 작은 쪽으로 합치고
+    경로 압축(parent = parent[parent])을 반복한다. 합칠 것이 없으면 끝난다.
+    번호는 0부터 (행 우선으로 처음 나오는 순서) 붙이며 이동 불가 칸은 -1 이다.
+    """
+    height, width = passable.shape
+    open_cells = np.asarray(passable, dtype=bool).ravel()
+    index = np.arange(height * width, dtype=np.int64).reshape(height, width)
+    both_open = open_cells.reshape(height, width)
+    horizontal = both_open[:, :-1] & both_open[:, 1:]
+    vertical = both_open[:-1, :] & both_open[1:, :]
+    u = np.concatenate([index[:, :-1][horizontal], index[:-1, :][vertical]])
+    v = np.concatenate([index[:, 1:][horizontal], index[1:, :][vertical]])
+
+    parent = np.arange(height * width, dtype=np.int64)
+    while True:
+        pu, pv = parent[u], parent[v]
+        differ = pu != pv
+        if not differ.any():
+            break
+        lo = np.minimum(pu, pv)[differ]
+        hi = np.maximum(pu, pv)[differ]
+        np.minimum.at(parent, hi, lo)
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+        # 연결이 끝난 간선은 다음 반복에서 제외
+        u, v = u[differ], v[differ]
+
+    labels = np.full(height * width, NO_COMPONENT, dtype=np.int32)
+    roots = parent[open_cells]
+    if len(roots):
+        _, compact = np.unique(roots, return_inverse=True)
+        labels[open_cells] = compact
+    return labels.reshape(height, width)
+
+
+class ComponentIndex:
+    """이동 가능 칸의 연결 요소 번호 레이어
+
+    두 칸이 같은 번호이면 서로 오갈 수 있으므로 도달 가능 여부를 O(1)로 확인한다.
+    격자(GridMap)의 이동 가능 여부가 바뀌면 다시 만들어야 한다.
+    """
+
+    def __init__(self, area_data):
+        self.grid = as_grid_map(area_data)
+        self.labels = label_components(self.grid.passable)
+        self.count = int(self.labels.max()) + 1 if self.labels.size else 0
+
+    def label_at(self, x, y):
+        """(x, y) 의 연결 요소 번호 (범위 밖이나 이동 불가 칸은 -1)"""
+        if not self.grid.in_bounds(x, y):
+            return NO_COMPONENT
+        return int(self.labels[y - self.grid.min_y, x - self.grid.min_x])
+
+    def start_labels(self, x, y):
+        """(x, y) 에서 출발해 갈 수 있는 연결 요소 번호 집합
+
+        BFS 와 같이 이동 불가 칸에서 출발하면 이동 가능한 이웃 칸으로 나갈 수 있다.
+        """
+        label = self.label_at(x, y)
+        if label != NO_COMPONENT:
+            return {label}
+        if not self.grid.in_bounds(x, y):
+            return set()
+        labels = {self.label_at(x + dx, y + dy) for dx, dy in ((0, 1), (0, -1), (1, 0), (-1, 0))}
+        labels.discard(NO_COMPONENT)
+        return labels
+
+    def is_reachable(self, start, goal):
+        """start 에서 goal 까지 경로가 있는지 확인하는 함수"""
+        if tuple(start) == tuple(goal):
+            return True
+        label = self.label_at(*goal)
+        return label != NO_COMPONENT and label in self.start_labels(*start)
+
+    def reachable_goals(self, start, goals):
+        """goals 중 start 에서 갈 수 있는 것만 남기는 함수"""
+        labels = self.start_labels(*start)
+        return [goal for goal in goals
+                if tuple(goal) == tuple(start) or self.label_at(*goal) in labels]
+
+    def isolated_structures(self, merged_data, target='BandalgomCoffee'):
+        """target 구조물에 갈 수 없는 구조물 목록 (area, struct, x, y) DataFrame 을 만드는 함수"""
+        grid = self.grid
+        structures = merged_data[(merged_data['category'] != EMPTY)
+                                 & (merged_data['struct'] != target)]
+        targets = merged_data[merged_data['struct'] == target]
+        columns = ['area', 'struct', 'x', 'y']
+
+        target_labels = self.labels[targets['y'].to_numpy(np.int64) - grid.min_y,
+                                    targets['x'].to_numpy(np.int64) - grid.min_x]
+        target_labels = np.unique(target_labels[target_labels != NO_COMPONENT])
+
+        # 칸 자신과 상하좌우 이웃의 번호 (범위 밖은 -1), 이동 불가 칸은 이웃으로 나간다
+        padded = np.pad(self.labels, 1, constant_values=NO_COMPONENT)
+        rows = structures['y'].to_numpy(np.int64) - grid.min_y + 1
+        cols = structures['x'].to_numpy(np.int64) - grid.min_x + 1
+        own = padded[rows, cols]
+        around = np.stack([padded[rows + 1, cols], padded[rows - 1, cols],
+                           padded[rows, cols + 1], padded[rows, cols - 1]])
+        reach_own = np.isin(own, target_labels)
+        reach_around = np.isin(around, target_labels).any(axis=0)
+        reachable = np.where(own != NO_COMPONENT, reach_own, reach_around)
+        return structures.loc[~reachable, columns].reset_index(drop=True)
+
+
+def print_isolated_report(isolated, target='BandalgomCoffee'):
+    """area 별로 target 에 갈 수 없는 구조물을 출력하는 함수"""
+    if isolated.empty:
+        print(f"모든 구조물에서 {target}에 갈 수 있습니다.")
+        return
+    for area, rows in isolated.groupby('area', sort=True):
+        cells = ', '.join(f"{struct} ({x}, {y})" for _, struct, x, y in rows.itertuples(index=False))
+        print(f"area {area}: {target}에 갈 수 없는 구조물 {len(rows)}개 - {cells}")
+
+
+def main():
+    """연결 요소를 계산하고 area 별 고립된 구조물을 보고하는 함수"""
+    from map_context import MapContext
+    try:
+        context = MapContext()
+        index = context.components
+        print(f"이동 가능 칸의 연결 요소: {index.count}개")
+        print_isolated_report(index.isolated_structures(context.merged_data))
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# distance_field.py
+
+import os
+from array import array
+from collections import deque
+import numpy as np
+from grid_map import as_grid_map
+from utils import file_signature
+
+# 다음 칸 방향 코드 (0은 목표 지점 또는 도달 불가)
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+NO_HOP = 0
+UNREACHABLE = -1
+
+DEFAULT_CACHE_PATH = 'cache/distance_field.npz'
+# 거리 지도 계산 방식이 바뀌면 올려서 예전 캐시를 버린다 (2: 건설현장 위 카페 제외)
+FIELD_VERSION = 2
+
+
+class DistanceField:
+    """모든 반달곰 커피에서 동시에 출발한 BFS 결과
+
+    dist 는 가장 가까운 카페까지의 거리(도달 불가는 -1),
+    next_hop 은 그 카페로 가기 위한 다음 칸의 방향 코드,
+    nearest 는 가장 가까운 카페의 번호(sources 인덱스)이다.
+    """
+
+    def __init__(self, grid, sources, dist, next_hop, nearest):
+        self.grid = grid
+        self.sources = [tuple(int(v) for v in s) for s in sources]
+        self._source_set = set(self.sources)
+        self.dist = dist
+        self.next_hop = next_hop
+        self.nearest = nearest
+
+    @classmethod
+    def build(cls, area_data, sources):
+        """sources 전체를 시작점으로 하는 다중 시작점 BFS로 거리 지도를 만드는 함수"""
+        grid = as_grid_map(area_data)
+        size = grid.size
+        width = grid.width
+        dist = array('i', [UNREACHABLE]) * size
+        nearest = array('i', [UNREACHABLE]) * size
+        next_hop = bytearray(size)
+
+        queue = deque()
+        for index, (x, y) in enumerate(sources):
+            # BFS 와 같이 건설현장 위의 카페에는 들어갈 수 없으므로 시작점에서 뺀다
+            if not grid.is_passable(x, y):
+                continue
+            cell = grid.cell_id(x, y)
+            if dist[cell] == UNREACHABLE:
+                dist[cell] = 0
+                nearest[cell] = index
+                queue.append(cell)
+
+        height, opened = grid.height, grid._open
+
+        while queue:
+            cell = queue.popleft()
+            next_dist = dist[cell] + 1
+            row, col = divmod(cell, width)
+            # 기존 BFS 와 같은 이웃 순서로, 이웃에서 현재 셀로 돌아오는 방향 코드를 함께 둔다
+            # (셀 번호 차이로 방향을 정하면 한 줄짜리 지도에서 가로/세로가 겹친다)
+            for nxt, inside, back in ((cell + width, row + 1 < height, 2),
+                                      (cell - width, row > 0, 1),
+                                      (cell + 1, col + 1 < width, 4),
+                                      (cell - 1, col > 0, 3)):
+                if not inside or not opened[nxt] or dist[nxt] != UNREACHABLE:
+                    continue
+                dist[nxt] = next_dist
+                nearest[nxt] = nearest[cell]
+                next_hop[nxt] = back
+                queue.append(nxt)
+
+        shape = (grid.height, grid.width)
+        return cls(
+            grid,
+            sources,
+            np.frombuffer(dist, dtype=np.int32).reshape(shape).copy(),
+            np.frombuffer(next_hop, dtype=np.uint8).reshape(shape).copy(),
+            np.frombuffer(nearest, dtype=np.int32).reshape(shape).copy(),
+        )
+
+    def _lookup(self, x, y):
+        """(거리, 출발 좌표) 를 돌려주는 함수
+
+        이동 불가 칸(예: 건설현장 위의 집)에서 출발하면 기존 BFS 와 같이
+        이웃 칸 중 가장 가까운 곳으로 한 칸 이동한 것으로 본다.
+        """
+        if not self.grid.in_bounds(x, y):
+            return UNREACHABLE, None
+        # BFS 와 같이 출발 칸이 곧 카페면 (막힌 칸이어도) 거리 0
+        if (x, y) in self._source_set:
+            return 0, None
+        row, col = y - self.grid.min_y, x - self.grid.min_x
+        d = int(self.dist[row, col])
+        if d != UNREACHABLE:
+            return d, None
+
+        best, best_cell = UNREACHABLE, None
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if not self.grid.in_bounds(nx, ny):
+                continue
+            nd = int(self.dist[ny - self.grid.min_y, nx - self.grid.min_x])
+            if nd != UNREACHABLE and (best == UNREACHABLE or nd + 1 < best):
+                best, best_cell = nd + 1, (nx, ny)
+        return best, best_cell
+
+    def distance(self, x, y):
+        """(x, y) 에서 가장 가까운 카페까지의 거리 (도달 불가면 None)"""
+        d, _ = self._lookup(x, y)
+        return None if d == UNREACHABLE else d
+
+    def nearest_source(self, x, y):
+        """(x, y) 에서 가장 가까운 카페의 좌표 (도달 불가면 None)"""
+        d, via = self._lookup(x, y)
+        if d == UNREACHABLE:
+            return None
+        if d == 0:
+            return (x, y)
+        vx, vy = via if via else (x, y)
+        index = int(self.nearest[vy - self.grid.min_y, vx - self.grid.min_x])
+        return self.sources[index]
+
+    def route(self, x, y):
+        """다음 칸 방향을 따라가며 (x, y) 에서 가장 가까운 카페까지의 경로를 만드는 함수"""
+        d, via = self._lookup(x, y)
+        if d == UNREACHABLE:
+            return None
+
+        path = [(x, y)]
+        if via:
+            path.append(via)
+            x, y = via
+        min_x, min_y = self.grid.min_x, self.grid.min_y
+        while True:
+            hop = int(self.next_hop[y - min_y, x - min_x])
+            if hop == NO_HOP:
+                return path
+            dx, dy = DIRECTIONS[hop - 1]
+            x, y = x + dx, y + dy
+            path.append((x, y))
+
+    def save(self, cache_path, signature):
+        """거리 지도를 입력 파일 해시와 함께 npz 파일로 저장하는 함수"""
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            cache_path,
+            signature=np.array(signature),
+            version=np.array(FIELD_VERSION),
+            sources=np.array(self.sources, dtype=np.int32).reshape(-1, 2),
+            dist=self.dist,
+            next_hop=self.next_hop,
+            nearest=self.nearest,
+        )
+
+    @classmethod
+    def load(cls, cache_path, area_data, signature, sources=None):
+        """캐시 파일을 불러오는 함수 (해시, 버전, 격자 크기가 다르면 None)
+
+        sources 를 주면 저장된 시작점 집합과 같을 때만 불러온다 (순서는 보지 않는다).
+        """
+        if not os.path.exists(cache_path):
+            return None
+        grid = as_grid_map(area_data)
+        with np.load(cache_path) as cached:
+            if str(cached['signature']) != signature:
+                return None
+            if 'version' not in cached.files or int(cached['version']) != FIELD_VERSION:
+                return None
+            if cached['dist'].shape != (grid.height, grid.width):
+                return None
+            if sources is not None and \
+                    set(map(tuple, cached['sources'].tolist())) != {(int(x), int(y)) for x, y in sources}:
+                return None
+            return cls(grid, cached['sources'].tolist(), cached['dist'],
+                       cached['next_hop'], cached['nearest'])
+
+
+def load_or_build(area_data, sources, source_paths, cache_path=DEFAULT_CACHE_PATH,
+                  signature=None):
+    """캐시가 유효하면 불러오고, 아니면 새로 만들어 저장하는 함수
+
+    signature 를 주면 입력 파일 해시를 다시 계산하지 않는다.
+    """
+    if signature is None:
+        signature = file_signature(source_paths)
+    field = DistanceField.load(cache_path, area_data, signature, sources)
+    if field is not None:
+        return field, True
+    field = DistanceField.build(area_data, sources)
+    field.save(cache_path, signature)
+    return field, False
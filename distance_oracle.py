@@ -0,0 +1,219 @@
+# distance_oracle.py
+
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from grid_map import GridMap, as_grid_map
+
+DEFAULT_CACHE_ROWS = 256
+DEFAULT_MATRIX_PATH = 'cache/poi_distances.npz'
+
+
+def row_dtype(grid):
+    """거리 행 자료형 (가장 먼 거리가 uint16 에 들어가면 uint16, 아니면 uint32)"""
+    # 가장 큰 값은 도달 불가 표시로 쓴다
+    return np.uint16 if grid.size < np.iinfo(np.uint16).max else np.uint32
+
+
+def poi_row(grid, start, targets, dtype):
+    """start 에서 BFS 한 번으로 모든 관심 지점까지의 거리를 구하는 함수
+
+    targets 는 셀 번호 -> 관심 지점 번호 목록이며, 모든 지점을 찾으면 바로 멈춘다.
+    도달할 수 없는 지점은 dtype 의 최댓값이다.
+    """
+    count = sum(len(indexes) for indexes in targets.values())
+    row = np.full(count, np.iinfo(dtype).max, dtype=dtype)
+    if not grid.in_bounds(*start):
+        return row
+
+    start_cell = grid.cell_id(*start)
+    remaining = len(targets)
+    if start_cell in targets:
+        row[targets[start_cell]] = 0
+        remaining -= 1
+
+    # 거리 배열 대신 단계(level)별로 진행해 방문 표시만 기록한다
+    seen = bytearray(grid.size)
+    seen[start_cell] = 1
+    frontier = [start_cell]
+    level = 0
+    while frontier and remaining:
+        level += 1
+        next_frontier = []
+        for cell in frontier:
+            for nxt in grid.neighbor_cells(cell):
+                if seen[nxt]:
+                    continue
+                seen[nxt] = 1
+                if nxt in targets:
+                    row[targets[nxt]] = level
+                    remaining -= 1
+                next_frontier.append(nxt)
+        frontier = next_frontier
+    return row
+
+
+class DistanceOracle:
+    """관심 지점(집, 카페, 구조물) 사이의 거리를 필요할 때 계산해 주는 객체
+
+    출발 지점마다 BFS 한 번으로 모든 지점까지의 거리 행을 만들고,
+    최근에 쓴 행 cache_rows 개만 LRU 로 남긴다. 전체 행렬을 미리 계산하면
+    (precompute) 이후 질의는 행렬 조회로 끝난다.
+    """
+
+    def __init__(self, area_data, points, cache_rows=DEFAULT_CACHE_ROWS):
+        self.grid = as_grid_map(area_data)
+        self.points = [tuple(int(v) for v in point) for point in points]
+        self.index = {point: i for i, point in enumerate(self.points)}
+        self.dtype = row_dtype(self.grid)
+        self.unreachable = int(np.iinfo(self.dtype).max)
+        self.cache_rows = cache_rows
+        self.matrix = None
+        self.hits = 0
+        self.misses = 0
+        self._rows = OrderedDict()
+        self._targets = {}
+        for i, (x, y) in enumerate(self.points):
+            if self.grid.in_bounds(x, y):
+                self._targets.setdefault(self.grid.cell_id(x, y), []).append(i)
+
+    def _point_index(self, point):
+        try:
+            return self.index[tuple(point)]
+        except KeyError:
+            raise ValueError(f"등록되지 않은 지점입니다: {point}") from None
+
+    def row(self, source):
+        """source 에서 모든 지점까지의 거리 행 (도달 불가는 unreachable)"""
+        i = self._point_index(source)
+        if self.matrix is not None:
+            self.hits += 1
+            return self.matrix[i]
+        row = self._rows.get(i)
+        if row is not None:
+            self.hits += 1
+            self._rows.move_to_end(i)
+            return row
+        self.misses += 1
+        row = poi_row(self.grid, self.points[i], self._targets, self.dtype)
+        self._rows[i] = row
+        if len(self._rows) > self.cache_rows:
+            self._rows.popitem(last=False)
+        return row
+
+    def distance(self, source, target):
+        """source 에서 target 까지의 거리 (도달 불가면 None)"""
+        d = int(self.row(source)[self._point_index(target)])
+        return None if d == self.unreachable else d
+
+    def stats(self):
+        """캐시 적중/실패 횟수와 현재 저장된 행 수"""
+        total = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'cached_rows': len(self._rows), 'precomputed': self.matrix is not None}
+
+    def precompute(self, workers=None):
+        """모든 지점의 거리 행을 (프로세스 풀에서) 계산해 전체 행렬로 두는 함수
+
+        workers=1 이면 현재 프로세스에서 차례로 계산한다.
+        """
+        sources = self.points
+        if workers == 1 or len(sources) <= 1:
+            rows = [poi_row(self.grid, source, self._targets, self.dtype) for source in sources]
+        else:
+            workers = min(workers or os.cpu_count() or 1, len(sources))
+            spec = (self.grid.min_x, self.grid.min_y, np.asarray(self.grid.passable))
+            chunk = max(1, len(sources) // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(spec, self._targets, self.dtype)) as pool:
+                rows = list(pool.map(_row_in_worker, sources, chunksize=chunk))
+        self.matrix = np.vstack(rows) if rows else np.zeros((0, 0), dtype=self.dtype)
+        self._rows.clear()
+        return self.matrix
+
+    def save(self, path=DEFAULT_MATRIX_PATH, signature=''):
+        """미리 계산한 전체 행렬을 지점 목록, 입력 파일 해시와 함께 저장하는 함수"""
+        if self.matrix is None:
+            self.precompute()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(path, signature=np.array(signature),
+                            points=np.array(self.points, dtype=np.int32).reshape(-1, 2),
+                            matrix=self.matrix)
+
+    def load(self, path=DEFAULT_MATRIX_PATH, signature=''):
+        """저장된 행렬을 불러오는 함수 (해시나 지점 목록이 다르면 False)"""
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as saved:
+            if str(saved['signature']) != signature:
+                return False
+            if [tuple(p) for p in saved['points'].tolist()] != self.points:
+                return False
+            self.matrix = saved['matrix'].astype(self.dtype, copy=False)
+        self._rows.clear()
+        return True
+
+
+# 작업 프로세스마다 한 번만 만드는 격자와 지점 정보
+_worker_state = None
+
+
+def _init_worker(spec, targets, dtype):
+    global _worker_state
+    min_x, min_y, passable = spec
+    grid = GridMap(min_x, min_y, passable, np.zeros_like(passable))
+    _worker_state = (grid, targets, dtype)
+
+
+def _row_in_worker(source):
+    grid, targets, dtype = _worker_state
+    return poi_row(grid, source, targets, dtype)
+
+
+def load_or_precompute(context, points, path=DEFAULT_MATRIX_PATH, workers=None):
+    """저장된 전체 행렬이 유효하면 불러오고, 아니면 계산해 저장하는 함수"""
+    oracle = DistanceOracle(context.grid, points)
+    signature = context.compiled.signature
+    if oracle.load(path, signature):
+        return oracle, True
+    oracle.precompute(workers)
+    oracle.save(path, signature)
+    return oracle, False
+
+
+def main():
+    """관심 지점 사이 거리를 지연 계산과 전체 행렬 계산으로 각각 구해 비교하는 함수"""
+    from map_context import MapContext
+    try:
+        context = MapContext()
+        my_home, coffee_shops, all_structures = context.poi.find_positions()
+        points = list(dict.fromkeys(
+            ([my_home] if my_home and my_home != (-1, -1) else []) + coffee_shops + all_structures))
+
+        oracle = DistanceOracle(context.grid, points)
+        started = time.perf_counter()
+        for source in points:
+            for target in points:
+                oracle.distance(source, target)
+        lazy = time.perf_counter() - started
+        stats = oracle.stats()
+        print(f"지점 {len(points)}개, 지연 계산 {lazy * 1000:.1f} ms "
+              f"(적중 {stats['hits']}, 실패 {stats['misses']})")
+
+        started = time.perf_counter()
+        full, cached = load_or_precompute(context, points)
+        print(f"전체 행렬 {'불러오기' if cached else '계산'} "
+              f"{(time.perf_counter() - started) * 1000:.1f} ms")
+        for row in full.matrix:
+            print(' '.join('  -' if d == full.unreachable else f"{d:3d}" for d in row))
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# dynamic_route.py
+
+import argparse
+import csv
+import heapq
+import random
+import sys
+import time
+from distance_field import NO_HOP, UNREACHABLE, DistanceField
+
+
+class DynamicField:
+    """건설현장 변경을 거리 지도에 부분적으로 반영하는 객체
+
+    DistanceField 의 배열을 그대로 고쳐 쓰므로 field.distance(), field.route()
+    결과가 곧바로 바뀐다. 칸이 막히면 그 칸을 거쳐 가던 칸들(최단 경로 트리의
+    하위 트리)만 지우고 경계에서 다시 채우며, 칸이 열리면 줄어드는 거리만
+    퍼뜨린다 (동적 BFS 보수). 변경이 작으면 전체를 다시 만드는 것보다 훨씬 빠르다.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.grid = field.grid
+        width = self.grid.width
+        # 파이썬 반복문에서 빠르게 읽고 쓰기 위한 평탄화된 뷰 (원본 배열과 메모리 공유)
+        self._dist = memoryview(field.dist.reshape(-1))
+        self._hop = memoryview(field.next_hop.reshape(-1))
+        self._nearest = memoryview(field.nearest.reshape(-1))
+        # 방향 코드 -> 다음 칸 셀 번호 변화량 (DIRECTIONS 순서)
+        self._offset = [0, width, -width, 1, -1]
+        # 카페 셀 -> 카페 번호 (건설현장 위 카페는 칸이 열릴 때만 시작점이 된다)
+        self._sources = {}
+        for index, (x, y) in enumerate(field.sources):
+            if self.grid.in_bounds(x, y):
+                self._sources.setdefault(self.grid.cell_id(x, y), index)
+        # 출발 좌표 -> (경로, 경로가 의존하는 셀 번호 집합)
+        self._routes = {}
+
+    def _adjacent(self, cell):
+        """범위 안의 상하좌우 셀과, 그 셀에서 cell 로 오는 방향 코드를 돌려주는 함수"""
+        grid = self.grid
+        row, col = divmod(cell, grid.width)
+        if row + 1 < grid.height:
+            yield cell + grid.width, 2
+        if row > 0:
+            yield cell - grid.width, 1
+        if col + 1 < grid.width:
+            yield cell + 1, 4
+        if col > 0:
+            yield cell - 1, 3
+
+    def _best_neighbor(self, cell):
+        """거리가 정해진 이웃 중 가장 가까운 곳을 (거리, 방향 코드, 카페 번호) 로 돌려주는 함수"""
+        dist = self._dist
+        best = None
+        for nxt, code in self._adjacent(cell):
+            d = dist[nxt]
+            if d != UNREACHABLE and (best is None or d + 1 < best[0]):
+                # cell 에서 nxt 로 가는 방향은 nxt 에서 cell 로 오는 방향의 반대
+                best = (d + 1, code + 1 if code % 2 else code - 1, self._nearest[nxt])
+        return best
+
+    def _invalidate(self, closed):
+        """막힌 칸을 지나던 최단 경로 트리의 하위 트리를 지우고 지운 셀 목록을 돌려주는 함수"""
+        dist, hop, nearest = self._dist, self._hop, self._nearest
+        # 막힌 카페 칸도 더 이상 시작점이 아니므로 함께 지운다
+        stack = [cell for cell in closed if dist[cell] != UNREACHABLE]
+        marked = set(stack)
+        removed = []
+        while stack:
+            cell = stack.pop()
+            removed.append(cell)
+            for nxt, code in self._adjacent(cell):
+                if nxt in marked or dist[nxt] == UNREACHABLE or nxt in self._sources:
+                    continue
+                if hop[nxt] != NO_HOP and nxt + self._offset[hop[nxt]] == cell:
+                    marked.add(nxt)
+                    stack.append(nxt)
+        for cell in removed:
+            dist[cell] = UNREACHABLE
+            hop[cell] = NO_HOP
+            nearest[cell] = UNREACHABLE
+        return removed
+
+    def apply_changes(self, changes):
+        """(x, y, ConstructionSite) 변경 목록을 격자와 거리 지도에 반영하는 함수
+
+        ConstructionSite 가 1이면 칸을 막고 0이면 연다. 값이 그대로인 칸은 무시한다.
+        처리 통계를 dict 로 돌려준다.
+        """
+        started = time.perf_counter()
+        grid = self.grid
+        opened, closed = [], []
+        for x, y, construction in changes:
+            x, y = int(x), int(y)
+            if not grid.in_bounds(x, y):
+                raise ValueError(f"지도 범위를 벗어난 좌표입니다: ({x}, {y})")
+            is_open = int(construction) != 1
+            if grid.is_passable(x, y) == is_open:
+                continue
+            grid.set_passable(x, y, is_open)
+            (opened if is_open else closed).append(grid.cell_id(x, y))
+
+        dist, hop, nearest = self._dist, self._hop, self._nearest
+        removed = self._invalidate(closed)
+        changed = set(removed)
+
+        # 다시 채울 칸(지운 칸, 새로 열린 칸)은 경계의 이웃에서 거리를 가져와 시작한다
+        heap = []
+        for cell in removed + opened:
+            if not grid._open[cell]:
+                continue
+            if cell in self._sources:
+                # 다시 열린 카페 칸은 거리 0 의 시작점으로 되돌린다
+                dist[cell], hop[cell], nearest[cell] = 0, NO_HOP, self._sources[cell]
+                heapq.heappush(heap, (0, cell))
+                continue
+            best = self._best_neighbor(cell)
+            if best is None:
+                continue
+            d = dist[cell]
+            if d == UNREACHABLE or best[0] < d:
+                dist[cell], hop[cell], nearest[cell] = best
+                heapq.heappush(heap, (best[0], cell))
+
+        opened_cells = grid._open
+        repaired = 0
+        while heap:
+            d, cell = heapq.heappop(heap)
+            if d != dist[cell]:
+                continue
+            repaired += 1
+            changed.add(cell)
+            next_dist = d + 1
+            # 셀 번호 차이가 아닌 이웃마다 붙은 방향 코드를 쓴다 (한 줄짜리 지도에서도 안전)
+            for nxt, code in self._adjacent(cell):
+                if not opened_cells[nxt]:
+                    continue
+                nd = dist[nxt]
+                if nd == UNREACHABLE or next_dist < nd:
+                    dist[nxt] = next_dist
+                    hop[nxt] = code
+                    nearest[nxt] = nearest[cell]
+                    heapq.heappush(heap, (next_dist, nxt))
+
+        dropped = self._drop_routes(changed.union(opened, closed))
+        return {
+            'opened': len(opened),
+            'closed': len(closed),
+            'invalidated': len(removed),
+            'repaired': repaired,
+            'routes_dropped': dropped,
+            'seconds': time.perf_counter() - started,
+        }
+
+    def _drop_routes(self, cells):
+        # 바뀐 셀에 의존하던 저장 경로를 지운다
+        stale = [start for start, (_, depends) in self._routes.items()
+                 if not depends.isdisjoint(cells)]
+        for start in stale:
+            del self._routes[start]
+        return len(stale)
+
+    def route(self, x, y):
+        """(x, y) 에서 가장 가까운 카페까지의 경로 (저장해 두고 변경이 닿을 때만 다시 만든다)"""
+        key = (int(x), int(y))
+        if key in self._routes:
+            return self._routes[key][0]
+        path = self.field.route(*key)
+        grid = self.grid
+        depends = set()
+        if grid.in_bounds(*key):
+            # 출발 칸이 막혀 있으면 이웃 중 가까운 곳을 고르므로 이웃에도 의존한다
+            start_cell = grid.cell_id(*key)
+            depends.add(start_cell)
+            depends.update(cell for cell, _ in self._adjacent(start_cell))
+        if path:
+            depends.update(grid.cell_id(px, py) for px, py in path)
+        self._routes[key] = (path, depends)
+        return path
+
+    def distance(self, x, y):
+        """(x, y) 에서 가장 가까운 카페까지의 거리 (도달 불가면 None)"""
+        return self.field.distance(x, y)
+
+
+def read_changes(filename):
+    """area_map.csv 와 같은 x, y, ConstructionSite 형식의 변경 파일을 읽는 함수"""
+    with open(filename, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        indexes = [header.index(name) for name in ('x', 'y', 'ConstructionSite')]
+        return [tuple(int(row[i]) for i in indexes) for row in reader if row]
+
+
+def random_changes(grid, count, seed=0):
+    """벤치마크용으로 임의의 칸 count 개의 건설현장 여부를 뒤집는 변경 목록을 만드는 함수"""
+    rng = random.Random(seed)
+    changes = []
+    for _ in range(count):
+        x = rng.randint(grid.min_x, grid.max_x)
+        y = rng.randint(grid.min_y, grid.max_y)
+        changes.append((x, y, 1 if grid.is_passable(x, y) else 0))
+    return changes
+
+
+def main():
+    """건설현장 변경을 부분 반영한 시간과 전체 재계산 시간을 비교하는 함수 (결과가 같으면 True)"""
+    parser = argparse.ArgumentParser(description='건설현장 변경 후 경로 부분 재계산')
+    parser.add_argument('changes', nargs='?', help='x, y, ConstructionSite 변경 CSV (없으면 임의 변경)')
+    parser.add_argument('-n', '--count', type=int, default=5, help='임의 변경 칸 수')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        from map_context import MapContext
+        context = MapContext()
+        poi = context.poi
+        coffee_shops = poi.positions('BandalgomCoffee')
+        if not coffee_shops:
+            raise ValueError("반달곰 커피 위치를 찾을 수 없습니다.")
+        homes = poi.positions('MyHome')
+
+        grid = context.grid
+        dynamic = DynamicField(DistanceField.build(grid, coffee_shops))
+        before = {home: dynamic.distance(*home) for home in homes}
+        for home in homes:
+            dynamic.route(*home)
+
+        changes = read_changes(args.changes) if args.changes else \
+            random_changes(grid, args.count, args.seed)
+        stats = dynamic.apply_changes(changes)
+
+        started = time.perf_counter()
+        rebuilt = DistanceField.build(grid, coffee_shops)
+        full = time.perf_counter() - started
+
+        print(f"변경 {stats['opened']}칸 열림, {stats['closed']}칸 막힘 -> "
+              f"{stats['invalidated']}칸 무효화, {stats['repaired']}칸 재계산, "
+              f"저장 경로 {stats['routes_dropped']}개 갱신")
+        print(f"부분 재계산 {stats['seconds'] * 1000:.2f} ms / 전체 재계산 {full * 1000:.2f} ms")
+        ok = True
+        for home in homes:
+            after = dynamic.distance(*home)
+            expected = rebuilt.distance(*home)
+            print(f"  집 {home}: {before[home]} -> {after} 단계")
+            # python -O 에서도 빠지지 않도록 assert 대신 직접 비교한다
+            if after != expected:
+                ok = False
+                print(f"  ❌ 부분 재계산 결과가 전체 재계산과 다릅니다: {after} != {expected}")
+        return ok
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
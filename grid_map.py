@@ -0,0 +1,118 @@
+# grid_map.py
+
+import numpy as np
+
+# 구조물 코드 (area_category.csv 의 category 값, 0은 빈 칸)
+EMPTY = 0
+
+
+class GridMap:
+    """merge_data 결과로부터 한 번만 만들어 두는 점유 격자
+
+    배열은 (행=y, 열=x) 순서이며 셀 번호는 (y - min_y) * width + (x - min_x) 이다.
+    이동 가능 여부와 구조물 코드는 모두 O(1)로 조회한다.
+    """
+
+    def __init__(self, min_x, min_y, passable, struct_code, struct_names=None):
+        self.min_x = int(min_x)
+        self.min_y = int(min_y)
+        self.height, self.width = passable.shape
+        self.max_x = self.min_x + self.width - 1
+        self.max_y = self.min_y + self.height - 1
+        self.passable = passable
+        self.struct_code = struct_code
+        self.struct_names = dict(struct_names or {})
+        # 파이썬 반복문에서 빠르게 조회하기 위한 평탄화된 복사본
+        self._open = bytearray(passable.ravel().tobytes())
+
+    @classmethod
+    def from_merged(cls, merged_data):
+        """merge_data 로 만든 DataFrame 으로부터 격자를 만드는 함수"""
+        xs = merged_data['x'].to_numpy(dtype=np.int64)
+        ys = merged_data['y'].to_numpy(dtype=np.int64)
+        min_x, max_x = int(xs.min()), int(xs.max())
+        min_y, max_y = int(ys.min()), int(ys.max())
+        cols = xs - min_x
+        rows = ys - min_y
+        shape = (max_y - min_y + 1, max_x - min_x + 1)
+
+        # 데이터에 없는 칸은 기존 is_valid_position 과 같이 이동 가능으로 본다
+        passable = np.ones(shape, dtype=np.uint8)
+        construction = merged_data['ConstructionSite'].to_numpy()
+        passable[rows, cols] = np.where(construction == 1, 0, 1)
+
+        struct_code = np.full(shape, EMPTY, dtype=np.uint8)
+        category = merged_data['category'].fillna(EMPTY).to_numpy(dtype=np.int64)
+        struct_code[rows, cols] = category
+
+        struct_names = {}
+        if 'struct' in merged_data.columns:
+            named = merged_data.loc[category != EMPTY, ['category', 'struct']]
+            for code, name in named.drop_duplicates('category').itertuples(index=False):
+                struct_names[int(code)] = str(name)
+
+        return cls(min_x, min_y, passable, struct_code, struct_names)
+
+    @property
+    def size(self):
+        """전체 셀 개수"""
+        return self.width * self.height
+
+    def in_bounds(self, x, y):
+        """지도 범위 안인지 확인하는 함수"""
+        return self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y
+
+    def cell_id(self, x, y):
+        """좌표를 셀 번호로 바꾸는 함수 (범위 확인은 하지 않음)"""
+        # 작은 정수 dtype(int16 등)으로 들어와도 넘치지 않도록 파이썬 int 로 계산
+        return (int(y) - self.min_y) * self.width + (int(x) - self.min_x)
+
+    def cell_xy(self, cell):
+        """셀 번호를 좌표로 바꾸는 함수"""
+        row, col = divmod(cell, self.width)
+        return (col + self.min_x, row + self.min_y)
+
+    def is_passable(self, x, y):
+        """해당 위치가 이동 가능한지 확인하는 함수"""
+        if not self.in_bounds(x, y):
+            return False
+        return self._open[self.cell_id(x, y)] == 1
+
+    def set_passable(self, x, y, value):
+        """해당 위치의 이동 가능 여부를 바꾸는 함수"""
+        self.passable[y - self.min_y, x - self.min_x] = 1 if value else 0
+        self._open[self.cell_id(x, y)] = 1 if value else 0
+
+    def struct_at(self, x, y):
+        """해당 위치의 구조물 코드를 돌려주는 함수 (범위 밖이면 None)"""
+        if not self.in_bounds(x, y):
+            return None
+        return int(self.struct_code[y - self.min_y, x - self.min_x])
+
+    def struct_name_at(self, x, y):
+        """해당 위치의 구조물 이름을 돌려주는 함수"""
+        code = self.struct_at(x, y)
+        if code is None or code == EMPTY:
+            return None
+        return self.struct_names.get(code)
+
+    def neighbor_cells(self, cell):
+        """상하좌우로 이동 가능한 이웃 셀 번호들을 돌려주는 함수"""
+        row, col = divmod(cell, self.width)
+        opened = self._open
+        # 기존 BFS 와 같은 순서: (0, 1), (0, -1), (1, 0), (-1, 0)
+        if row + 1 < self.height and opened[cell + self.width]:
+            yield cell + self.width
+        if row > 0 and opened[cell - self.width]:
+            yield cell - self.width
+        if col + 1 < self.width and opened[cell + 1]:
+            yield cell + 1
+        if col > 0 and opened[cell - 1]:
+            yield cell - 1
+
+
+def as_grid_map(data):
+    """DataFrame 이 들어오면 GridMap 으로 바꾸고, 이미 GridMap 이면 그대로 돌려주는 함수"""
+    if isinstance(data, GridMap):
+        return data
+    return GridMap.from_merged(data)
@@ -0,0 +1,447 @@
+# hierarchical_route.py
+
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+from collections import deque
+import numpy as np
+from grid_map import as_grid_map
+from path_search import SearchStats, _manhattan_to_goals, bfs_search, goal_cells
+import instrument
+
+# 클러스터 한 변의 칸 수
+DEFAULT_CLUSTER_SIZE = 16
+# 경계에서 이어진 출입 구간이 이 길이 이상이면 양 끝에 두 개, 짧으면 가운데 하나의 출입구를 둔다
+ENTRANCE_SPLIT = 6
+# 클러스터 한 행을 uint64 비트로 묶으므로 클러스터 한 변은 64칸까지
+MAX_CLUSTER_SIZE = 64
+# 클러스터 안 거리 계산에서 한 번에 쌓는 (클러스터 x 노드 x 행) 배열 크기
+INTRA_BATCH_ROWS = 1 << 20
+
+
+class HierarchicalMap:
+    """격자를 정사각형 클러스터로 나눈 HPA* 방식의 추상 그래프
+
+    이웃 클러스터 경계에서 양쪽 칸이 모두 열린 구간마다 출입구 노드를 두고,
+    같은 클러스터 안의 노드 사이 거리는 클러스터 안에서만 BFS 해 미리 구해 둔다.
+    질의는 작은 추상 그래프에서 풀고, 노드 사이 구간만 클러스터 안에서
+    다시 찾아 칸 단위 경로로 펼친다. 경로는 정확한 최단 경로보다 조금 길 수 있다.
+    격자의 이동 가능 여부가 바뀌면 다시 만들어야 한다.
+    """
+
+    def __init__(self, area_data, cluster_size=DEFAULT_CLUSTER_SIZE):
+        if not 2 <= cluster_size <= MAX_CLUSTER_SIZE:
+            raise ValueError(f"클러스터 크기는 2 ~ {MAX_CLUSTER_SIZE} 사이여야 합니다: {cluster_size}")
+        self.grid = as_grid_map(area_data)
+        self.cluster_size = cluster_size
+        self.cluster_cols = -(-self.grid.width // cluster_size)
+        self.cluster_rows = -(-self.grid.height // cluster_size)
+        self.node_cell = []                 # 노드 번호 -> 셀 번호
+        self.edges = []                     # 노드 번호 -> {이웃 노드: 거리}
+        self.cluster_nodes = {}             # 클러스터 번호 -> 노드 번호 목록
+        self._node_of = {}                  # 셀 번호 -> 노드 번호
+        self._build_entrances()
+        self._build_intra_edges()
+
+    @property
+    def edge_count(self):
+        return sum(len(edges) for edges in self.edges) // 2
+
+    def cluster_of(self, cell):
+        row, col = divmod(cell, self.grid.width)
+        return (row // self.cluster_size) * self.cluster_cols + col // self.cluster_size
+
+    def _bounds(self, cluster):
+        """클러스터의 (첫 행, 첫 열, 마지막 행, 마지막 열)"""
+        cluster_row, cluster_col = divmod(cluster, self.cluster_cols)
+        row0, col0 = cluster_row * self.cluster_size, cluster_col * self.cluster_size
+        return (row0, col0, min(row0 + self.cluster_size, self.grid.height) - 1,
+                min(col0 + self.cluster_size, self.grid.width) - 1)
+
+    def _node(self, cell):
+        node = self._node_of.get(cell)
+        if node is None:
+            node = len(self.node_cell)
+            self._node_of[cell] = node
+            self.node_cell.append(cell)
+            self.edges.append({})
+            self.cluster_nodes.setdefault(self.cluster_of(cell), []).append(node)
+        return node
+
+    def _link(self, a, b, distance):
+        if distance < self.edges[a].get(b, distance + 1):
+            self.edges[a][b] = distance
+            self.edges[b][a] = distance
+
+    def _add_transitions(self, both_open, first_cell, stride, step):
+        """경계를 따라 양쪽이 모두 열린 구간마다 출입구 노드 쌍을 잇는 함수
+
+        both_open[i] 는 경계 안쪽 칸 first_cell + i * stride 와 건너편 칸
+        (+ step) 이 모두 열려 있는지이며, 구간은 클러스터 경계에서 끊는다.
+        """
+        cs = self.cluster_size
+        length = len(both_open)
+        for begin in range(0, length, cs):
+            segment = both_open[begin:begin + cs]
+            edges = np.flatnonzero(np.diff(np.r_[0, segment, 0]))
+            for run_start, run_end in zip(edges[::2], edges[1::2] - 1):
+                if run_end - run_start + 1 >= ENTRANCE_SPLIT:
+                    picks = (run_start, run_end)
+                else:
+                    picks = ((run_start + run_end) // 2,)
+                for i in picks:
+                    cell = first_cell + (begin + int(i)) * stride
+                    self._link(self._node(cell), self._node(cell + step), 1)
+
+    def _build_entrances(self):
+        passable = np.asarray(self.grid.passable, dtype=bool)
+        width, cs = self.grid.width, self.cluster_size
+        # 세로 경계 (왼쪽 클러스터의 마지막 열과 오른쪽 클러스터의 첫 열)
+        for col in range(cs, width, cs):
+            both = (passable[:, col - 1] & passable[:, col]).astype(np.int8)
+            self._add_transitions(both, col - 1, width, 1)
+        # 가로 경계 (위 클러스터의 마지막 행과 아래 클러스터의 첫 행)
+        for row in range(cs, self.grid.height, cs):
+            both = (passable[row - 1, :] & passable[row, :]).astype(np.int8)
+            self._add_transitions(both, (row - 1) * width, 1, width)
+
+    def _build_intra_edges(self):
+        """같은 클러스터 안의 모든 노드 쌍 거리를 비트 배열 BFS 로 한꺼번에 구하는 함수
+
+        클러스터의 한 행을 uint64 하나의 비트로 묶고 (클러스터, 출발 노드) 마다
+        한 층씩 쌓아 모든 BFS 를 같은 단계씩 함께 넓힌다. 거리는 노드 칸에서만
+        읽는다. 메모리를 넘지 않도록 노드 수가 비슷한 클러스터끼리
+        INTRA_BATCH_ROWS 행 단위로 나눠 처리한다.
+        """
+        cs = self.cluster_size
+        grid = self.grid
+        padded = np.zeros((self.cluster_rows * cs, self.cluster_cols * cs), dtype=bool)
+        padded[:grid.height, :grid.width] = np.asarray(grid.passable, dtype=bool)
+        blocks = (padded.reshape(self.cluster_rows, cs, self.cluster_cols, cs)
+                  .swapaxes(1, 2).reshape(-1, cs, cs))
+        # 열 c 를 비트 c 로 (클러스터, 행) 마다 uint64 하나
+        weights = np.left_shift(np.uint64(1), np.arange(cs, dtype=np.uint64))
+        bits = (blocks.astype(np.uint64) * weights).sum(axis=2, dtype=np.uint64)
+
+        clusters = sorted((c for c, nodes in self.cluster_nodes.items() if len(nodes) > 1),
+                          key=lambda c: len(self.cluster_nodes[c]))
+        begin = 0
+        while begin < len(clusters):
+            end = begin + 1
+            # 노드 수 오름차순이므로 마지막 클러스터의 노드 수가 이 묶음의 층 수이다
+            while (end < len(clusters) and (end - begin + 1)
+                   * len(self.cluster_nodes[clusters[end]]) * cs <= INTRA_BATCH_ROWS):
+                end += 1
+            self._intra_batch(bits, clusters[begin:end])
+            begin = end
+
+    def _intra_batch(self, bits, clusters):
+        cs, width = self.cluster_size, self.grid.width
+        count = len(clusters)
+        layers = max(len(self.cluster_nodes[c]) for c in clusters)
+        rows = np.zeros((count, layers), dtype=np.intp)
+        cols = np.zeros((count, layers), dtype=np.uint64)
+        valid = np.zeros((count, layers), dtype=bool)
+        for a, cluster in enumerate(clusters):
+            for b, node in enumerate(self.cluster_nodes[cluster]):
+                row, col = divmod(self.node_cell[node], width)
+                rows[a, b], cols[a, b], valid[a, b] = row % cs, col % cs, True
+
+        one = np.uint64(1)
+        passable = bits[clusters][:, None, :]
+        frontier = np.zeros((count, layers, cs), dtype=np.uint64)
+        seed_a, seed_b = np.nonzero(valid)
+        frontier[seed_a, seed_b, rows[seed_a, seed_b]] = np.left_shift(one, cols[seed_a, seed_b])
+        visited = frontier.copy()
+
+        # pairs[a, i, j] = 클러스터 a 에서 노드 i 부터 노드 j 까지의 거리 (-1 은 아직 못 닿음)
+        pairs = np.full((count, layers, layers), -1, dtype=np.int32)
+        at_a = np.arange(count)[:, None, None]
+        at_i = np.arange(layers)[None, :, None]
+        at_row = rows[:, None, :]
+        at_col = np.broadcast_to(cols[:, None, :], pairs.shape)
+        level = 0
+        while True:
+            reached = ((visited[at_a, at_i, at_row] >> at_col) & one).astype(bool)
+            pairs[reached & (pairs < 0)] = level
+            if not frontier.any():
+                break
+            level += 1
+            grown = (frontier << one) | (frontier >> one)
+            grown[:, :, 1:] |= frontier[:, :, :-1]
+            grown[:, :, :-1] |= frontier[:, :, 1:]
+            grown &= passable
+            grown &= ~visited
+            visited |= grown
+            frontier = grown
+
+        keep = (valid[:, :, None] & valid[:, None, :] & (pairs >= 0)
+                & np.triu(np.ones((layers, layers), dtype=bool), 1))
+        for a, i, j in zip(*np.nonzero(keep)):
+            nodes = self.cluster_nodes[clusters[a]]
+            self._link(nodes[i], nodes[j], int(pairs[a, i, j]))
+
+    def _cluster_bfs(self, cluster, source, targets, parents=False, stats=None):
+        """클러스터 안에서만 움직이는 BFS (모든 targets 를 찾으면 멈춘다)
+
+        (셀 -> 거리 dict, 셀 -> 선행 셀 dict 또는 None) 을 돌려준다.
+        출발 칸이 막혀 있어도 기존 BFS 와 같이 열린 이웃으로 나갈 수 있다.
+        """
+        row0, col0, row1, col1 = self._bounds(cluster)
+        width, opened = self.grid.width, self.grid._open
+        dist = {source: 0}
+        parent = {source: None} if parents else None
+        remaining = len(targets) - (source in targets)
+        queue = deque([source])
+        while queue and remaining > 0:
+            cell = queue.popleft()
+            if stats is not None:
+                stats.expanded += 1
+            row, col = divmod(cell, width)
+            next_dist = dist[cell] + 1
+            # 기존 BFS 와 같은 이웃 순서: (0, 1), (0, -1), (1, 0), (-1, 0)
+            for nxt, inside in ((cell + width, row < row1), (cell - width, row > row0),
+                                (cell + 1, col < col1), (cell - 1, col > col0)):
+                if not inside or not opened[nxt] or nxt in dist:
+                    continue
+                dist[nxt] = next_dist
+                if parents:
+                    parent[nxt] = cell
+                if nxt in targets:
+                    remaining -= 1
+                queue.append(nxt)
+        if stats is not None:
+            stats.visited += len(dist)
+        return dist, parent
+
+    def _local_path(self, source, target, stats):
+        """같은 클러스터 안의 두 칸 사이 경로 (셀 번호 목록, source 제외)"""
+        _, parent = self._cluster_bfs(self.cluster_of(target), source, {target}, True, stats)
+        cells = []
+        cell = target
+        while cell != source:
+            cells.append(cell)
+            cell = parent[cell]
+        cells.reverse()
+        return cells
+
+    def find_path(self, start, goals):
+        """추상 그래프에서 가장 가까운 목표를 찾고 칸 단위 경로로 펼치는 함수
+
+        (경로 또는 None, 통계) 를 돌려주며 통계의 expanded 에는 추상 노드 확장 수와
+        클러스터 안 BFS 에서 확장한 칸 수가 함께 들어간다.
+        """
+        grid = self.grid
+        stats = SearchStats()
+        if not grid.in_bounds(*start):
+            return None, stats
+        start_cell = grid.cell_id(*start)
+        targets = goal_cells(grid, goals)
+        stats.visited = 1
+        if start_cell in targets:
+            return [tuple(start)], stats
+        # 막힌 목표에는 도달할 수 없다
+        targets = {cell for cell in targets if grid._open[cell]}
+        if not targets:
+            return None, stats
+
+        # 출발 칸을 같은 클러스터의 노드와 목표에 임시로 잇는다. 막힌 출발 칸은
+        # 첫 걸음에 이웃 클러스터로 나갈 수도 있으므로 그 이웃에서도 잇는다
+        # (entry: 셀 -> (거리, 클러스터 안 BFS 를 시작한 칸))
+        seeds = [(start_cell, 0)]
+        if not grid._open[start_cell]:
+            seeds += [(cell, 1) for cell in grid.neighbor_cells(start_cell)
+                      if self.cluster_of(cell) != self.cluster_of(start_cell)]
+        entry = {}
+        nodes = []
+        for seed, offset in seeds:
+            cluster = self.cluster_of(seed)
+            here = self.cluster_nodes.get(cluster, [])
+            nodes += here
+            local = {self.node_cell[node] for node in here}
+            local |= {cell for cell in targets if self.cluster_of(cell) == cluster}
+            dist, _ = self._cluster_bfs(cluster, seed, local, stats=stats)
+            for cell in local:
+                d = dist.get(cell)
+                if d is not None and (cell not in entry or d + offset < entry[cell][0]):
+                    entry[cell] = (d + offset, seed)
+
+        best, best_goal, best_node = None, None, None
+        for cell in targets:
+            if cell in entry and (best is None or entry[cell][0] < best):
+                best, best_goal = entry[cell][0], cell
+
+        # 목표를 각 클러스터의 노드에 임시로 잇는다 (무방향이므로 목표에서 BFS 한다)
+        goal_links = {}
+        by_cluster = {}
+        for cell in targets:
+            by_cluster.setdefault(self.cluster_of(cell), []).append(cell)
+        for cluster, cells in by_cluster.items():
+            nodes_here = self.cluster_nodes.get(cluster, [])
+            node_cells = {self.node_cell[node] for node in nodes_here}
+            for cell in cells:
+                goal_dist, _ = self._cluster_bfs(cluster, cell, node_cells, stats=stats)
+                for node in nodes_here:
+                    d = goal_dist.get(self.node_cell[node])
+                    if d is not None:
+                        goal_links.setdefault(node, []).append((d, cell))
+
+        # 추상 그래프에서 맨해튼 하한을 쓰는 A* (다음 f 가 지금까지의 최선 이상이면 멈춘다)
+        heuristic = _manhattan_to_goals(grid, targets)
+        distance = {}
+        previous = {}
+        heap = []
+        for node in set(nodes):
+            d, _ = entry.get(self.node_cell[node], (None, None))
+            if d is not None:
+                distance[node] = d
+                previous[node] = None
+                heapq.heappush(heap, (d + heuristic(self.node_cell[node]), d, node))
+        closed = set()
+        while heap:
+            f, d, node = heapq.heappop(heap)
+            if node in closed or d > distance[node]:
+                continue
+            if best is not None and f >= best:
+                break
+            closed.add(node)
+            stats.expanded += 1
+            for goal_distance, cell in goal_links.get(node, ()):
+                if best is None or d + goal_distance < best:
+                    best, best_goal, best_node = d + goal_distance, cell, node
+            for nxt, weight in self.edges[node].items():
+                next_d = d + weight
+                if nxt not in closed and next_d < distance.get(nxt, next_d + 1):
+                    distance[nxt] = next_d
+                    previous[nxt] = node
+                    heapq.heappush(heap, (next_d + heuristic(self.node_cell[nxt]), next_d, nxt))
+            if len(heap) > stats.frontier_peak:
+                stats.frontier_peak = len(heap)
+
+        if best is None:
+            return None, stats
+
+        # 출발 칸 -> 노드들 -> 목표 순서로 구간마다 클러스터 안 경로를 펼친다
+        chain = []
+        node = best_node
+        while node is not None:
+            chain.append(self.node_cell[node])
+            node = previous[node]
+        chain.reverse()
+        chain.append(best_goal)
+
+        # 이웃 클러스터에서 시작했으면 그 이웃 칸으로 먼저 한 걸음 나간다
+        cells = [start_cell]
+        seed = entry[chain[0]][1]
+        if seed != start_cell:
+            cells.append(seed)
+        for target in chain:
+            source = cells[-1]
+            if source == target:
+                continue
+            if self.cluster_of(source) != self.cluster_of(target):
+                cells.append(target)            # 경계를 건너는 한 칸
+            else:
+                cells.extend(self._local_path(source, target, stats))
+        return [grid.cell_xy(cell) for cell in cells], stats
+
+
+def random_queries(grid, count, seed=0):
+    """서로 다른 이동 가능 칸 (출발, 도착) 쌍을 count 개 고르는 함수"""
+    open_cells = np.flatnonzero(np.asarray(grid.passable).ravel())
+    if len(open_cells) < 2:
+        return []
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        a, b = rng.sample(range(len(open_cells)), 2)
+        queries.append((grid.cell_xy(int(open_cells[a])), grid.cell_xy(int(open_cells[b]))))
+    return queries
+
+
+def compare(area_data, queries, cluster_size=DEFAULT_CLUSTER_SIZE):
+    """같은 질의를 정확한 BFS 와 계층 탐색으로 풀어 경로 길이와 시간을 비교하는 함수"""
+    grid = as_grid_map(area_data)
+    started = time.perf_counter()
+    with instrument.span('hierarchy_build', cluster_size=cluster_size):
+        hierarchy = HierarchicalMap(grid, cluster_size)
+    build = time.perf_counter() - started
+
+    report = {'cluster_size': cluster_size, 'build_seconds': build,
+              'nodes': len(hierarchy.node_cell), 'edges': hierarchy.edge_count,
+              'queries': len(queries), 'found': 0, 'mismatched': 0, 'optimal': 0,
+              'exact_seconds': 0.0, 'hierarchical_seconds': 0.0,
+              'exact_expanded': 0, 'hierarchical_expanded': 0, 'ratios': []}
+    for start, goal in queries:
+        started = time.perf_counter()
+        exact, exact_stats = bfs_search(grid, start, [goal])
+        report['exact_seconds'] += time.perf_counter() - started
+        started = time.perf_counter()
+        path, stats = hierarchy.find_path(start, [goal])
+        report['hierarchical_seconds'] += time.perf_counter() - started
+        report['exact_expanded'] += exact_stats.expanded
+        report['hierarchical_expanded'] += stats.expanded
+
+        if (exact is None) != (path is None):
+            report['mismatched'] += 1
+        elif exact:
+            report['found'] += 1
+            ratio = (len(path) - 1) / max(len(exact) - 1, 1)
+            report['ratios'].append(ratio)
+            report['optimal'] += len(path) == len(exact)
+    return report
+
+
+def print_comparison(report):
+    ratios = report['ratios']
+    print(f"클러스터 {report['cluster_size']}x{report['cluster_size']}: "
+          f"노드 {report['nodes']}개, 간선 {report['edges']}개, "
+          f"만들기 {report['build_seconds'] * 1000:.1f} ms")
+    print(f"질의 {report['queries']}개 중 경로 {report['found']}개, "
+          f"도달 여부 불일치 {report['mismatched']}개")
+    if ratios:
+        print(f"경로 길이 (계층 / 정확): 평균 {np.mean(ratios):.3f}, 최대 {max(ratios):.3f}, "
+              f"최단과 같음 {report['optimal']}개")
+    exact, hierarchical = report['exact_seconds'], report['hierarchical_seconds']
+    print(f"정확한 BFS  : {exact * 1000:9.1f} ms, 확장 {report['exact_expanded']}개")
+    print(f"계층 탐색   : {hierarchical * 1000:9.1f} ms, 확장 {report['hierarchical_expanded']}개")
+    if hierarchical:
+        print(f"속도 향상   : {exact / hierarchical:.1f}x "
+              f"(만들기 포함 {exact / (hierarchical + report['build_seconds']):.1f}x)")
+
+
+def main():
+    """계층 탐색의 경로 품질과 속도를 정확한 BFS 와 비교하는 명령 (오류가 나면 False)"""
+    from map_context import MapContext
+    parser = argparse.ArgumentParser(description='계층(HPA*) 경로 탐색과 정확한 BFS 비교')
+    parser.add_argument('--size', type=int, help='이 크기의 가상 지도로 비교 (없으면 data 폴더 지도)')
+    parser.add_argument('--construction', type=float, default=0.2, help='가상 지도의 건설현장 비율')
+    parser.add_argument('--cluster-size', type=int, default=DEFAULT_CLUSTER_SIZE)
+    parser.add_argument('-n', '--queries', type=int, default=50, help='임의 (출발, 도착) 질의 수')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default='bench', help='가상 지도를 저장할 폴더')
+    args = parser.parse_args()
+
+    try:
+        if args.size:
+            from benchmark import generate_map
+            folder = os.path.join(args.workdir, f"map_{args.size}")
+            paths = generate_map(folder, args.size, args.construction, seed=args.seed)
+            context = MapContext(*paths, cache_path=os.path.join(folder, 'map.bin'))
+        else:
+            context = MapContext()
+        grid = context.grid
+        queries = random_queries(grid, args.queries, args.seed)
+        print_comparison(compare(grid, queries, args.cluster_size))
+        return True
+    except Exception as e:
+        instrument.record_error('hierarchical_route.main', e)
+        print(f"오류가 발생했습니다: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,202 @@
+# instrument.py
+
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+import traceback
+import tracemalloc
+from contextlib import contextmanager
+
+
+# 꺼져 있을 때 span() 이 돌려주는 아무 일도 하지 않는 컨텍스트
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+# 켜져 있을 때만 Tracer 객체 (꺼져 있으면 None 확인 한 번으로 끝난다)
+_tracer = None
+
+
+class _Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def set(self, **args):
+        """구간이 끝날 때 함께 기록할 값을 추가하는 함수"""
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.add_span(self.name, self.started, time.perf_counter(), self.args)
+        return False
+
+
+class Tracer:
+    """시간 구간(span)과 카운터를 모아 Chrome trace 형식으로 내보내는 객체"""
+
+    def __init__(self, profile_dir=None, memory=False):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        self.profile_dir = profile_dir
+        self.memory = memory
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _ts(self, moment):
+        # Chrome trace 의 시간 단위는 마이크로초
+        return (moment - self.origin) * 1e6
+
+    def add_span(self, name, started, ended, args):
+        event = {'name': name, 'ph': 'X', 'ts': self._ts(started),
+                 'dur': (ended - started) * 1e6, 'pid': self.pid,
+                 'tid': threading.get_ident(), 'args': args}
+        with self._lock:
+            self.events.append(event)
+
+    def add_count(self, name, value):
+        now = self._ts(time.perf_counter())
+        with self._lock:
+            total = self.counters.get(name, 0) + value
+            self.counters[name] = total
+            self.events.append({'name': name, 'ph': 'C', 'ts': now, 'pid': self.pid,
+                                'args': {name: total}})
+
+    def add_error(self, where, exc):
+        with self._lock:
+            self.events.append({
+                'name': f"error: {where}", 'ph': 'i', 's': 'p',
+                'ts': self._ts(time.perf_counter()), 'pid': self.pid,
+                'tid': threading.get_ident(),
+                'args': {
+                    'error': f"{type(exc).__name__}: {exc}",
+                    'traceback': ''.join(traceback.format_exception(
+                        type(exc), exc, exc.__traceback__)),
+                },
+            })
+
+    def export(self, path):
+        """Chrome(chrome://tracing, Perfetto) 에서 열 수 있는 JSON 파일로 저장하는 함수"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms',
+                       'otherData': {'counters': self.counters}}, f, ensure_ascii=False)
+
+    def summary(self):
+        """구간 이름별 (횟수, 총 시간 ms) 와 카운터 합계"""
+        spans = {}
+        for event in self.events:
+            if event['ph'] == 'X':
+                calls, total = spans.get(event['name'], (0, 0.0))
+                spans[event['name']] = (calls + 1, total + event['dur'] / 1000)
+        return {'spans': spans, 'counters': dict(self.counters)}
+
+
+def enable(profile_dir=None, memory=False):
+    """계측을 켜는 함수 (profile_dir 를 주면 단계별 cProfile, memory=True 면 tracemalloc)"""
+    global _tracer
+    _tracer = Tracer(profile_dir, memory)
+    return _tracer
+
+
+def disable():
+    """계측을 끄고 모은 Tracer 를 돌려주는 함수"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **args):
+    """with 블록을 name 구간으로 기록하는 함수 (꺼져 있으면 아무 일도 하지 않는다)"""
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args)
+
+
+def count(name, value=1):
+    """카운터 name 에 value 를 더하는 함수 (꺼져 있으면 아무 일도 하지 않는다)"""
+    if _tracer is not None:
+        _tracer.add_count(name, value)
+
+
+def record_error(where, exc):
+    """삼켜지는 예외를 추적 파일에 남기는 함수 (꺼져 있으면 아무 일도 하지 않는다)"""
+    if _tracer is not None:
+        _tracer.add_error(where, exc)
+
+
+def count_search(stats):
+    """SearchStats 의 확장 노드 수, 방문 셀 수를 카운터에 더하는 함수"""
+    if _tracer is not None:
+        _tracer.add_count('nodes_expanded', stats.expanded)
+        _tracer.add_count('cells_visited', stats.visited)
+
+
+def traced(name):
+    """함수 호출 전체를 name 구간으로 기록하는 데코레이터 (꺼져 있으면 확인 한 번만 한다)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _Span(_tracer, name, {'function': func.__qualname__}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+@contextmanager
+def stage(name):
+    """단계 하나를 구간으로 기록하고, 설정에 따라 cProfile / tracemalloc 도 함께 재는 함수"""
+    tracer = _tracer
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+
+    profiler = None
+    if tracer.profile_dir:
+        profiler = cProfile.Profile()
+    started_memory = tracer.memory and not tracemalloc.is_tracing()
+    if started_memory:
+        tracemalloc.start()
+
+    with _Span(tracer, name, {}) as current:
+        if profiler:
+            profiler.enable()
+        try:
+            yield current
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(tracer.profile_dir, exist_ok=True)
+                profile_path = os.path.join(tracer.profile_dir, f"{name}.prof")
+                profiler.dump_stats(profile_path)
+                current.set(profile=profile_path)
+            if started_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                current.set(peak_bytes=peak)
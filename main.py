@@ -4,8 +4,30 @@
 메인 프로그램 - CLI 인터페이스
 """
 
+import time
+# --timing 으로 보여 줄 시작 시각 (다른 모듈을 불러오기 전에 잰다)
+STARTED = time.perf_counter()
+
+import argparse
+import importlib.util
 import sys
 import os
+import instrument
+from render_backend import HEADLESS_ENV
+
+# 단계별로 필요한 라이브러리 (확인만 하고 실제로 불러오는 것은 단계 안에서)
+STAGE_DEPENDENCIES = {
+    'analyze': ['numpy', 'pandas'],
+    'draw': ['numpy', 'pandas', 'matplotlib'],
+    'route': ['numpy', 'pandas', 'matplotlib'],
+    'all': ['numpy', 'pandas', 'matplotlib'],
+}
+# --timing 에서 이미 불러왔는지 알려 줄 무거운 라이브러리
+HEAVY_MODULES = ['numpy', 'pandas', 'matplotlib', 'matplotlib.pyplot']
+# map_direct_save.MODES 와 같은 이름
+ROUTE_MODES = ['shortest', 'nearest', 'weighted', 'field', 'tour']
+# path_search.SEARCH_BACKENDS 의 이름 (옵션 확인에 numpy 를 불러오지 않도록 따로 적어 둔다)
+ROUTE_ALGORITHMS = ['bfs', 'astar', 'bidirectional', 'jps']
 
 
 def print_menu():
@@ -21,73 +43,102 @@ def print_menu():
     print("="*60)
 
 
-def run_stage_1():
-    """1단계: 데이터 수집 및 분석 실행"""
+def run_stage_1(context=None, verbose=True, json_path=None):
+    """1단계: 데이터 수집 및 분석 실행 (성공하면 True)"""
     print("\n🔍 1단계: 데이터 수집 및 분석을 실행합니다...")
     try:
         import caffee_map
-        caffee_map.main()
+        with instrument.stage('stage1'):
+            # 오류는 caffee_map.main 이 출력하고 (None, None) 을 돌려준다
+            merged_data, _ = caffee_map.main(context, verbose, json_path)
+        if merged_data is None:
+            print("❌ 1단계를 완료하지 못했습니다.")
+            return False
         print("✅ 1단계가 성공적으로 완료되었습니다.")
+        return True
     except ImportError:
         print("❌ caffee_map.py 파일이 없습니다.")
     except Exception as e:
+        instrument.record_error('stage1', e)
         print(f"❌ 1단계 실행 중 오류가 발생했습니다: {e}")
+    return False
 
 
-def run_stage_2():
-    """2단계: 지도 시각화 실행"""
+def run_stage_2(context=None, fast_render=False):
+    """2단계: 지도 시각화 실행 (성공하면 True)"""
     print("\n🗺️  2단계: 지도 시각화를 실행합니다...")
     try:
         import map_draw
-        map_draw.main()
+        with instrument.stage('stage2'):
+            # 오류는 map_draw.main 이 출력하고 None 을 돌려준다
+            area_1_data = map_draw.main(context, fast_render)
+        if area_1_data is None:
+            print("❌ 2단계를 완료하지 못했습니다.")
+            return False
         print("✅ 2단계가 성공적으로 완료되었습니다.")
+        return True
     except ImportError:
         print("❌ map_draw.py 파일이 없습니다.")
     except Exception as e:
+        instrument.record_error('stage2', e)
         print(f"❌ 2단계 실행 중 오류가 발생했습니다: {e}")
+    return False
 
 
-def run_stage_3():
-    """3단계: 최단 경로 탐색 실행"""
+def run_stage_3(context=None, mode='shortest', algorithm='bfs', fast_render=False):
+    """3단계: 최단 경로 탐색 실행 (성공하면 True)"""
     print("\n🚶 3단계: 최단 경로 탐색을 실행합니다...")
     try:
         import map_direct_save
-        map_direct_save.main('shortest')
+        with instrument.stage('stage3'):
+            found = map_direct_save.main(mode, algorithm, context=context,
+                                         fast_render=fast_render)
+        if not found:
+            print("❌ 3단계를 완료하지 못했습니다.")
+            return False
         print("✅ 3단계가 성공적으로 완료되었습니다.")
+        return True
     except ImportError:
         print("❌ map_direct_save.py 파일이 없습니다.")
     except Exception as e:
+        instrument.record_error('stage3', e)
         print(f"❌ 3단계 실행 중 오류가 발생했습니다: {e}")
+    return False
 
 
 
-def run_all_stages():
-    """전체 프로세스 실행"""
+def run_all_stages(fast_render=False):
+    """전체 프로세스 실행 (지도 데이터는 한 번만 불러와 모든 단계가 공유)"""
     print("\n🚀 전체 프로세스를 순차적으로 실행합니다...")
     
+    from map_context import MapContext
+    context = MapContext()
+    
     # 1단계 실행
-    run_stage_1()
+    with context.timed('1단계'):
+        ok = run_stage_1(context)
     
     # 2단계 실행
-    run_stage_2()
+    with context.timed('2단계'):
+        ok = run_stage_2(context, fast_render) and ok
     
     # 3단계 실행
-    run_stage_3()
+    with context.timed('3단계'):
+        ok = run_stage_3(context, fast_render=fast_render) and ok
 
+    context.timing_report()
     
-    print("\n🎉 전체 프로세스가 완료되었습니다!")
+    if ok:
+        print("\n🎉 전체 프로세스가 완료되었습니다!")
+    else:
+        print("\n❌ 전체 프로세스 중 실패한 단계가 있습니다.")
+    return ok
 
 
-def check_dependencies():
-    """필요한 라이브러리 확인"""
-    required_modules = ['pandas', 'matplotlib']
-    missing_modules = []
-    
-    for module in required_modules:
-        try:
-            __import__(module)
-        except ImportError:
-            missing_modules.append(module)
+def check_dependencies(required_modules=('pandas', 'matplotlib')):
+    """필요한 라이브러리 확인 (불러오지 않고 설치 여부만 본다)"""
+    missing_modules = [module for module in required_modules
+                       if importlib.util.find_spec(module) is None]
     
     if missing_modules:
         print(f"❌ 다음 라이브러리가 설치되지 않았습니다: {', '.join(missing_modules)}")
@@ -119,16 +170,107 @@ def check_data_files():
     return True
 
 
-def main():
-    """메인 함수"""
+def parse_args(argv=None):
+    """명령행 옵션 (계측은 옵션을 줄 때만 켜진다, 명령이 없으면 메뉴를 보여준다)"""
+    parser = argparse.ArgumentParser(description='반달곰 커피를 찾아서')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='단계별 구간/카운터를 Chrome trace JSON 파일로 저장')
+    parser.add_argument('--profile', metavar='DIR',
+                        help='단계별 cProfile 결과(.prof)를 저장할 폴더')
+    parser.add_argument('--memory', action='store_true',
+                        help='단계별 최대 메모리 사용량(tracemalloc)을 함께 기록')
+    parser.add_argument('--timing', action='store_true',
+                        help='시작 준비 시간과 실행 시간, 불러온 라이브러리를 출력')
+    parser.add_argument('--show', action='store_true',
+                        help='명령 실행 때도 그림 창을 띄움 (기본은 파일로만 저장)')
+
+    commands = parser.add_subparsers(dest='command', metavar='명령')
+    analyze = commands.add_parser('analyze', help='1단계: 데이터 수집 및 분석')
+    analyze.add_argument('-q', '--quiet', action='store_true', help='분석 표 출력 생략')
+    analyze.add_argument('--json', metavar='FILE', help='분석 결과를 JSON 파일로 저장')
+    draw = commands.add_parser('draw', help='2단계: 지도 시각화')
+    draw.add_argument('--fast', action='store_true', help='격자 배열 기반의 빠른 렌더러 사용')
+    route = commands.add_parser('route', help='3단계: 최단 경로 탐색')
+    route.add_argument('--mode', choices=ROUTE_MODES, default='shortest')
+    route.add_argument('--algorithm', choices=ROUTE_ALGORITHMS, default='bfs',
+                       help='탐색 알고리즘')
+    route.add_argument('--fast', action='store_true', help='격자 배열 기반의 빠른 렌더러 사용')
+    run_all = commands.add_parser('all', help='전체 프로세스 실행')
+    run_all.add_argument('--fast', action='store_true', help='격자 배열 기반의 빠른 렌더러 사용')
+    return parser.parse_args(argv)
+
+
+def run_command(args):
+    """메뉴 없이 명령 하나를 실행하는 함수 (성공하면 True)"""
+    if not check_dependencies(STAGE_DEPENDENCIES[args.command]) or not check_data_files():
+        return False
+    if args.command == 'analyze':
+        return run_stage_1(verbose=not args.quiet, json_path=args.json)
+    if args.command == 'draw':
+        return run_stage_2(fast_render=args.fast)
+    if args.command == 'route':
+        return run_stage_3(mode=args.mode, algorithm=args.algorithm, fast_render=args.fast)
+    return run_all_stages(args.fast)
+
+
+def report_timing(ready, finished):
+    """main.py 를 불러온 뒤 명령을 시작하기까지와 실행에 걸린 시간을 출력하는 함수"""
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print("\n⏱️  실행 시간")
+    print(f"  시작 준비 : {(ready - STARTED) * 1000:9.1f} ms")
+    print(f"  명령 실행 : {(finished - ready) * 1000:9.1f} ms")
+    print(f"  불러온 라이브러리: {', '.join(loaded) if loaded else '없음'}")
+
+
+def report_trace(tracer, trace_path):
+    """계측 결과를 요약 출력하고 (선택) 파일로 저장하는 함수"""
+    summary = tracer.summary()
+    print("\n📊 계측 요약")
+    for name, (calls, total) in summary['spans'].items():
+        print(f"  {name:<20} {calls:4d}회 {total:10.1f} ms")
+    for name, value in summary['counters'].items():
+        print(f"  {name:<20} {value}")
+    if trace_path:
+        tracer.export(trace_path)
+        print(f"추적 결과가 {trace_path} 파일로 저장되었습니다.")
+
+
+def main(argv=None):
+    """메인 함수 (명령을 주면 그 명령만 실행하고 종료 코드를 돌려준다)"""
+    args = parse_args(argv)
+    if args.command and not args.show:
+        # 명령 실행은 비대화식이므로 그림 창을 띄우지 않는다
+        os.environ.setdefault(HEADLESS_ENV, '1')
+    tracer = None
+    if args.trace or args.profile or args.memory:
+        tracer = instrument.enable(args.profile, args.memory)
+    ready = time.perf_counter()
+    ok = True
+    try:
+        if args.command:
+            ok = run_command(args)
+        else:
+            ok = run_menu()
+    finally:
+        finished = time.perf_counter()
+        if tracer is not None:
+            instrument.disable()
+            report_trace(tracer, args.trace)
+        if args.timing:
+            report_timing(ready, finished)
+    return 0 if ok else 1
+
+
+def run_menu():
+    """의존성과 데이터 파일을 확인한 뒤 메뉴를 반복해서 보여주는 함수 (확인에 실패하면 False)"""
     print("🐻 반달곰 커피 프로젝트를 시작합니다!")
     
     # 의존성 및 데이터 파일 확인
     if not check_dependencies():
-        return
+        return False
     
     if not check_data_files():
-        return
+        return False
     
     print("✅ 모든 의존성과 데이터 파일이 확인되었습니다.")
     
@@ -157,7 +299,8 @@ def main():
             break
         except Exception as e:
             print(f"❌ 예상치 못한 오류가 발생했습니다: {e}")
+    return True
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
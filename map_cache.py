@@ -0,0 +1,439 @@
+# map_cache.py
+
+import json
+import os
+import struct
+import numpy as np
+import pandas as pd
+from grid_map import GridMap
+from instrument import traced
+from utils import STREAM_DTYPES, _read_csv_typed, file_signature, load_data_fast, merge_data_fast
+
+DEFAULT_MAP_CACHE = 'cache/map.bin'
+
+# 파일 구조: MAGIC(8) + 헤더 길이(uint32) + JSON 헤더 + 64바이트 정렬된 격자 레이어들
+MAGIC = b'BGMAP\0\0\1'
+FORMAT_VERSION = 2
+ALIGN = 64
+
+# 레이어 이름 -> 자료형 (모두 (height, width) 모양)
+LAYERS = {
+    'present': 'uint8',     # area_map.csv 에 있는 칸이면 1
+    'passable': 'uint8',    # 이동 가능하면 1 (건설현장 0)
+    'category': 'uint8',    # 구조물 category (0은 빈 칸)
+    'area': 'int16',        # area 번호 (구조물 정보가 없으면 -1)
+}
+NO_AREA = -1
+
+# 이 크기(바이트)보다 큰 CSV 는 한 번에 올리지 않고 청크 단위로 변환한다
+STREAMING_THRESHOLD_BYTES = 256 * 1024 * 1024
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+class CompiledMap:
+    """CSV 세 개를 한 번 변환해 둔 격자 지도 (레이어는 메모리 맵으로 연다)"""
+
+    def __init__(self, header, layers):
+        self.header = header
+        self.signature = header['signature']
+        self.min_x = header['min_x']
+        self.min_y = header['min_y']
+        self.width = header['width']
+        self.height = header['height']
+        # [category, 이름] 목록 (area_category.csv 순서)
+        self.categories = [(int(code), name) for code, name in header['categories']]
+        self.present = layers['present']
+        self.passable = layers['passable']
+        self.category = layers['category']
+        self.area = layers['area']
+        self._grid = None
+
+    @classmethod
+    def from_merged(cls, merged_data, area_category, signature='', sources=None):
+        """merge_data 결과로부터 레이어를 만드는 함수 (sources 는 원본 파일 크기와 수정 시각)"""
+        xs = merged_data['x'].to_numpy(dtype=np.int64)
+        ys = merged_data['y'].to_numpy(dtype=np.int64)
+        min_x, min_y = int(xs.min()), int(ys.min())
+        shape = (int(ys.max()) - min_y + 1, int(xs.max()) - min_x + 1)
+        rows, cols = ys - min_y, xs - min_x
+
+        present = np.zeros(shape, dtype=LAYERS['present'])
+        present[rows, cols] = 1
+        # 데이터에 없는 칸은 GridMap 과 같이 이동 가능으로 본다
+        passable = np.ones(shape, dtype=LAYERS['passable'])
+        passable[rows, cols] = merged_data['ConstructionSite'].to_numpy() != 1
+        category = np.zeros(shape, dtype=LAYERS['category'])
+        category[rows, cols] = merged_data['category'].fillna(0).to_numpy(dtype=np.int64)
+        area = np.full(shape, NO_AREA, dtype=LAYERS['area'])
+        area[rows, cols] = merged_data['area'].fillna(NO_AREA).to_numpy(dtype=np.int64)
+
+        header = {
+            'version': FORMAT_VERSION,
+            'signature': signature,
+            'sources': sources,
+            'min_x': min_x,
+            'min_y': min_y,
+            'width': shape[1],
+            'height': shape[0],
+            'categories': [[int(code), str(name)] for code, name in
+                           area_category[['category', 'struct']].itertuples(index=False)],
+        }
+        return cls(header, {'present': present, 'passable': passable,
+                            'category': category, 'area': area})
+
+    @property
+    def coord_dtype(self):
+        """x, y 좌표 컬럼 자료형 (int16 범위를 넘으면 int32)"""
+        limit = np.iinfo(np.int16)
+        if limit.min <= min(self.min_x, self.min_y) and \
+                max(self.min_x + self.width, self.min_y + self.height) <= limit.max:
+            return np.int16
+        return np.int32
+
+    def grid_map(self):
+        """이 지도의 레이어를 그대로 쓰는 GridMap (한 번만 만든다)"""
+        if self._grid is None:
+            names = dict(self.categories)
+            self._grid = GridMap(self.min_x, self.min_y, self.passable,
+                                 self.category, names)
+        return self._grid
+
+    @traced('merge')
+    def to_merged(self, default_label="None"):
+        """merge_data_fast 와 같은 모양의 병합 DataFrame 을 레이어로부터 다시 만드는 함수"""
+        rows, cols = np.nonzero(self.present)
+        x = (cols + self.min_x).astype(self.coord_dtype)
+        y = (rows + self.min_y).astype(self.coord_dtype)
+        category = self.category[rows, cols]
+        area = self.area[rows, cols]
+        has_struct = area != NO_AREA
+
+        labels = [name for _, name in self.categories]
+        if default_label not in labels:
+            labels.append(default_label)
+        code_of_category = np.full(256, labels.index(default_label), dtype=np.int16)
+        for index, (code, _) in enumerate(self.categories):
+            code_of_category[code] = index
+
+        merged_data = pd.DataFrame({
+            'x': x,
+            'y': y,
+            'ConstructionSite': (self.passable[rows, cols] == 0).astype(np.uint8),
+            'category': category,
+            'area': area,
+            'struct': pd.Categorical.from_codes(code_of_category[category], categories=labels),
+        })
+        if not has_struct.all():
+            merged_data['area'] = pd.array(area, dtype='Int16')
+            merged_data.loc[~has_struct, 'area'] = pd.NA
+            area_key = np.where(has_struct, area, np.iinfo(np.int16).max)
+        else:
+            area_key = area
+
+        order = np.lexsort((y, x, area_key))
+        return merged_data.take(order).reset_index(drop=True)
+
+    def to_frames(self):
+        """area_map, area_struct, area_category 세 DataFrame 을 레이어로부터 다시 만드는 함수
+
+        행 순서는 원본 CSV 와 같이 x, y 순서이다.
+        """
+        # (x, y) 순서가 되도록 전치한 뒤 0이 아닌 칸을 찾는다
+        cols, rows = np.nonzero(self.present.T)
+        x = (cols + self.min_x).astype(self.coord_dtype)
+        y = (rows + self.min_y).astype(self.coord_dtype)
+        area_map = pd.DataFrame({
+            'x': x,
+            'y': y,
+            'ConstructionSite': (self.passable[rows, cols] == 0).astype(np.uint8),
+        })
+
+        has_struct = self.area[rows, cols] != NO_AREA
+        area_struct = pd.DataFrame({
+            'x': x[has_struct],
+            'y': y[has_struct],
+            'category': self.category[rows, cols][has_struct],
+            'area': self.area[rows, cols][has_struct],
+        })
+
+        area_category = pd.DataFrame({
+            'category': np.array([code for code, _ in self.categories], dtype=np.uint8),
+            'struct': pd.Categorical([name for _, name in self.categories]),
+        })
+        return area_map, area_struct, area_category
+
+    def save(self, cache_path):
+        """레이어를 메모리 맵으로 열 수 있는 바이너리 파일로 저장하는 함수"""
+        directory = os.path.dirname(cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        header, encoded, end = _layout(self.header, self.width, self.height)
+
+        # 중간에 실패해도 기존 파일이 깨지지 않도록 임시 파일에 쓴 뒤 교체한다
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            _write_header(f, encoded)
+            for name, dtype in LAYERS.items():
+                f.seek(header['layers'][name]['offset'])
+                f.write(np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes())
+            f.truncate(end)
+        os.replace(temp_path, cache_path)
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def source_stats(paths):
+    """입력 파일마다 [절대 경로, inode, 크기, 수정 시각(ns)] 를 모은 목록 (헤더에 그대로 넣는다)
+
+    기본 캐시 파일은 여러 데이터 폴더가 함께 쓰므로 크기와 수정 시각만으로는
+    같은 파일인지 알 수 없어 경로와 inode 도 함께 적는다.
+    """
+    stats = []
+    for path in paths:
+        info = os.stat(path)
+        stats.append([os.path.realpath(path), info.st_ino, info.st_size, info.st_mtime_ns])
+    return stats
+
+
+def _layout(header, width, height):
+    """레이어 오프셋을 정해 (헤더, 인코딩된 헤더, 파일 끝 위치) 를 돌려주는 함수"""
+    header = dict(header)
+    layer_bytes = width * height
+    # 오프셋이 헤더 길이에 영향을 주므로 헤더가 첫 레이어 앞에 들어갈 때까지 다시 계산한다
+    data_start = _align(len(MAGIC) + 4)
+    while True:
+        header['layers'] = {}
+        offset = data_start
+        for name, dtype in LAYERS.items():
+            header['layers'][name] = {'dtype': dtype, 'offset': offset}
+            offset = _align(offset + layer_bytes * np.dtype(dtype).itemsize)
+        encoded = json.dumps(header).encode('utf-8')
+        if len(MAGIC) + 4 + len(encoded) <= data_start:
+            return header, encoded, offset
+        data_start = _align(len(MAGIC) + 4 + len(encoded))
+
+
+def _write_header(f, encoded):
+    f.write(MAGIC)
+    f.write(struct.pack('<I', len(encoded)))
+    f.write(encoded)
+
+
+def read_header(cache_path):
+    """컴파일된 지도 파일의 헤더만 읽는 함수 (형식이 다르면 None)"""
+    try:
+        with open(cache_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (length,) = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(length).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None
+    if header.get('version') != FORMAT_VERSION:
+        return None
+    return header
+
+
+def _refresh_sources(cache_path, header, sources):
+    """내용은 같고 수정 시각만 바뀐 경우 헤더의 sources 만 제자리에서 고쳐 쓰는 함수
+
+    고친 헤더가 첫 레이어 앞에 들어가지 않으면 그대로 둔다 (다음에 다시 해시한다).
+    """
+    header = dict(header, sources=sources)
+    encoded = json.dumps(header).encode('utf-8')
+    data_start = min(info['offset'] for info in header['layers'].values())
+    if len(MAGIC) + 4 + len(encoded) > data_start:
+        return
+    try:
+        with open(cache_path, 'r+b') as f:
+            _write_header(f, encoded)
+    except OSError:
+        pass
+
+
+def open_compiled_map(cache_path, signature=None):
+    """컴파일된 지도를 메모리 맵으로 여는 함수
+
+    signature 가 주어졌는데 헤더의 원본 해시와 다르면 None 을 돌려준다.
+    레이어는 copy-on-write 로 열어 GridMap 에서 값을 바꿔도 파일은 바뀌지 않는다.
+    """
+    header = read_header(cache_path)
+    if header is None:
+        return None
+    if signature is not None and header['signature'] != signature:
+        return None
+
+    shape = (header['height'], header['width'])
+    layers = {}
+    for name, info in header['layers'].items():
+        layers[name] = np.memmap(cache_path, dtype=info['dtype'], mode='c',
+                                 offset=info['offset'], shape=shape)
+    return CompiledMap(header, layers)
+
+
+def _scan_bounds(paths, chunksize):
+    """CSV 들을 청크 단위로 훑어 좌표 범위 (min_x, min_y, max_x, max_y) 를 구하는 함수"""
+    bounds = None
+    for path in paths:
+        for chunk in _read_csv_typed(path, STREAM_DTYPES, chunksize):
+            if chunk.empty:
+                continue
+            if chunk[['x', 'y']].isna().to_numpy().any():
+                raise ValueError(f"{path}: 좌표가 비어 있는 행이 있습니다.")
+            xs, ys = chunk['x'].to_numpy(), chunk['y'].to_numpy()
+            found = (int(xs.min()), int(ys.min()), int(xs.max()), int(ys.max()))
+            if bounds is None:
+                bounds = found
+            else:
+                bounds = (min(bounds[0], found[0]), min(bounds[1], found[1]),
+                          max(bounds[2], found[2]), max(bounds[3], found[3]))
+    if bounds is None:
+        raise ValueError("지도 데이터가 비어 있습니다.")
+    return bounds
+
+
+def _check_values(path, name, values, allowed):
+    # 허용되지 않는 값이 있으면 첫 번째 값을 담아 ValueError 를 낸다
+    bad = ~np.isin(values, allowed)
+    if bad.any():
+        raise ValueError(f"{path}: 잘못된 {name} 값 {values[bad][0]} 이 있습니다.")
+
+
+def compile_map_streaming(area_map_path, area_struct_path, area_category_path,
+                          cache_path=DEFAULT_MAP_CACHE, signature=None,
+                          chunksize=DEFAULT_CHUNK_ROWS, sources=None):
+    """CSV 를 청크 단위로 읽어 메모리 맵 레이어에 바로 쓰는 컴파일 함수
+
+    메모리에는 청크 하나만 올라가므로 메모리보다 큰 지도도 변환할 수 있다.
+    첫 번째 읽기에서 좌표 범위를 구해 파일을 미리 만들고, 두 번째 읽기에서
+    값을 검사하면서 해당 칸에 쓴다. 중복 좌표, 잘못된 값이 있으면 ValueError.
+    """
+    paths = [area_map_path, area_struct_path, area_category_path]
+    if sources is None:
+        sources = source_stats(paths)
+    if signature is None:
+        signature = file_signature(paths)
+    area_category = _read_csv_typed(area_category_path, STREAM_DTYPES)
+    area_category['struct'] = area_category['struct'].astype(str).str.strip()
+    categories = area_category['category'].to_numpy()
+    _check_values(area_category_path, 'category', categories, np.arange(1, 256))
+
+    min_x, min_y, max_x, max_y = _scan_bounds(paths[:2], chunksize)
+    header = {
+        'version': FORMAT_VERSION,
+        'signature': signature,
+        'sources': sources,
+        'min_x': min_x,
+        'min_y': min_y,
+        'width': max_x - min_x + 1,
+        'height': max_y - min_y + 1,
+        'categories': [[int(code), str(name)] for code, name in
+                       area_category[['category', 'struct']].itertuples(index=False)],
+    }
+    shape = (header['height'], header['width'])
+    header, encoded, end = _layout(header, shape[1], shape[0])
+
+    directory = os.path.dirname(cache_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = cache_path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        _write_header(f, encoded)
+        f.truncate(end)
+
+    try:
+        layers = {name: np.memmap(temp_path, dtype=info['dtype'], mode='r+',
+                                  offset=info['offset'], shape=shape)
+                  for name, info in header['layers'].items()}
+        # 파일은 0으로 채워져 있으므로 기본값이 0이 아닌 레이어만 채운다
+        layers['passable'][:] = 1
+        layers['area'][:] = NO_AREA
+
+        for chunk in _read_csv_typed(area_map_path, STREAM_DTYPES, chunksize):
+            rows = chunk['y'].to_numpy() - min_y
+            cols = chunk['x'].to_numpy() - min_x
+            construction = chunk['ConstructionSite'].to_numpy()
+            _check_values(area_map_path, 'ConstructionSite', construction, [0, 1])
+            cell = rows.astype(np.int64) * shape[1] + cols
+            if len(np.unique(cell)) != len(cell) or layers['present'][rows, cols].any():
+                raise ValueError(f"{area_map_path}: 중복된 좌표가 있습니다.")
+            layers['present'][rows, cols] = 1
+            layers['passable'][rows, cols] = construction != 1
+
+        area_limit = np.iinfo(LAYERS['area'])
+        for chunk in _read_csv_typed(area_struct_path, STREAM_DTYPES, chunksize):
+            rows = chunk['y'].to_numpy() - min_y
+            cols = chunk['x'].to_numpy() - min_x
+            category = chunk['category'].to_numpy()
+            area = chunk['area'].to_numpy()
+            _check_values(area_struct_path, 'category', category, np.r_[0, categories])
+            if ((area < 0) | (area > area_limit.max)).any():
+                raise ValueError(f"{area_struct_path}: area 값이 범위를 벗어났습니다.")
+            cell = rows.astype(np.int64) * shape[1] + cols
+            if len(np.unique(cell)) != len(cell) or (layers['area'][rows, cols] != NO_AREA).any():
+                raise ValueError(f"{area_struct_path}: 중복된 좌표가 있습니다.")
+            layers['category'][rows, cols] = category
+            layers['area'][rows, cols] = area
+
+        for layer in layers.values():
+            layer.flush()
+        del layers
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    os.replace(temp_path, cache_path)
+    return open_compiled_map(cache_path, signature)
+
+
+def compile_map(area_map_path, area_struct_path, area_category_path,
+                cache_path=DEFAULT_MAP_CACHE, signature=None, chunksize=None, sources=None):
+    """CSV 세 개를 읽어 컴파일된 지도 파일을 만드는 함수
+
+    chunksize 를 주거나 CSV 가 STREAMING_THRESHOLD_BYTES 보다 크면
+    compile_map_streaming 으로 청크 단위 변환을 한다.
+    """
+    paths = [area_map_path, area_struct_path, area_category_path]
+    # 해시보다 먼저 재야 해시하는 동안 바뀐 파일을 다음 실행에서 다시 확인한다
+    if sources is None:
+        sources = source_stats(paths)
+    if signature is None:
+        signature = file_signature(paths)
+    size = os.path.getsize(area_map_path) + os.path.getsize(area_struct_path)
+    if chunksize is not None or size > STREAMING_THRESHOLD_BYTES:
+        return compile_map_streaming(area_map_path, area_struct_path, area_category_path,
+                                     cache_path, signature, chunksize or DEFAULT_CHUNK_ROWS,
+                                     sources)
+    area_map, area_struct, area_category = \
+        load_data_fast(area_map_path, area_struct_path, area_category_path)
+    merged_data = merge_data_fast(area_map, area_struct, area_category)
+    CompiledMap.from_merged(merged_data, area_category, signature, sources).save(cache_path)
+    return open_compiled_map(cache_path, signature)
+
+
+@traced('load')
+def load_map(area_map_path, area_struct_path, area_category_path,
+             cache_path=DEFAULT_MAP_CACHE, chunksize=None):
+    """컴파일된 지도를 여는 함수 (없거나 CSV 가 바뀌었으면 다시 만든다)
+
+    헤더에 적힌 원본 파일의 경로, inode, 크기, 수정 시각이 모두 지금과 같으면 해시 없이
+    바로 열고, 하나라도 다르면 내용 해시로 확인한다.
+    """
+    paths = [area_map_path, area_struct_path, area_category_path]
+    sources = source_stats(paths)
+    header = read_header(cache_path)
+    if header is not None and header.get('sources') == sources:
+        compiled = open_compiled_map(cache_path)
+        if compiled is not None:
+            return compiled
+
+    signature = file_signature(paths)
+    if header is not None and header['signature'] == signature:
+        _refresh_sources(cache_path, header, sources)
+    compiled = open_compiled_map(cache_path, signature)
+    if compiled is None:
+        compiled = compile_map(area_map_path, area_struct_path, area_category_path,
+                               cache_path, signature, chunksize, sources)
+    return compiled
@@ -0,0 +1,108 @@
+# map_context.py
+
+import time
+from contextlib import contextmanager
+import instrument
+from map_cache import DEFAULT_MAP_CACHE, load_map
+
+DEFAULT_AREA_MAP_PATH = 'data/area_map.csv'
+DEFAULT_AREA_STRUCT_PATH = 'data/area_struct.csv'
+DEFAULT_AREA_CATEGORY_PATH = 'data/area_category.csv'
+
+
+class MapContext:
+    """여러 단계가 함께 쓰는 지도 데이터 묶음
+
+    지도는 처음 필요할 때 한 번만 불러오고, 병합 데이터와 격자 등
+    파생 데이터도 처음 요청될 때 한 번만 만든다.
+    단계별 소요 시간은 timed() 로 기록한다.
+    """
+
+    def __init__(self, area_map_path=DEFAULT_AREA_MAP_PATH,
+                 area_struct_path=DEFAULT_AREA_STRUCT_PATH,
+                 area_category_path=DEFAULT_AREA_CATEGORY_PATH,
+                 cache_path=DEFAULT_MAP_CACHE):
+        self.area_map_path = area_map_path
+        self.area_struct_path = area_struct_path
+        self.area_category_path = area_category_path
+        self.cache_path = cache_path
+        self.timings = []
+        self._compiled = None
+        self._merged_data = None
+        self._frames = None
+        self._components = None
+        self._poi = None
+
+    @property
+    def source_paths(self):
+        return [self.area_map_path, self.area_struct_path, self.area_category_path]
+
+    @property
+    def compiled(self):
+        """컴파일된 지도 (처음 접근할 때 불러온다)"""
+        if self._compiled is None:
+            with self.timed('지도 불러오기'):
+                self._compiled = load_map(*self.source_paths, cache_path=self.cache_path)
+        return self._compiled
+
+    @property
+    def merged_data(self):
+        """merge_data 와 같은 모양의 병합 DataFrame"""
+        if self._merged_data is None:
+            compiled = self.compiled
+            with self.timed('병합 데이터 만들기'):
+                self._merged_data = compiled.to_merged()
+        return self._merged_data
+
+    @property
+    def frames(self):
+        """(area_map, area_struct, area_category) DataFrame 묶음"""
+        if self._frames is None:
+            compiled = self.compiled
+            with self.timed('원본 데이터 만들기'):
+                self._frames = compiled.to_frames()
+        return self._frames
+
+    @property
+    def grid(self):
+        """이동 가능 격자 (GridMap)"""
+        return self.compiled.grid_map()
+
+    @property
+    def poi(self):
+        """구조물/건설현장 위치 색인 (PoiIndex, 처음 접근할 때 만든다)"""
+        if self._poi is None:
+            from poi_index import PoiIndex
+            merged_data = self.merged_data
+            with self.timed('위치 색인 만들기'):
+                self._poi = PoiIndex.from_merged(merged_data)
+        return self._poi
+
+    @property
+    def components(self):
+        """이동 가능 칸의 연결 요소 (ComponentIndex, 처음 접근할 때 만든다)"""
+        if self._components is None:
+            from components import ComponentIndex
+            grid = self.grid
+            with self.timed('연결 요소 계산'):
+                self._components = ComponentIndex(grid)
+        return self._components
+
+    @contextmanager
+    def timed(self, name):
+        """with 블록의 소요 시간을 name 으로 기록하는 함수"""
+        started = time.perf_counter()
+        try:
+            with instrument.span(name):
+                yield
+        finally:
+            self.timings.append((name, time.perf_counter() - started))
+
+    def timing_report(self):
+        """기록된 소요 시간을 출력하는 함수"""
+        if not self.timings:
+            return
+        width = max(len(name) for name, _ in self.timings)
+        print("\n⏱️  단계별 소요 시간")
+        for name, seconds in self.timings:
+            print(f"  {name:<{width}} : {seconds * 1000:9.1f} ms")
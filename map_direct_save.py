@@ -1,90 +1,54 @@
 # map_direct_save.py
 import pandas as pd
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from collections import deque
-import itertools
-from utils import load_data, merge_data
-from matplotlib.lines import Line2D
+# matplotlib 은 그리는 함수 안에서 pyplot() 으로 처음 불러온다
+# (화면이 있으면 TkAgg, 없으면(서버 등) Agg 백엔드 사용)
+from render_backend import finish_figure, pyplot
+from map_context import MapContext
+from grid_map import as_grid_map
+from poi_index import as_poi_index
+from path_search import bfs_search, find_path
+from distance_field import load_or_build
+from tour_route import plan_tour
+from shop_index import ShopIndex, nearest_shop_path
+from weighted_route import DEFAULT_CONSTRUCTION_COST, build_cost_layer, dijkstra_search, load_costs
+from map_draw import draw_map_fast
 import math
+import instrument
+
+# main 의 mode 로 고를 수 있는 탐색 방식
+MODES = ['shortest', 'nearest', 'weighted', 'field', 'tour']
 
 # 애초에 도달 불가능한 경우 (건설현장으로 인해) -> 현재 bfs 알고리즘에 구현되어 있음.
 # My Home 없는 경우 -> main에서 예외 처리가 잘 되어있음
 # My Home 여러 개인 경우 -> 성립이 안된다. -> 추가 완료 float('inf') 활용
 # 반달곰 커피가 없는 경우 -> main에서 예외 처리가 잘 되어있음
 
+@instrument.traced('find_positions')
 def find_positions(area_1_data):
-    """내 집과 반달곰 커피 위치, 그리고 모든 구조물 위치를 찾는 함수"""
-    my_home = None
-    coffee_shops = []
-    all_structures = []
-    
-    for _, row in area_1_data.iterrows():
-        x, y = row['x'], row['y']
-        struct_name = row['struct']
-        category = row['category']
-        
-        if pd.notna(struct_name):
-            if struct_name == 'MyHome':
-                if my_home == None:
-                    my_home = (x, y)
-                else:
-                    my_home = (-1, -1) # 수정 요청 (3) 반영 -> (-1, -1)로 설정 (이 값은 해당 데이터에서 불가능한 값이므로 이 값으로 설정) -> main 함수에서 예외처리
-                    break # 수정 요청 (2) 반영 -> break로 바로 종료
-            elif struct_name == 'BandalgomCoffee':
-                coffee_shops.append((x, y))
-        
-        # Apartment(category=1)와 Building(category=2)만 포함
-        if (pd.notna(category) and category in [1, 2] and 
-            row['ConstructionSite'] != 1):
-            all_structures.append((x, y))
-    
-    return my_home, coffee_shops, all_structures
+    """내 집과 반달곰 커피 위치, 그리고 모든 구조물 위치를 찾는 함수
+
+    행을 하나씩 훑지 않고 위치 색인(PoiIndex)에서 category 별 좌표 배열을 꺼낸다.
+    area_1_data 로 이미 만든 PoiIndex 를 넘겨도 된다.
+    """
+    # 수정 요청 (2), (3) 반영: 내 집이 여러 개면 (-1, -1) -> main 함수에서 예외처리
+    # Apartment(category=1)와 Building(category=2) 중 건설현장이 아닌 곳만 방문 대상
+    return as_poi_index(area_1_data).find_positions()
 
 def is_valid_position(x, y, area_1_data):
     """해당 위치가 이동 가능한지 확인하는 함수"""
-    # 지도 범위 내에 있는지 확인
-    if x < area_1_data['x'].min() or x > area_1_data['x'].max():
-        return False
-    if y < area_1_data['y'].min() or y > area_1_data['y'].max():
-        return False
-    
-    # 건설현장이 있는지 확인
-    position_data = area_1_data[(area_1_data['x'] == x) & (area_1_data['y'] == y)]
-    if not position_data.empty and position_data.iloc[0]['ConstructionSite'] == 1:
-        return False
-    
-    return True
+    # 지도 범위 및 건설현장 여부를 격자에서 O(1)로 확인
+    return as_grid_map(area_1_data).is_passable(x, y)
 
+@instrument.traced('search')
 def bfs_shortest_path(start, end, area_1_data):
     """BFS를 사용한 최단 경로 탐색"""
     if start == end:
         return [start]
     
-    queue = deque([(start, [start])])
-    visited = {start}
-    
-    # 상하좌우 이동
-    directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
-    
-    while queue:
-        (x, y), path = queue.popleft()
-        
-        for dx, dy in directions:
-            nx, ny = x + dx, y + dy
-            
-            if (nx, ny) not in visited and is_valid_position(nx, ny, area_1_data):
-                new_path = path + [(nx, ny)]
-                
-                if (nx, ny) in end:
-                    return new_path
-                
-                queue.append(((nx, ny), new_path))
-                visited.add((nx, ny))
-    
-    return None  # 경로를 찾을 수 없음
+    # 경로 복사 없이 선행 셀 배열로 탐색한 뒤 경로를 한 번만 복원
+    path, stats = bfs_search(area_1_data, start, end)
+    instrument.count_search(stats)
+    return path  # 경로를 찾을 수 없으면 None
 
 
 
@@ -98,8 +62,13 @@ def save_path_to_csv(path, filename):
         print("저장할 경로가 없습니다.")
 
 
-def draw_map_with_path(area_1_data, path, filename, title):
-    """경로가 표시된 지도를 그리는 함수"""
+@instrument.traced('render')
+def draw_map_with_path(area_1_data, path, filename, title, fast=False, show=True):
+    """경로가 표시된 지도를 그리는 함수 (fast=True 이면 격자 배열로 한 번에 그린다)"""
+    if fast:
+        draw_map_fast(area_1_data, filename, title, path=path, home_color='green', show=show)
+        return
+
     # 지도 크기 설정
     max_x = area_1_data['x'].max()
     max_y = area_1_data['y'].max()
@@ -107,6 +76,9 @@ def draw_map_with_path(area_1_data, path, filename, title):
     min_y = area_1_data['y'].min()
     
     # 그래프 설정
+    plt = pyplot()
+    from matplotlib import patches
+    from matplotlib.lines import Line2D
     fig, ax = plt.subplots(figsize=(12, 12))
     ax.set_xlim(min_x - 0.5, max_x + 0.5)
     ax.set_ylim(min_y - 0.5, max_y + 0.5)
@@ -119,22 +91,23 @@ def draw_map_with_path(area_1_data, path, filename, title):
     for y in range(min_y, max_y + 1):
         ax.axhline(y=y, color='lightgray', linestyle='-', linewidth=0.5)
     
-    # 구조물 그리기
-    for _, row in area_1_data.iterrows():
-        x, y = row['x'], row['y']
-        construction_site = row['ConstructionSite']
-        category = row['category']
-        struct_name = row['struct']
+    # 구조물 그리기 (위치 색인에서 빈 칸이 아닌 칸만 꺼낸다)
+    poi = as_poi_index(area_1_data)
+    xs, ys = poi.x.tolist(), poi.y.tolist()
+    categories = poi.category.tolist()
+    for i, construction_site in enumerate(poi.construction.tolist()):
+        x, y = xs[i], ys[i]
+        struct_name = poi.names.get(categories[i])
         
         # 건설 현장
-        if construction_site == 1:
+        if construction_site:
             rect = patches.Rectangle((x-0.4, y-0.4), 0.8, 0.8, 
                                    linewidth=1, edgecolor='black', 
                                    facecolor='gray', alpha=0.8)
             ax.add_patch(rect)
         
         # 다른 구조물들
-        elif pd.notna(category) and category != 0:
+        else:
             if struct_name == 'Apartment':
                 circle = patches.Circle((x, y), 0.3, 
                                       linewidth=1, edgecolor='black', 
@@ -201,47 +174,68 @@ def draw_map_with_path(area_1_data, path, filename, title):
     plt.tight_layout()
     
     # 이미지 저장
+    instrument.count('patches_drawn', len(ax.patches))
     plt.savefig(filename, dpi=300, bbox_inches='tight')
     print(f"지도가 {filename} 파일로 저장되었습니다.")
     
-    plt.show()
+    # 화면이 없으면 표시는 생략하고, 그림은 항상 닫는다
+    finish_figure(fig, show)
+
+
+def main(mode='shortest', algorithm='bfs', context=None, fast_render=False,
+         construction_cost=DEFAULT_CONSTRUCTION_COST):
+    """메인 함수
 
+    mode: 'shortest'(최단 경로), 'field'(거리 지도 조회), 'tour'(모든 구조물 방문),
+          'weighted'(칸별 비용을 반영한 최소 비용 경로),
+          'nearest'(맨해튼 하한이 가까운 카페부터 하나씩 확인하는 최단 경로)
+    algorithm: 최단 경로 탐색 알고리즘 ('bfs', 'astar', 'bidirectional', 'jps')
+    context: 이미 불러온 지도 데이터 (MapContext, 없으면 새로 불러온다)
+    fast_render: True 이면 격자 배열 기반의 빠른 렌더러로 지도를 그린다
+    construction_cost: weighted 모드에서 건설현장을 지나가는 비용 (None 이면 지나갈 수 없음)
 
-def main(mode='shortest'):
-    """메인 함수"""
+    경로를 찾아 저장했으면 True, 위치가 없거나 경로가 없거나 오류가 나면 False 를 돌려준다.
+    """
+    if mode not in MODES:
+        print(f"지원하지 않는 탐색 방식입니다: {mode} (가능: {', '.join(MODES)})")
+        return False
 
-    area_map_path = 'data/area_map.csv'
-    area_struct_path = 'data/area_struct.csv'
-    area_category_path = 'data/area_category.csv'
+    if context is None:
+        context = MapContext()
 
     try:
-        area_map, area_struct, area_category = \
-            load_data(area_map_path, area_struct_path, area_category_path)
-        target_data = merge_data(area_map, area_struct, area_category)
+        target_data = context.merged_data
 
         # 위치 찾기
-        my_home, coffee_shops, all_structures = find_positions(target_data)
+        my_home, coffee_shops, all_structures = find_positions(context.poi)
     
         if not my_home:
             print("내 집 위치를 찾을 수 없습니다.")
-            return # my_home이 없는 경우에 대한 예외 처리 존재
+            return False # my_home이 없는 경우에 대한 예외 처리 존재
         
         if my_home == (-1, -1):
             print("내 집 위치가 여러 개여서 길 찾기를 시작할 수 없습니다.")
-            return # my_home이 여러 개인 경우에 대한 예외 처리 추가
+            return False # my_home이 여러 개인 경우에 대한 예외 처리 추가
         
         if not coffee_shops:
             print("반달곰 커피 위치를 찾을 수 없습니다.")
-            return
+            return False
         
         print(f"내 집 위치: {my_home}")
         print(f"반달곰 커피 위치: {coffee_shops}")
         print(f"방문 가능한 구조물 개수: {len(all_structures)}")
 
+        # 이동 가능 격자는 컴파일된 지도의 레이어를 그대로 사용
+        grid = context.grid
+
         if mode == 'shortest':
             # 최단 경로 탐색
             print("\n=== 최단 경로 탐색 ===")
-            path = bfs_shortest_path(my_home, coffee_shops, target_data) # 첫 번째 카페로 이동
+            print(f"탐색 알고리즘: {algorithm}")
+            path, stats = find_path(grid, my_home, coffee_shops, algorithm,
+                                    context.components) # 도달 가능한 가장 가까운 카페로 이동
+            print(f"방문한 셀 수: {stats.visited}, 확장한 노드 수: {stats.expanded}, "
+                  f"최대 대기열 크기: {stats.frontier_peak}")
             
             if path:
                 print(f"최단 경로 길이: {len(path) - 1} 단계")
@@ -252,15 +246,110 @@ def main(mode='shortest'):
                 
                 # 지도 시각화
                 draw_map_with_path(target_data, path, 'map_final.png', 
-                                 'Shortest Path to Bandalgom Coffee')
+                                 'Shortest Path to Bandalgom Coffee', fast_render)
                 
                 print("최단 경로 탐색이 완료되었습니다.")
+                return True
             else:
                 print("경로를 찾을 수 없습니다.") 
 
+        elif mode == 'nearest':
+            # 카페가 많을 때 전체 목록 대신 가까운 후보부터 확인하고 하한으로 나머지를 건너뛴다
+            print("\n=== 가까운 카페 후보 기반 최단 경로 탐색 ===")
+            print(f"탐색 알고리즘: {algorithm}")
+            path, stats = nearest_shop_path(grid, my_home, ShopIndex(coffee_shops),
+                                            algorithm, context.components)
+            print(f"후보 {stats['candidates']}개 중 {stats['searched']}개 탐색, "
+                  f"{stats['pruned']}개 제외 (도달 불가 {stats['unreachable']}개)")
+            print(f"방문한 셀 수: {stats['visited']}, 확장한 노드 수: {stats['expanded']}")
+
+            if path:
+                print(f"최단 경로 길이: {len(path) - 1} 단계")
+                print("경로:", path)
+
+                save_path_to_csv(path, 'home_to_cafe.csv')
+                draw_map_with_path(target_data, path, 'map_final.png',
+                                 'Shortest Path to Bandalgom Coffee', fast_render)
+
+                print("최단 경로 탐색이 완료되었습니다.")
+                return True
+            else:
+                print("경로를 찾을 수 없습니다.")
+
+        elif mode == 'weighted':
+            # area_map.csv 의 cost 컬럼(없으면 모두 1)과 건설현장 통과 비용으로 최소 비용 경로 탐색
+            print("\n=== 최소 비용 경로 탐색 (Dijkstra, 버킷 큐) ===")
+            cost_layer = build_cost_layer(grid, load_costs(context.area_map_path, grid),
+                                          construction_cost)
+            path, cost, stats = dijkstra_search(grid, my_home, coffee_shops, cost_layer)
+            print(f"방문한 셀 수: {stats.visited}, 확장한 노드 수: {stats.expanded}, "
+                  f"최대 대기열 크기: {stats.frontier_peak}")
+
+            if path:
+                print(f"최소 비용: {cost}")
+                print(f"최단 경로 길이: {len(path) - 1} 단계")
+                print("경로:", path)
+
+                save_path_to_csv(path, 'home_to_cafe.csv')
+                draw_map_with_path(target_data, path, 'map_final.png',
+                                 'Lowest-Cost Path to Bandalgom Coffee', fast_render)
+
+                print("최소 비용 경로 탐색이 완료되었습니다.")
+                return True
+            else:
+                print("경로를 찾을 수 없습니다.")
+
+        elif mode == 'field':
+            # 모든 카페에서 미리 계산한 거리 지도로 조회 (입력 CSV가 바뀌면 다시 계산)
+            print("\n=== 거리 지도 기반 최단 경로 조회 ===")
+            field, cached = load_or_build(
+                grid, coffee_shops, context.source_paths,
+                signature=context.compiled.signature)
+            print("캐시된 거리 지도를 사용합니다." if cached else "거리 지도를 새로 계산했습니다.")
+            path = field.route(*my_home)
+
+            if path:
+                print(f"가장 가까운 카페: {field.nearest_source(*my_home)}")
+                print(f"최단 경로 길이: {len(path) - 1} 단계")
+                print("경로:", path)
+
+                save_path_to_csv(path, 'home_to_cafe.csv')
+                draw_map_with_path(target_data, path, 'map_final.png',
+                                 'Shortest Path to Bandalgom Coffee', fast_render)
+
+                print("최단 경로 탐색이 완료되었습니다.")
+                return True
+            else:
+                print("경로를 찾을 수 없습니다.")
+
+        elif mode == 'tour':
+            # 모든 Apartment/Building 을 방문한 뒤 반달곰 커피로 가는 경로 탐색
+            print("\n=== 모든 구조물 방문 경로 탐색 ===")
+            tour = plan_tour(grid, my_home, all_structures, coffee_shops)
+
+            if tour:
+                method = '정확해(Held-Karp)' if tour.method == 'exact' else '휴리스틱(2-opt/Or-opt)'
+                print(f"풀이 방식: {method}")
+                if tour.skipped:
+                    print(f"도달할 수 없어 제외한 구조물: {tour.skipped}")
+                print(f"방문 순서: {tour.order}")
+                print(f"도착 카페: {tour.shop}")
+                print(f"전체 경로 길이: {tour.length} 단계")
+
+                save_path_to_csv(tour.path, 'home_to_cafe_tour.csv')
+                draw_map_with_path(target_data, tour.path, 'map_tour.png',
+                                 'Tour of All Structures to Bandalgom Coffee', fast_render)
+
+                print("모든 구조물 방문 경로 탐색이 완료되었습니다.")
+                return True
+            else:
+                print("경로를 찾을 수 없습니다.")
+
 
     except Exception as e:
+        instrument.record_error('map_direct_save.main', e)
         print(f"오류가 발생했습니다: {e}")
+    return False
 
     
 if __name__ == "__main__":
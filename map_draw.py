@@ -1,19 +1,25 @@
 # map_draw.py
 # 테스트입니다.
 
-import pandas as pd
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from utils import load_data, merge_data
+# matplotlib 은 그리는 함수 안에서 pyplot() 으로 처음 불러온다
+# (화면이 있으면 TkAgg, 없으면(서버 등) Agg 백엔드 사용)
+from render_backend import finish_figure, pyplot
+from map_context import MapContext
 import math
-from matplotlib.lines import Line2D
+import numpy as np
+from grid_map import as_grid_map
+from poi_index import as_poi_index
+import instrument
 
 
-def draw_map(area_data):
+@instrument.traced('render')
+def draw_map(area_data, fast=False, show=True):
     ## 지도를 시각화하는 함수 구현
     ## load_target_area_data() 함수를 사용하여 데이터 로드
+    ## fast=True 이면 칸마다 도형을 만들지 않는 draw_map_fast 로 그린다
+    if fast:
+        draw_map_fast(area_data, show=show)
+        return area_data
     
     ## 지도 크기 설정 (좌측 상단이 (1,1), 우측 하단이 가장 큰 좌표)
     max_x = area_data['x'].max()
@@ -22,6 +28,9 @@ def draw_map(area_data):
     min_y = area_data['y'].min()
     
     ## 그래프 설정
+    plt = pyplot()
+    from matplotlib import patches
+    from matplotlib.lines import Line2D
     fig, ax = plt.subplots(figsize=(12, 12))
     ax.set_xlim(min_x - 0.5, max_x + 0.5)
     ax.set_ylim(min_y - 0.5, max_y + 0.5)
@@ -36,22 +45,23 @@ def draw_map(area_data):
     for y in range(min_y, max_y + 1):
         ax.axhline(y=y, color='lightgray', linestyle='-', linewidth=0.5)
     
-    ## 각 위치별로 구조물 그리기
-    for _, row in area_data.iterrows():
-        x, y = row['x'], row['y']
-        construction_site = row['ConstructionSite']
-        category = row['category']
-        struct_name = row['struct']
+    ## 각 위치별로 구조물 그리기 (빈 칸은 건너뛰도록 위치 색인의 배열만 훑는다)
+    poi = as_poi_index(area_data)
+    xs, ys = poi.x.tolist(), poi.y.tolist()
+    categories = poi.category.tolist()
+    for i, construction_site in enumerate(poi.construction.tolist()):
+        x, y = xs[i], ys[i]
+        struct_name = poi.names.get(categories[i])
         
         ## 건설 현장이 있는 경우, 회색 사각형으로 표시 (우선 순위 존재)
-        if construction_site == 1:
+        if construction_site:
             rect = patches.Rectangle((x-0.4, y-0.4), 0.8, 0.8, 
                                    linewidth=1, edgecolor='black', 
                                    facecolor='gray', alpha=0.8)
             ax.add_patch(rect)
         
         ## 다른 구조물들 표시 (건설 현장과 겹치지 않는 경우만)
-        elif pd.notna(category) and category != 0:
+        else:
             if struct_name == 'Apartment':
                 ## 아파트: 진한 갈색 원형
                 circle = patches.Circle((x, y), 0.3, 
@@ -109,29 +119,179 @@ def draw_map(area_data):
     plt.tight_layout()
     
     ## 이미지 저장
+    instrument.count('patches_drawn', len(ax.patches))
     plt.savefig('map.png', dpi=300, bbox_inches='tight')
     print("지도가 map.png 파일로 저장되었습니다.")
     
-    ## 그래프 표시
-    plt.show()
+    ## 그래프 표시 (화면이 없으면 생략) 후 그림 닫기
+    finish_figure(fig, show)
     
     return area_data
 
-def main():
-    ## 메인 함수 구현
+## 빠른 렌더링: 한 칸을 그릴 최대 픽셀 수와 건설현장 래스터의 최대 한 변 크기
+RASTER_CELL_PIXELS = 50
+RASTER_MAX_PIXELS = 4096
+## 칸 눈금을 모두 표시할 최대 칸 수 (넘으면 자동 눈금)
+MAX_CELL_TICKS = 50
 
-    area_map_path = 'data/area_map.csv'
-    area_struct_path = 'data/area_struct.csv'
-    area_category_path = 'data/area_category.csv'
+STRUCTURE_COLOR = '#8B4513'  # SaddleBrown
+CONSTRUCTION_RGBA = (128, 128, 128, 204)  # gray, alpha 0.8
+
+
+def _construction_raster(construction):
+    ## 건설현장 칸을 회색 사각형(0.8칸 크기, 검은 테두리)으로 칠한 RGBA 래스터를 만드는 함수
+    ## 격자가 작으면 칸 하나를 여러 픽셀로 늘려 기존 도형과 같은 모양을 만들고,
+    ## 격자가 크면 칸 하나를 한 픽셀로 그린다
+    height, width = construction.shape
+    cell = max(1, min(RASTER_CELL_PIXELS, RASTER_MAX_PIXELS // max(height, width)))
+    if cell < RASTER_CELL_PIXELS:
+        raster = np.zeros((height, width, 4), dtype=np.uint8)
+        raster[construction] = CONSTRUCTION_RGBA
+        return raster
+
+    ## 한 칸 안의 무늬: 가장자리 0.1칸 여백, 그 안쪽 얇은 검은 테두리, 가운데 회색
+    margin = cell // 10
+    edge = margin + max(1, cell // 50)
+    tile = np.zeros((cell, cell, 4), dtype=np.uint8)
+    tile[margin:cell - margin, margin:cell - margin] = (0, 0, 0, 255)
+    tile[edge:cell - edge, edge:cell - edge] = CONSTRUCTION_RGBA
+    mask = np.repeat(np.repeat(construction, cell, axis=0), cell, axis=1)
+    raster = np.tile(tile, (height, width, 1))
+    raster[~mask] = 0
+    return raster
+
+
+def _polygon_vertices(xs, ys, num_vertices, radius, orientation):
+    ## RegularPolygon 과 같은 꼭짓점 배열을 여러 중심에 대해 한 번에 계산하는 함수
+    angles = np.pi / 2 + orientation + 2 * np.pi * np.arange(num_vertices) / num_vertices
+    offsets = np.stack([np.cos(angles), np.sin(angles)], axis=1) * radius
+    centers = np.stack([xs, ys], axis=1)[:, None, :]
+    return centers + offsets[None, :, :]
+
+
+def _square_vertices(xs, ys, half):
+    ## 중심 (x, y), 한 변 2*half 인 사각형 꼭짓점 배열을 한 번에 계산하는 함수
+    corners = np.array([[-half, -half], [half, -half], [half, half], [-half, half]])
+    centers = np.stack([xs, ys], axis=1)[:, None, :]
+    return centers + corners[None, :, :]
+
+
+@instrument.traced('render')
+def draw_map_fast(area_data, filename='map.png',
+                  title='Bandalgom Coffee Regional Map (MyHome & Coffee Areas)',
+                  path=None, home_color='lightgreen', show=True, dpi=300):
+    ## 격자 배열로 지도를 그리는 함수 (draw_map 과 같은 모양)
+    ## 건설현장은 imshow 한 번, 구조물은 종류별 컬렉션 하나, 격자선은 LineCollection 하나로 그린다
+    grid = as_grid_map(area_data)
+    min_x, max_x, min_y, max_y = grid.min_x, grid.max_x, grid.min_y, grid.max_y
+
+    plt = pyplot()
+    from matplotlib.collections import EllipseCollection, LineCollection, PolyCollection
+    from matplotlib.lines import Line2D
+    fig, ax = plt.subplots(figsize=(12, 12))
+
+    ## 건설현장 (우선 순위 존재)
+    construction = grid.passable == 0
+    ax.imshow(_construction_raster(construction), interpolation='nearest', origin='upper',
+              extent=(min_x - 0.5, max_x + 0.5, max_y + 0.5, min_y - 0.5), zorder=1)
+
+    ax.set_xlim(min_x - 0.5, max_x + 0.5)
+    ax.set_ylim(min_y - 0.5, max_y + 0.5)
+    ax.set_aspect('equal')
+    ax.invert_yaxis()
+
+    ## 격자선
+    xs = np.arange(min_x, max_x + 1)
+    ys = np.arange(min_y, max_y + 1)
+    vertical = [((x, min_y - 0.5), (x, max_y + 0.5)) for x in xs]
+    horizontal = [((min_x - 0.5, y), (max_x + 0.5, y)) for y in ys]
+    ax.add_collection(LineCollection(vertical + horizontal, colors='lightgray',
+                                     linewidths=0.5, zorder=1.5))
+
+    ## 건설현장이 아닌 칸의 구조물만 종류별로 모아서 그린다
+    codes = {name: code for code, name in grid.struct_names.items()}
+
+    def cells_of(*names):
+        mask = np.zeros(construction.shape, dtype=bool)
+        for name in names:
+            if name in codes:
+                mask |= grid.struct_code == codes[name]
+        rows, cols = np.nonzero(mask & ~construction)
+        return cols + min_x, rows + min_y
+
+    bx, by = cells_of('Apartment', 'Building')
+    if len(bx):
+        ax.add_collection(EllipseCollection(
+            0.6, 0.6, 0, units='xy', offsets=np.column_stack([bx, by]),
+            offset_transform=ax.transData, facecolors=STRUCTURE_COLOR,
+            edgecolors='black', linewidths=1, alpha=0.8, zorder=2))
+
+    hx, hy = cells_of('MyHome')
+    if len(hx):
+        ax.add_collection(PolyCollection(
+            _polygon_vertices(hx, hy, 3, 0.3, math.radians(180)),
+            facecolors=home_color, edgecolors='black', linewidths=1, alpha=0.8, zorder=2))
+
+    cx, cy = cells_of('BandalgomCoffee')
+    if len(cx):
+        ax.add_collection(PolyCollection(
+            _square_vertices(cx, cy, 0.3),
+            facecolors='green', edgecolors='black', linewidths=1, alpha=0.8, zorder=2))
+
+    ## 경로
+    if path and len(path) > 1:
+        path_x = [point[0] for point in path]
+        path_y = [point[1] for point in path]
+        ax.plot(path_x, path_y, 'r-', linewidth=3, alpha=0.8, label='Path', zorder=3)
+        ax.plot(path_x[0], path_y[0], 'ro', markersize=8, label='Start', zorder=3)
+        ax.plot(path_x[-1], path_y[-1], 'rs', markersize=8, label='End', zorder=3)
+
+    ## 범례
+    legend_elements = [
+        Line2D([0], [0], marker='o', color='w', markerfacecolor=STRUCTURE_COLOR,
+            markersize=10, markeredgecolor='black', label='Apartment/Building'),
+        Line2D([0], [0], marker='s', color='w', markerfacecolor='green',
+            markersize=10, markeredgecolor='black', label='Bandalgom Coffee'),
+        Line2D([0], [0], marker='^', color='w', markerfacecolor='green',
+            markersize=10, markeredgecolor='black', label='My Home'),
+        Line2D([0], [0], marker='s', color='w', markerfacecolor='gray',
+            markersize=12, markeredgecolor='black', label='Construction Site')
+    ]
+    if path and len(path) > 1:
+        legend_elements.append(Line2D([0], [0], color='red', linewidth=3, label='Path'))
+    ax.legend(handles=legend_elements, loc='upper left', bbox_to_anchor=(1, 1))
+
+    ## 제목 및 라벨, 눈금 (칸이 많으면 자동 눈금)
+    ax.set_title(title, fontsize=16, pad=20)
+    ax.set_xlabel('X Coordinate', fontsize=12)
+    ax.set_ylabel('Y Coordinate', fontsize=12)
+    if grid.width <= MAX_CELL_TICKS:
+        ax.set_xticks(range(min_x, max_x + 1))
+    if grid.height <= MAX_CELL_TICKS:
+        ax.set_yticks(range(min_y, max_y + 1))
+
+    plt.tight_layout()
+    ## 칸마다 도형을 만들지 않으므로 컬렉션 하나를 한 번으로 센다
+    instrument.count('patches_drawn', len(ax.patches) + len(ax.collections))
+    fig.savefig(filename, dpi=dpi, bbox_inches='tight')
+    print(f"지도가 {filename} 파일로 저장되었습니다.")
+
+    finish_figure(fig, show)
+    return filename
+
+
+def main(context=None, fast_render=False):
+    ## 메인 함수 구현 (context 를 주면 이미 불러온 지도 데이터를 재사용)
+    if context is None:
+        context = MapContext()
     
     try:
-        area_map, area_struct, area_category = \
-            load_data(area_map_path, area_struct_path, area_category_path)
-        merged_data = merge_data(area_map, area_struct, area_category)
-        area_1_data = draw_map(merged_data)
+        merged_data = context.merged_data
+        area_1_data = draw_map(merged_data, fast=fast_render)
         print("지도 시각화가 완료되었습니다.")
         return area_1_data
     except Exception as e:
+        instrument.record_error('map_draw.main', e)
         print(f"오류가 발생했습니다: {e}")
         return None
 
@@ -0,0 +1,424 @@
+# path_search.py
+
+import heapq
+from array import array
+from collections import deque
+from grid_map import as_grid_map
+import instrument
+
+# 선행 셀이 없음 / 도달 불가를 나타내는 값
+NO_PARENT = -1
+UNREACHABLE = -1
+
+
+class SearchStats:
+    """탐색 한 번에 대한 통계 (방문 셀 수, 확장한 노드 수, 최대 대기열 크기)"""
+
+    def __init__(self):
+        self.visited = 0
+        self.expanded = 0
+        self.frontier_peak = 0
+
+    def as_dict(self):
+        return {'visited': self.visited, 'expanded': self.expanded,
+                'frontier_peak': self.frontier_peak}
+
+    def __repr__(self):
+        return (f"SearchStats(visited={self.visited}, expanded={self.expanded}, "
+                f"frontier_peak={self.frontier_peak})")
+
+
+def new_parent_array(size):
+    """셀 번호로 인덱싱하는 선행 셀 배열을 만드는 함수"""
+    return array('i', [NO_PARENT]) * size
+
+
+def reconstruct_path(grid, parent, goal_cell):
+    """선행 셀 배열을 따라가며 시작점부터 goal_cell 까지의 경로를 복원하는 함수"""
+    cells = []
+    cell = goal_cell
+    while cell != NO_PARENT:
+        cells.append(cell)
+        cell = parent[cell]
+    cells.reverse()
+    return [grid.cell_xy(c) for c in cells]
+
+
+def goal_cells(grid, goals):
+    """목표 좌표 목록을 (범위 안의) 셀 번호 집합으로 바꾸는 함수"""
+    return {grid.cell_id(x, y) for x, y in goals if grid.in_bounds(x, y)}
+
+
+def bfs_search(area_data, start, goals):
+    """선행 셀 배열을 사용하는 BFS
+
+    경로를 큐에 복사하지 않고 셀마다 선행 셀 하나만 기록한 뒤,
+    목표에 도달하면 그 경로 하나만 복원한다. (경로 또는 None, 통계)를 돌려준다.
+    """
+    grid = as_grid_map(area_data)
+    stats = SearchStats()
+
+    if not grid.in_bounds(*start):
+        return None, stats
+
+    start_cell = grid.cell_id(*start)
+    targets = goal_cells(grid, goals)
+    stats.visited = 1
+    if start_cell in targets:
+        return [tuple(start)], stats
+
+    parent = new_parent_array(grid.size)
+    seen = bytearray(grid.size)
+    seen[start_cell] = 1
+    queue = deque([start_cell])
+    stats.frontier_peak = 1
+
+    while queue:
+        cell = queue.popleft()
+        stats.expanded += 1
+        for nxt in grid.neighbor_cells(cell):
+            if seen[nxt]:
+                continue
+            seen[nxt] = 1
+            parent[nxt] = cell
+            stats.visited += 1
+            if nxt in targets:
+                return reconstruct_path(grid, parent, nxt), stats
+            queue.append(nxt)
+        if len(queue) > stats.frontier_peak:
+            stats.frontier_peak = len(queue)
+
+    return None, stats
+
+
+def bfs_distances(area_data, start):
+    """start 에서 모든 셀까지의 거리와 선행 셀 배열을 구하는 BFS (도달 불가는 -1)"""
+    grid = as_grid_map(area_data)
+    dist = array('i', [UNREACHABLE]) * grid.size
+    parent = new_parent_array(grid.size)
+    if not grid.in_bounds(*start):
+        return dist, parent
+
+    start_cell = grid.cell_id(*start)
+    dist[start_cell] = 0
+    queue = deque([start_cell])
+    while queue:
+        cell = queue.popleft()
+        next_dist = dist[cell] + 1
+        for nxt in grid.neighbor_cells(cell):
+            if dist[nxt] == UNREACHABLE:
+                dist[nxt] = next_dist
+                parent[nxt] = cell
+                queue.append(nxt)
+    return dist, parent
+
+
+def _manhattan_to_goals(grid, targets):
+    """셀에서 가장 가까운 목표까지의 맨해튼 거리(하한)를 계산하는 함수를 만드는 함수"""
+    width = grid.width
+    points = [divmod(t, width) for t in targets]
+    if len(points) == 1:
+        (goal_row, goal_col), = points
+
+        def heuristic(cell):
+            row, col = divmod(cell, width)
+            return abs(row - goal_row) + abs(col - goal_col)
+        return heuristic
+
+    def heuristic(cell):
+        row, col = divmod(cell, width)
+        return min(abs(row - r) + abs(col - c) for r, c in points)
+    return heuristic
+
+
+def astar_search(area_data, start, goals):
+    """가장 가까운 목표까지의 맨해튼 거리를 휴리스틱으로 쓰는 A* 탐색"""
+    grid = as_grid_map(area_data)
+    stats = SearchStats()
+
+    if not grid.in_bounds(*start):
+        return None, stats
+
+    start_cell = grid.cell_id(*start)
+    targets = goal_cells(grid, goals)
+    stats.visited = 1
+    if start_cell in targets:
+        return [tuple(start)], stats
+    if not targets:
+        return None, stats
+
+    heuristic = _manhattan_to_goals(grid, targets)
+    parent = new_parent_array(grid.size)
+    g_cost = array('i', [UNREACHABLE]) * grid.size
+    closed = bytearray(grid.size)
+    g_cost[start_cell] = 0
+    # (f, h, 순번, 셀) - 같은 f 에서는 목표에 더 가까운 셀을 먼저 꺼낸다
+    counter = 0
+    heap = [(heuristic(start_cell), 0, counter, start_cell)]
+    stats.frontier_peak = 1
+
+    while heap:
+        _, _, _, cell = heapq.heappop(heap)
+        if closed[cell]:
+            continue
+        closed[cell] = 1
+        stats.expanded += 1
+        if cell in targets:
+            return reconstruct_path(grid, parent, cell), stats
+
+        next_g = g_cost[cell] + 1
+        for nxt in grid.neighbor_cells(cell):
+            if closed[nxt]:
+                continue
+            if g_cost[nxt] == UNREACHABLE:
+                stats.visited += 1
+            elif g_cost[nxt] <= next_g:
+                continue
+            g_cost[nxt] = next_g
+            parent[nxt] = cell
+            h = heuristic(nxt)
+            counter += 1
+            heapq.heappush(heap, (next_g + h, h, counter, nxt))
+        if len(heap) > stats.frontier_peak:
+            stats.frontier_peak = len(heap)
+
+    return None, stats
+
+
+def bidirectional_search(area_data, start, goals):
+    """출발점과 모든 목표에서 동시에 넓혀 가다 만나는 지점에서 멈추는 양방향 BFS
+
+    한 번에 더 작은 쪽의 한 단계(레벨)를 모두 확장하고, 그 단계에서 찾은
+    만남 지점 중 가장 짧은 것을 고르므로 BFS 와 같은 최단 거리를 보장한다.
+    """
+    grid = as_grid_map(area_data)
+    stats = SearchStats()
+
+    if not grid.in_bounds(*start):
+        return None, stats
+
+    start_cell = grid.cell_id(*start)
+    targets = goal_cells(grid, goals)
+    stats.visited = 1
+    if start_cell in targets:
+        return [tuple(start)], stats
+    # 이동 불가 칸의 목표는 기존 BFS 에서도 도달할 수 없다
+    targets = {t for t in targets if grid._open[t]}
+    if not targets:
+        return None, stats
+
+    size = grid.size
+    dist_f = array('i', [UNREACHABLE]) * size
+    dist_b = array('i', [UNREACHABLE]) * size
+    parent_f = new_parent_array(size)
+    parent_b = new_parent_array(size)
+
+    dist_f[start_cell] = 0
+    frontier_f = [start_cell]
+    frontier_b = sorted(targets)
+    for t in frontier_b:
+        dist_b[t] = 0
+    stats.visited += len(frontier_b)
+    stats.frontier_peak = len(frontier_f) + len(frontier_b)
+
+    while frontier_f and frontier_b:
+        forward = len(frontier_f) <= len(frontier_b)
+        if forward:
+            frontier, dist, parent, other = frontier_f, dist_f, parent_f, dist_b
+        else:
+            frontier, dist, parent, other = frontier_b, dist_b, parent_b, dist_f
+
+        best, meet = None, None
+        next_frontier = []
+        for cell in frontier:
+            stats.expanded += 1
+            next_dist = dist[cell] + 1
+            for nxt in grid.neighbor_cells(cell):
+                if other[nxt] != UNREACHABLE:
+                    total = next_dist + other[nxt]
+                    if best is None or total < best:
+                        best, meet = total, (cell, nxt)
+                if dist[nxt] != UNREACHABLE:
+                    continue
+                dist[nxt] = next_dist
+                parent[nxt] = cell
+                stats.visited += 1
+                next_frontier.append(nxt)
+
+        if meet is not None:
+            cell, nxt = meet
+            if forward:
+                head_end, tail_start = cell, nxt
+            else:
+                head_end, tail_start = nxt, cell
+            head = reconstruct_path(grid, parent_f, head_end)
+            tail = reconstruct_path(grid, parent_b, tail_start)
+            tail.reverse()
+            return head + tail, stats
+
+        if forward:
+            frontier_f = next_frontier
+        else:
+            frontier_b = next_frontier
+        if len(frontier_f) + len(frontier_b) > stats.frontier_peak:
+            stats.frontier_peak = len(frontier_f) + len(frontier_b)
+
+    return None, stats
+
+
+def _jps_jump(grid, cell, step, targets, horizontal):
+    """cell 에서 step 방향으로 점프해 다음 점프 지점을 찾는 함수 (없으면 NO_PARENT)
+
+    상하좌우 이동 격자용 JPS 규칙: 가로 이동 중에는 강제 이웃만,
+    세로 이동 중에는 강제 이웃과 좌우 방향의 점프 지점까지 확인한다.
+    """
+    width, height = grid.width, grid.height
+    opened = grid._open
+    while True:
+        row, col = divmod(cell, width)
+        if horizontal:
+            col += step
+            if col < 0 or col >= width:
+                return NO_PARENT
+            cell += step
+            if not opened[cell]:
+                return NO_PARENT
+            if cell in targets:
+                return cell
+            back = cell - step
+            if row > 0 and opened[cell - width] and not opened[back - width]:
+                return cell
+            if row + 1 < height and opened[cell + width] and not opened[back + width]:
+                return cell
+        else:
+            row += step
+            if row < 0 or row >= height:
+                return NO_PARENT
+            cell += step * width
+            if not opened[cell]:
+                return NO_PARENT
+            if cell in targets:
+                return cell
+            back = cell - step * width
+            if col > 0 and opened[cell - 1] and not opened[back - 1]:
+                return cell
+            if col + 1 < width and opened[cell + 1] and not opened[back + 1]:
+                return cell
+            if (_jps_jump(grid, cell, 1, targets, True) != NO_PARENT
+                    or _jps_jump(grid, cell, -1, targets, True) != NO_PARENT):
+                return cell
+
+
+def _jps_successor_steps(grid, cell, parent_cell):
+    """부모에서 들어온 방향을 기준으로 가지치기한 이동 방향 목록 (step, 가로 여부)"""
+    width = grid.width
+    if parent_cell == NO_PARENT:
+        return [(1, False), (-1, False), (1, True), (-1, True)]
+    row, col = divmod(cell, width)
+    parent_row, parent_col = divmod(parent_cell, width)
+    if row == parent_row:
+        step = 1 if col > parent_col else -1
+        return [(step, True), (1, False), (-1, False)]
+    step = 1 if row > parent_row else -1
+    return [(step, False), (1, True), (-1, True)]
+
+
+def jps_search(area_data, start, goals):
+    """균일 비용 상하좌우 격자용 Jump Point Search (A* 위에서 점프 지점만 확장)"""
+    grid = as_grid_map(area_data)
+    stats = SearchStats()
+
+    if not grid.in_bounds(*start):
+        return None, stats
+
+    start_cell = grid.cell_id(*start)
+    targets = goal_cells(grid, goals)
+    stats.visited = 1
+    if start_cell in targets:
+        return [tuple(start)], stats
+    if not targets:
+        return None, stats
+
+    width = grid.width
+    heuristic = _manhattan_to_goals(grid, targets)
+    parent = new_parent_array(grid.size)
+    g_cost = array('i', [UNREACHABLE]) * grid.size
+    closed = bytearray(grid.size)
+    g_cost[start_cell] = 0
+    counter = 0
+    heap = [(heuristic(start_cell), 0, counter, start_cell)]
+    stats.frontier_peak = 1
+
+    while heap:
+        _, _, _, cell = heapq.heappop(heap)
+        if closed[cell]:
+            continue
+        closed[cell] = 1
+        stats.expanded += 1
+        if cell in targets:
+            return _expand_jump_path(grid, parent, cell), stats
+
+        for step, horizontal in _jps_successor_steps(grid, cell, parent[cell]):
+            jump = _jps_jump(grid, cell, step, targets, horizontal)
+            if jump == NO_PARENT or closed[jump]:
+                continue
+            row, col = divmod(cell, width)
+            jump_row, jump_col = divmod(jump, width)
+            next_g = g_cost[cell] + abs(jump_row - row) + abs(jump_col - col)
+            if g_cost[jump] == UNREACHABLE:
+                stats.visited += 1
+            elif g_cost[jump] <= next_g:
+                continue
+            g_cost[jump] = next_g
+            parent[jump] = cell
+            h = heuristic(jump)
+            counter += 1
+            heapq.heappush(heap, (next_g + h, h, counter, jump))
+        if len(heap) > stats.frontier_peak:
+            stats.frontier_peak = len(heap)
+
+    return None, stats
+
+
+def _expand_jump_path(grid, parent, goal_cell):
+    """점프 지점 사이의 직선 구간을 칸 단위로 펼쳐 전체 경로를 만드는 함수"""
+    jump_points = reconstruct_path(grid, parent, goal_cell)
+    path = [jump_points[0]]
+    for (x0, y0), (x1, y1) in zip(jump_points, jump_points[1:]):
+        dx = (x1 > x0) - (x1 < x0)
+        dy = (y1 > y0) - (y1 < y0)
+        x, y = x0, y0
+        while (x, y) != (x1, y1):
+            x, y = x + dx, y + dy
+            path.append((x, y))
+    return path
+
+
+# 이름으로 선택할 수 있는 탐색 알고리즘 (모두 (경로 또는 None, SearchStats) 를 돌려준다)
+SEARCH_BACKENDS = {
+    'bfs': bfs_search,
+    'astar': astar_search,
+    'bidirectional': bidirectional_search,
+    'jps': jps_search,
+}
+
+
+@instrument.traced('search')
+def find_path(area_data, start, goals, algorithm='bfs', components=None):
+    """algorithm 으로 고른 탐색 알고리즘으로 start 에서 가장 가까운 목표까지의 경로를 찾는 함수
+
+    components(ComponentIndex)를 주면 도달할 수 없는 목표를 탐색 전에 제외하고,
+    남는 목표가 없으면 탐색 없이 바로 None 을 돌려준다.
+    """
+    try:
+        backend = SEARCH_BACKENDS[algorithm]
+    except KeyError:
+        raise ValueError(f"지원하지 않는 탐색 알고리즘입니다: {algorithm} "
+                         f"(가능: {', '.join(SEARCH_BACKENDS)})") from None
+    if components is not None:
+        goals = components.reachable_goals(start, goals)
+        if not goals:
+            return None, SearchStats()
+    path, stats = backend(area_data, start, goals)
+    instrument.count_search(stats)
+    return path, stats
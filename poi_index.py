@@ -0,0 +1,116 @@
+# poi_index.py
+
+import numpy as np
+from grid_map import EMPTY
+
+# 방문 대상 구조물 (Apartment, Building) 의 category 값
+VISIT_CATEGORIES = (1, 2)
+
+
+class PoiIndex:
+    """구조물과 건설현장 칸만 모아 둔 배열 기반 위치 색인
+
+    병합 데이터 전체를 한 번만 벡터 연산으로 훑어, 빈 칸이 아닌 칸의 좌표와
+    category, 건설현장 여부를 자료형이 정해진 배열로 보관한다. 같은 category 는
+    원본 행 순서대로 이어져 있어 category(또는 구조물 이름)별 좌표를 바로 꺼낼 수
+    있고, 칸 좌표로 구조물을 찾는 조회도 O(1) 이다.
+    """
+
+    __slots__ = ('x', 'y', 'category', 'construction', 'names', 'codes', '_groups', '_cells')
+
+    def __init__(self, x, y, category, construction, names):
+        self.x = x
+        self.y = y
+        self.category = category
+        self.construction = construction
+        self.names = dict(names)                            # category -> 이름
+        self.codes = {name: code for code, name in self.names.items()}
+        # category 별 행 번호 (원본 순서 유지) 를 한 번의 정렬로 나눈다
+        order = np.argsort(category, kind='stable')
+        sorted_codes = category[order]
+        bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+        self._groups = {int(group[0]): order[start:start + len(group)]
+                        for start, group in zip(np.r_[0, bounds], np.split(sorted_codes, bounds))
+                        if len(group)}
+        self._cells = None
+
+    @classmethod
+    def from_merged(cls, merged_data):
+        """merge_data 결과에서 구조물/건설현장 칸만 뽑아 색인을 만드는 함수"""
+        category = merged_data['category'].fillna(EMPTY).to_numpy(dtype=np.int64)
+        construction = merged_data['ConstructionSite'].to_numpy() == 1
+        keep = (category != EMPTY) | construction
+
+        names = {}
+        if 'struct' in merged_data.columns:
+            named = merged_data.loc[category != EMPTY, ['category', 'struct']]
+            for code, name in named.drop_duplicates('category').itertuples(index=False):
+                names[int(code)] = str(name)
+
+        return cls(merged_data['x'].to_numpy(dtype=np.int32)[keep],
+                   merged_data['y'].to_numpy(dtype=np.int32)[keep],
+                   category[keep].astype(np.uint8),
+                   construction[keep],
+                   names)
+
+    def __len__(self):
+        return len(self.x)
+
+    def rows(self, code):
+        """category 가 code 인 칸의 행 번호 배열 (원본 순서)"""
+        return self._groups.get(code, np.empty(0, dtype=np.intp))
+
+    def rows_of(self, name):
+        """구조물 이름으로 행 번호 배열을 찾는 함수 (없는 이름이면 빈 배열)"""
+        code = self.codes.get(name)
+        return self.rows(code) if code is not None else np.empty(0, dtype=np.intp)
+
+    def coords(self, rows):
+        """행 번호 배열을 (x, y) 튜플 목록으로 바꾸는 함수"""
+        return list(zip(self.x[rows].tolist(), self.y[rows].tolist()))
+
+    def positions(self, name):
+        """구조물 이름의 모든 좌표 목록"""
+        return self.coords(self.rows_of(name))
+
+    def at(self, x, y):
+        """(x, y) 칸의 구조물 이름 (빈 칸이면 None)"""
+        if self._cells is None:
+            self._cells = dict(zip(zip(self.x.tolist(), self.y.tolist()),
+                                   self.category.tolist()))
+        code = self._cells.get((x, y), EMPTY)
+        return self.names.get(code) if code != EMPTY else None
+
+    def construction_rows(self):
+        """건설현장 칸의 행 번호 배열"""
+        return np.flatnonzero(self.construction)
+
+    def structure_rows(self):
+        """건설현장이 아닌 구조물 칸의 행 번호 배열 (그리기 순서)"""
+        return np.flatnonzero((self.category != EMPTY) & ~self.construction)
+
+    def find_positions(self):
+        """(내 집, 반달곰 커피 목록, 방문할 구조물 목록) 을 find_positions 와 같은 규칙으로 돌려주는 함수
+
+        내 집이 여러 개면 (-1, -1), 없으면 None 이다.
+        방문할 구조물은 건설현장이 아닌 Apartment/Building 이다.
+        """
+        homes = self.rows_of('MyHome')
+        if len(homes) == 0:
+            my_home = None
+        elif len(homes) > 1:
+            my_home = (-1, -1)
+        else:
+            my_home = self.coords(homes)[0]
+        coffee_shops = self.positions('BandalgomCoffee')
+
+        visit = np.isin(self.category, VISIT_CATEGORIES) & ~self.construction
+        all_structures = self.coords(np.flatnonzero(visit))
+        return my_home, coffee_shops, all_structures
+
+
+def as_poi_index(data):
+    """DataFrame 이 들어오면 PoiIndex 로 바꾸고, 이미 PoiIndex 면 그대로 돌려주는 함수"""
+    if isinstance(data, PoiIndex):
+        return data
+    return PoiIndex.from_merged(data)
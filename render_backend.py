@@ -0,0 +1,60 @@
+# render_backend.py
+
+import importlib.util
+import os
+import sys
+
+# 이 환경 변수가 설정되어 있으면(0 제외) 창을 띄우지 않는 Agg 백엔드를 사용
+HEADLESS_ENV = 'BANDALGOM_HEADLESS'
+
+
+def is_headless():
+    """창을 띄울 수 없는(또는 띄우지 않을) 환경인지 확인하는 함수"""
+    if os.environ.get(HEADLESS_ENV, '') not in ('', '0'):
+        return True
+    if sys.platform.startswith('linux'):
+        return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return False
+
+
+def configure_backend(headless=None):
+    """pyplot 을 불러오기 전에 matplotlib 백엔드를 고르는 함수
+
+    화면이 있으면 기존과 같이 TkAgg, 서버 등 화면이 없으면 Agg 를 사용한다.
+    """
+    import matplotlib
+    if headless is None:
+        headless = is_headless()
+    if not headless and importlib.util.find_spec('tkinter') is not None:
+        backend = 'TkAgg'
+    else:
+        backend = 'Agg'
+    matplotlib.use(backend)
+    return backend
+
+
+def pyplot():
+    """처음 부를 때 백엔드를 고르고 matplotlib.pyplot 을 돌려주는 함수
+
+    그리는 함수 안에서 부르므로, 그림을 그리지 않는 단계는 matplotlib 을 불러오지 않는다.
+    """
+    if 'matplotlib.pyplot' not in sys.modules:
+        configure_backend()
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def is_interactive_backend():
+    """현재 백엔드가 창을 띄울 수 있는지 확인하는 함수"""
+    import matplotlib
+    return matplotlib.get_backend().lower() not in ('agg', 'pdf', 'svg', 'ps', 'cairo')
+
+
+def finish_figure(fig, show=True):
+    """그림을 (가능하면) 보여준 뒤 반드시 닫아 메모리를 돌려주는 함수"""
+    import matplotlib.pyplot as plt
+    try:
+        if show and is_interactive_backend():
+            plt.show()
+    finally:
+        plt.close(fig)
@@ -0,0 +1,110 @@
+# render_batch.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from render_backend import HEADLESS_ENV
+
+DEFAULT_OUTPUT_DIR = 'renders'
+DEFAULT_DPI = 150
+DEFAULT_FORMAT = 'png'
+
+
+class RenderJob:
+    """이미지 한 장을 그리기 위한 작업 정보
+
+    area 를 주면 해당 area 칸만, path 를 주면 경로까지 함께 그린다.
+    """
+
+    def __init__(self, name, title, area=None, path=None):
+        self.name = name
+        self.title = title
+        self.area = area
+        self.path = path
+
+    def __repr__(self):
+        return f"RenderJob({self.name!r}, area={self.area}, path_len={len(self.path or [])})"
+
+
+# 작업 프로세스마다 한 번만 여는 지도 데이터
+_worker_context = None
+
+
+def _init_worker(source_paths, cache_path):
+    """작업 프로세스 초기화: 화면 없는 백엔드를 고르고 컴파일된 지도를 연다"""
+    global _worker_context
+    os.environ[HEADLESS_ENV] = '1'
+    from map_context import MapContext
+    _worker_context = MapContext(*source_paths, cache_path=cache_path)
+
+
+def _render(context, job, output_dir, dpi, fmt):
+    """작업 하나를 그려 파일로 저장하고 파일 경로를 돌려주는 함수"""
+    from map_draw import draw_map_fast
+    data = context.merged_data
+    if job.area is not None:
+        data = data[data['area'] == job.area]
+    filename = os.path.join(output_dir, f"{job.name}.{fmt}")
+    home_color = 'green' if job.path else 'lightgreen'
+    return draw_map_fast(data, filename, job.title, path=job.path,
+                         home_color=home_color, show=False, dpi=dpi)
+
+
+def _render_in_worker(job, output_dir, dpi, fmt):
+    return _render(_worker_context, job, output_dir, dpi, fmt)
+
+
+def area_jobs(context):
+    """area 마다 지도 한 장씩 그리는 작업 목록을 만드는 함수"""
+    areas = context.merged_data['area'].dropna().unique()
+    return [RenderJob(f"map_area_{int(area)}", f"Bandalgom Coffee Map - Area {int(area)}",
+                      area=int(area))
+            for area in sorted(areas)]
+
+
+def export_batch(jobs, context=None, output_dir=DEFAULT_OUTPUT_DIR, dpi=DEFAULT_DPI,
+                 fmt=DEFAULT_FORMAT, workers=None):
+    """여러 작업을 프로세스 풀에서 병렬로 그려 이미지 파일로 저장하는 함수
+
+    workers=1 이면 현재 프로세스에서 차례로 그린다. 저장된 파일 경로 목록을 돌려준다.
+    """
+    from map_context import MapContext
+    if context is None:
+        context = MapContext()
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    # 작업 프로세스들이 같은 지도 파일을 동시에 만들지 않도록 미리 준비
+    context.compiled
+
+    if workers == 1 or len(jobs) == 1:
+        return [_render(context, job, output_dir, dpi, fmt) for job in jobs]
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(context.source_paths, context.cache_path)) as pool:
+        futures = [pool.submit(_render_in_worker, job, output_dir, dpi, fmt) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def main(output_dir=DEFAULT_OUTPUT_DIR, dpi=DEFAULT_DPI, fmt=DEFAULT_FORMAT, workers=None):
+    """모든 area 의 지도를 화면 없이 한 번에 이미지로 저장하는 함수"""
+    from map_context import MapContext
+    context = MapContext()
+    try:
+        jobs = area_jobs(context)
+        started = time.perf_counter()
+        files = export_batch(jobs, context, output_dir, dpi, fmt, workers)
+        elapsed = time.perf_counter() - started
+        print(f"{len(files)}개의 지도를 {elapsed:.2f}초 동안 {output_dir} 폴더에 저장했습니다.")
+        return files
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+        return []
+
+
+if __name__ == "__main__":
+    os.environ.setdefault(HEADLESS_ENV, '1')
+    main()
@@ -0,0 +1,285 @@
+# route_server.py
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from components import ComponentIndex
+from grid_map import GridMap
+from path_search import SEARCH_BACKENDS, find_path
+from shop_index import ShopIndex, nearest_shop_path
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# 지연 시간 백분위를 계산할 때 남겨 두는 최근 요청 수
+LATENCY_WINDOW = 10000
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class BadRequest(Exception):
+    """질의 값이 잘못되었을 때 (400 으로 응답한다)"""
+
+
+# 작업 프로세스마다 한 번만 만드는 격자, 카페 색인, 연결 요소
+_worker_state = None
+
+
+def _init_worker(spec, shops):
+    global _worker_state
+    min_x, min_y, passable = spec
+    grid = GridMap(min_x, min_y, passable, np.zeros_like(passable))
+    _worker_state = (grid, ShopIndex(shops), ComponentIndex(grid))
+
+
+def _ping():
+    return os.getpid()
+
+
+def _nearest_in_worker(start, algorithm):
+    grid, shops, components = _worker_state
+    path, stats = nearest_shop_path(grid, start, shops, algorithm, components)
+    return {'start': list(start), 'shop': list(path[-1]) if path else None,
+            'length': len(path) - 1 if path else None,
+            'path': [list(p) for p in path] if path else None, 'stats': stats}
+
+
+def _path_in_worker(start, goal, algorithm):
+    grid, _, components = _worker_state
+    path, stats = find_path(grid, start, [goal], algorithm, components)
+    return {'start': list(start), 'goal': list(goal),
+            'length': len(path) - 1 if path else None,
+            'path': [list(p) for p in path] if path else None, 'stats': stats.as_dict()}
+
+
+class ServiceStats:
+    """요청 수, 합쳐진 요청 수, 오류 수와 최근 지연 시간을 모으는 객체"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.started = time.monotonic()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.computed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.by_endpoint = {}
+
+    def record(self, endpoint, seconds, ok):
+        self.requests += 1
+        self.latencies.append(seconds)
+        self.by_endpoint[endpoint] = self.by_endpoint.get(endpoint, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def snapshot(self, in_flight=0):
+        uptime = time.monotonic() - self.started
+        report = {'uptime_seconds': round(uptime, 3), 'requests': self.requests,
+                  'computed': self.computed, 'coalesced': self.coalesced,
+                  'errors': self.errors, 'in_flight': in_flight,
+                  'throughput_rps': round(self.requests / uptime, 3) if uptime else 0.0,
+                  'by_endpoint': dict(self.by_endpoint)}
+        if self.latencies:
+            p50, p99 = np.percentile(np.fromiter(self.latencies, dtype=np.float64), [50, 99])
+            report['latency_ms'] = {'p50': round(p50 * 1000, 3), 'p99': round(p99 * 1000, 3),
+                                    'window': len(self.latencies)}
+        return report
+
+
+class RouteService:
+    """컴파일된 지도를 메모리에 두고 가까운 카페 / 경로 질의에 답하는 asyncio 서비스
+
+    탐색은 CPU 를 쓰므로 프로세스 풀에서 돌리고, 같은 질의가 동시에 들어오면
+    계산 한 번의 결과를 함께 기다린다.
+    """
+
+    def __init__(self, context, workers=None, algorithm='astar'):
+        if algorithm not in SEARCH_BACKENDS:
+            raise ValueError(f"지원하지 않는 탐색 알고리즘입니다: {algorithm}")
+        self.context = context
+        self.algorithm = algorithm
+        self.grid = context.grid
+        my_home, coffee_shops, _ = context.poi.find_positions()
+        self.home = my_home if my_home and my_home != (-1, -1) else None
+        self.shops = coffee_shops
+        self.workers = workers or os.cpu_count() or 1
+        self.stats = ServiceStats()
+        self._pool = None
+        self._in_flight = {}
+
+    async def start_pool(self):
+        """작업 프로세스를 모두 띄우고 준비될 때까지 기다리는 함수"""
+        spec = (self.grid.min_x, self.grid.min_y, np.asarray(self.grid.passable))
+        # 이벤트 루프의 스레드가 도는 중에 fork 하면 잠금을 쥔 채 복제될 수 있어 spawn 을 쓴다
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context('spawn'),
+                                         initializer=_init_worker, initargs=(spec, self.shops))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ping)
+                               for _ in range(self.workers)))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _compute(self, key, func, *args):
+        """같은 key 의 계산이 진행 중이면 그 결과를 함께 기다리고, 아니면 새로 맡기는 함수"""
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, func, *args)
+        self._in_flight[key] = future
+        self.stats.computed += 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _point(self, query, name, default=None):
+        """질의 문자열의 'x,y' 값을 검사해 좌표로 바꾸는 함수"""
+        values = query.get(name)
+        if not values:
+            if default is None:
+                raise BadRequest(f"{name} 값이 필요합니다 (예: {name}=3,4)")
+            return default
+        try:
+            x, y = (int(v) for v in values[0].split(','))
+        except ValueError:
+            raise BadRequest(f"{name} 값은 'x,y' 형식의 정수여야 합니다: {values[0]}") from None
+        if not self.grid.in_bounds(x, y):
+            raise BadRequest(f"{name} 좌표가 지도 밖입니다: ({x}, {y})")
+        return x, y
+
+    def _algorithm(self, query):
+        algorithm = query.get('algorithm', [self.algorithm])[0]
+        if algorithm not in SEARCH_BACKENDS:
+            raise BadRequest(f"지원하지 않는 탐색 알고리즘입니다: {algorithm} "
+                             f"(가능: {', '.join(SEARCH_BACKENDS)})")
+        return algorithm
+
+    async def nearest(self, query):
+        """from 에서 (없으면 내 집에서) 가장 가까운 반달곰 커피까지의 경로"""
+        start = self._point(query, 'from', self.home)
+        algorithm = self._algorithm(query)
+        return await self._compute(('nearest', start, algorithm),
+                                   _nearest_in_worker, start, algorithm)
+
+    async def path(self, query):
+        """from 에서 to 까지의 최단 경로"""
+        start = self._point(query, 'from', self.home)
+        goal = self._point(query, 'to')
+        algorithm = self._algorithm(query)
+        return await self._compute(('path', start, goal, algorithm),
+                                   _path_in_worker, start, goal, algorithm)
+
+    async def dispatch(self, method, target):
+        """요청 하나를 처리해 (상태 코드, JSON 으로 보낼 값) 을 돌려주는 함수"""
+        parts = urlsplit(target)
+        query = parse_qs(parts.query)
+        if method != 'GET':
+            return 405, {'error': f"GET 요청만 지원합니다: {method}"}
+        if parts.path == '/nearest':
+            return 200, await self.nearest(query)
+        if parts.path == '/path':
+            return 200, await self.path(query)
+        if parts.path == '/stats':
+            return 200, self.stats.snapshot(len(self._in_flight))
+        if parts.path == '/health':
+            return 200, {'status': 'ok', 'width': self.grid.width, 'height': self.grid.height,
+                         'home': self.home, 'shops': len(self.shops), 'workers': self.workers}
+        return 404, {'error': f"알 수 없는 경로입니다: {parts.path}"}
+
+    async def handle(self, reader, writer):
+        """HTTP/1.1 요청 하나를 읽고 JSON 으로 응답한 뒤 연결을 닫는 함수"""
+        started = time.perf_counter()
+        endpoint = None
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            for _ in range(MAX_HEADER_LINES):
+                if (await reader.readline()) in (b'\r\n', b'\n', b''):
+                    break
+            try:
+                method, target, _ = request_line.split(' ', 2)
+            except ValueError:
+                status, body = 400, {'error': f"잘못된 요청입니다: {request_line!r}"}
+            else:
+                endpoint = urlsplit(target).path
+                try:
+                    status, body = await self.dispatch(method, target)
+                except BadRequest as e:
+                    status, body = 400, {'error': str(e)}
+                except Exception as e:
+                    status, body = 500, {'error': f"{type(e).__name__}: {e}"}
+
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                         f"Content-Type: application/json; charset=utf-8\r\n"
+                         f"Content-Length: {len(payload)}\r\n"
+                         f"Connection: close\r\n\r\n".encode('latin-1') + payload)
+            await writer.drain()
+            # 통계 조회는 지연 시간 통계에 넣지 않는다
+            if endpoint != '/stats':
+                self.stats.record(endpoint, time.perf_counter() - started, status == 200)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(context, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=None, algorithm='astar',
+                ready=None):
+    """서비스를 띄우고 멈출 때까지 요청을 받는 함수 (ready 는 시작 후 호출할 함수)"""
+    service = RouteService(context, workers, algorithm)
+    await service.start_pool()
+    server = await asyncio.start_server(service.handle, host, port)
+    try:
+        address = server.sockets[0].getsockname()
+        print(f"경로 서비스를 http://{address[0]}:{address[1]} 에서 시작합니다. "
+              f"(작업 프로세스 {service.workers}개)")
+        if ready:
+            ready(service, address)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    """지도를 한 번 불러와 두고 localhost HTTP 로 경로 질의에 답하는 서비스
+
+    GET /nearest?from=x,y        가장 가까운 반달곰 커피까지의 경로 (from 이 없으면 내 집)
+    GET /path?from=x,y&to=x,y    두 지점 사이 최단 경로
+    GET /stats                   지연 시간 p50/p99, 처리량, 합쳐진 요청 수
+    GET /health                  지도 크기와 카페 수
+    """
+    from map_context import MapContext
+    parser = argparse.ArgumentParser(description='반달곰 커피 경로 서비스')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, help='탐색 작업 프로세스 수 (기본: CPU 수)')
+    parser.add_argument('--algorithm', choices=list(SEARCH_BACKENDS), default='astar')
+    args = parser.parse_args()
+
+    try:
+        context = MapContext()
+        asyncio.run(serve(context, args.host, args.port, args.workers, args.algorithm))
+    except KeyboardInterrupt:
+        print("\n경로 서비스를 종료합니다.")
+    except Exception as e:
+        print(f"오류가 발생했습니다: {e}")
+
+
+if __name__ == "__main__":
+    main()
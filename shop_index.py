@@ -0,0 +1,148 @@
+# shop_index.py
+
+import heapq
+from grid_map import as_grid_map
+from path_search import SearchStats, find_path
+import instrument
+
+# 버킷 한 변의 칸 수
+DEFAULT_BUCKET_SIZE = 16
+
+
+class ShopIndex:
+    """카페 위치를 일정한 크기의 버킷 격자에 나눠 담은 공간 색인
+
+    질의 지점의 버킷에서 고리(ring) 단위로 넓혀 가며 지점을 꺼내므로,
+    맨해튼 거리 순으로 가까운 후보만 살펴볼 수 있다. 맨해튼 거리는 장애물이
+    있는 격자에서 실제 경로 길이의 하한이다. 카페가 생기고 없어지면
+    insert / remove 로 바로 반영한다.
+    """
+
+    def __init__(self, points=(), bucket_size=DEFAULT_BUCKET_SIZE):
+        if bucket_size < 1:
+            raise ValueError(f"버킷 크기는 1 이상이어야 합니다: {bucket_size}")
+        self.bucket_size = bucket_size
+        self._buckets = {}
+        self._count = 0
+        for point in points:
+            self.insert(point)
+
+    def _bucket(self, x, y):
+        return x // self.bucket_size, y // self.bucket_size
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, point):
+        x, y = point
+        return (x, y) in self._buckets.get(self._bucket(x, y), ())
+
+    def __iter__(self):
+        for bucket in self._buckets.values():
+            yield from bucket
+
+    def insert(self, point):
+        """지점을 추가하는 함수 (이미 있으면 아무 일도 하지 않는다)"""
+        x, y = int(point[0]), int(point[1])
+        bucket = self._buckets.setdefault(self._bucket(x, y), [])
+        if (x, y) not in bucket:
+            bucket.append((x, y))
+            self._count += 1
+
+    def remove(self, point):
+        """지점을 지우는 함수 (없는 지점이면 ValueError)"""
+        x, y = int(point[0]), int(point[1])
+        key = self._bucket(x, y)
+        bucket = self._buckets.get(key)
+        if not bucket or (x, y) not in bucket:
+            raise ValueError(f"등록되지 않은 지점입니다: {point}")
+        bucket.remove((x, y))
+        if not bucket:
+            del self._buckets[key]
+        self._count -= 1
+
+    def _ring(self, bx, by, ring):
+        """(bx, by) 에서 체비쇼프 거리가 ring 인 버킷 번호 목록"""
+        if ring == 0:
+            return [(bx, by)] if (bx, by) in self._buckets else []
+        # 고리 둘레가 버킷 수보다 길면 비어 있지 않은 버킷만 훑는다
+        if 8 * ring > len(self._buckets):
+            return [(kx, ky) for kx, ky in self._buckets
+                    if max(abs(kx - bx), abs(ky - by)) == ring]
+        keys = [(bx + d, by - ring) for d in range(-ring, ring + 1)]
+        keys += [(bx + d, by + ring) for d in range(-ring, ring + 1)]
+        keys += [(bx - ring, by + d) for d in range(-ring + 1, ring)]
+        keys += [(bx + ring, by + d) for d in range(-ring + 1, ring)]
+        return [key for key in keys if key in self._buckets]
+
+    def candidates(self, x, y):
+        """(x, y) 에서 맨해튼 거리가 가까운 순으로 (거리, 지점) 을 하나씩 내주는 생성기
+
+        고리 ring 까지 훑고 나면 그 바깥 지점은 적어도 ring * bucket_size + 1
+        떨어져 있으므로, 그 이하인 후보는 순서가 확정되어 바로 내보낸다.
+        꺼내는 도중에 insert / remove 를 하면 안 된다.
+        """
+        bx, by = self._bucket(x, y)
+        heap = []
+        remaining = self._count
+        ring = 0
+        while remaining or heap:
+            if remaining:
+                for key in self._ring(bx, by, ring):
+                    for px, py in self._buckets[key]:
+                        heapq.heappush(heap, (abs(px - x) + abs(py - y), px, py))
+                        remaining -= 1
+                bound = ring * self.bucket_size
+                ring += 1
+            else:
+                bound = float('inf')
+            while heap and heap[0][0] <= bound:
+                distance, px, py = heapq.heappop(heap)
+                yield distance, (px, py)
+
+    def nearest(self, x, y, k=1):
+        """(x, y) 에서 맨해튼 거리로 가까운 k 개의 (거리, 지점) 목록"""
+        result = []
+        if k <= 0:
+            return result
+        for candidate in self.candidates(x, y):
+            result.append(candidate)
+            if len(result) == k:
+                break
+        return result
+
+
+def nearest_shop_path(area_data, start, shops, algorithm='astar', components=None):
+    """맨해튼 하한이 가까운 카페부터 하나씩 실제 경로를 확인해 가장 가까운 카페 경로를 찾는 함수
+
+    다음 후보의 하한이 지금까지 찾은 가장 짧은 경로 길이 이상이면 남은 후보는
+    더 볼 필요가 없으므로 멈춘다. shops 는 ShopIndex 또는 좌표 목록이다.
+    (경로 또는 None, 통계 dict) 를 돌려주며, 통계의 pruned 는 탐색 없이 제외한 후보 수이다.
+    """
+    grid = as_grid_map(area_data)
+    index = shops if isinstance(shops, ShopIndex) else ShopIndex(shops)
+    stats = SearchStats()
+    best_path, best_length = None, None
+    searched = unreachable = 0
+
+    start = tuple(start)
+    labels = components.start_labels(*start) if components is not None else None
+    for lower_bound, shop in index.candidates(*start):
+        if best_length is not None and lower_bound >= best_length:
+            break
+        # 연결 요소가 다르면 탐색 없이 건너뛴다
+        if labels is not None and shop != start and components.label_at(*shop) not in labels:
+            unreachable += 1
+            continue
+        searched += 1
+        path, search_stats = find_path(grid, start, [shop], algorithm)
+        stats.visited += search_stats.visited
+        stats.expanded += search_stats.expanded
+        stats.frontier_peak = max(stats.frontier_peak, search_stats.frontier_peak)
+        if path and (best_length is None or len(path) - 1 < best_length):
+            best_path, best_length = path, len(path) - 1
+
+    result = dict(stats.as_dict(), candidates=len(index), searched=searched,
+                  unreachable=unreachable, pruned=len(index) - searched)
+    instrument.count('candidates_pruned', result['pruned'])
+    return best_path, result
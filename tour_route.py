@@ -0,0 +1,234 @@
+# tour_route.py
+
+import time
+from grid_map import as_grid_map
+from path_search import UNREACHABLE, bfs_distances, reconstruct_path
+
+# 이 개수 이하의 구조물은 Held-Karp DP로 정확히 풀고, 넘으면 휴리스틱 사용
+DEFAULT_EXACT_LIMIT = 12
+# 거리 행렬 만들기와 휴리스틱 개선(2-opt / Or-opt)에 함께 쓸 최대 시간(초)
+DEFAULT_TIME_BUDGET = 1.0
+
+INF = float('inf')
+
+
+class TourResult:
+    """모든 구조물을 방문하는 경로 탐색 결과"""
+
+    def __init__(self, order, shop, path, length, method, skipped):
+        self.order = order          # 방문 순서 (구조물 좌표 목록)
+        self.shop = shop            # 마지막에 도착하는 카페 좌표
+        self.path = path            # 전체 경로 (칸 단위 좌표 목록)
+        self.length = length        # 전체 이동 거리
+        self.method = method        # 'exact' 또는 'heuristic'
+        self.skipped = skipped      # 도달할 수 없어 제외된 구조물
+
+    def __repr__(self):
+        return (f"TourResult(length={self.length}, method={self.method!r}, "
+                f"stops={len(self.order)}, shop={self.shop})")
+
+
+def build_distance_matrix(grid, points, shops):
+    """점마다 BFS를 한 번씩 수행해 점 사이 거리 행렬과 카페까지의 최소 거리를 구하는 함수
+
+    점 쌍마다 탐색하지 않고 한 점에서의 BFS 결과로 나머지 모든 점의 거리를 읽는다.
+    경로 복원을 위해 점별 선행 셀 배열도 함께 돌려준다.
+    """
+    cells = [grid.cell_id(x, y) for x, y in points]
+    shop_cells = [grid.cell_id(x, y) for x, y in shops if grid.in_bounds(x, y)]
+    shop_coords = [grid.cell_xy(c) for c in shop_cells]
+
+    matrix = []
+    end_cost = []
+    end_shop = []
+    parents = []
+    for point in points:
+        dist, parent = bfs_distances(grid, point)
+        matrix.append([INF if dist[c] == UNREACHABLE else dist[c] for c in cells])
+        best, best_shop = INF, None
+        for cell, coord in zip(shop_cells, shop_coords):
+            if dist[cell] != UNREACHABLE and dist[cell] < best:
+                best, best_shop = dist[cell], coord
+        end_cost.append(best)
+        end_shop.append(best_shop)
+        parents.append(parent)
+    return matrix, end_cost, end_shop, parents
+
+
+def held_karp(matrix, end_cost):
+    """비트마스크 DP로 0번 점에서 출발해 모든 점을 방문하고 카페에서 끝나는 최적 순서를 구하는 함수"""
+    n = len(matrix) - 1
+    if n == 0:
+        return [], end_cost[0]
+
+    full = (1 << n) - 1
+    dp = [[INF] * n for _ in range(1 << n)]
+    back = [[-1] * n for _ in range(1 << n)]
+    for j in range(n):
+        dp[1 << j][j] = matrix[0][j + 1]
+
+    for mask in range(1, full + 1):
+        row = dp[mask]
+        for j in range(n):
+            cost = row[j]
+            if cost == INF or not mask & (1 << j):
+                continue
+            dist_j = matrix[j + 1]
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                candidate = cost + dist_j[k + 1]
+                nxt = mask | (1 << k)
+                if candidate < dp[nxt][k]:
+                    dp[nxt][k] = candidate
+                    back[nxt][k] = j
+
+    best, last = INF, -1
+    for j in range(n):
+        total = dp[full][j] + end_cost[j + 1]
+        if total < best:
+            best, last = total, j
+
+    order = []
+    mask = full
+    while last != -1:
+        order.append(last + 1)
+        last, mask = back[mask][last], mask & ~(1 << last)
+    order.reverse()
+    return order, best
+
+
+def route_cost(seq, matrix, end_cost):
+    """0번 점에서 seq 순서로 방문한 뒤 카페로 가는 전체 비용"""
+    cost = 0
+    prev = 0
+    for point in seq:
+        cost += matrix[prev][point]
+        prev = point
+    return cost + end_cost[prev]
+
+
+def nearest_neighbour(matrix):
+    """가장 가까운 미방문 점으로 이동하는 초기 순서를 만드는 함수"""
+    remaining = set(range(1, len(matrix)))
+    order = []
+    current = 0
+    while remaining:
+        current = min(remaining, key=lambda p: (matrix[current][p], p))
+        remaining.remove(current)
+        order.append(current)
+    return order
+
+
+def _edge(matrix, end_cost, a, b):
+    """a 다음에 b 로 가는 비용 (b 가 None 이면 카페로 가는 비용)"""
+    return end_cost[a] if b is None else matrix[a][b]
+
+
+def two_opt_pass(seq, matrix, end_cost, deadline):
+    """구간을 뒤집어 비용이 줄어드는 첫 번째 2-opt 이동을 적용하는 함수"""
+    m = len(seq)
+    for i in range(1, m):
+        if time.perf_counter() > deadline:
+            return False
+        a = seq[i - 1]
+        for k in range(i + 1, m):
+            b = seq[k + 1] if k + 1 < m else None
+            delta = (matrix[a][seq[k]] + _edge(matrix, end_cost, seq[i], b)
+                     - matrix[a][seq[i]] - _edge(matrix, end_cost, seq[k], b))
+            if delta < 0:
+                seq[i:k + 1] = reversed(seq[i:k + 1])
+                return True
+    return False
+
+
+def or_opt_pass(seq, matrix, end_cost, deadline, max_segment=3):
+    """길이 1~3 구간을 다른 위치로 옮겨 비용이 줄어드는 첫 번째 Or-opt 이동을 적용하는 함수"""
+    m = len(seq)
+    for length in range(1, max_segment + 1):
+        for i in range(1, m - length + 1):
+            if time.perf_counter() > deadline:
+                return False
+            j = i + length - 1
+            a = seq[i - 1]
+            b = seq[j + 1] if j + 1 < m else None
+            removed = (matrix[a][seq[i]] + _edge(matrix, end_cost, seq[j], b)
+                       - _edge(matrix, end_cost, a, b))
+            for k in range(m):
+                if i - 1 <= k <= j:
+                    continue
+                p = seq[k]
+                q = seq[k + 1] if k + 1 < m else None
+                added = (matrix[p][seq[i]] + _edge(matrix, end_cost, seq[j], q)
+                         - _edge(matrix, end_cost, p, q))
+                if added < removed:
+                    segment = seq[i:j + 1]
+                    del seq[i:j + 1]
+                    insert_at = k + 1 if k < i else k + 1 - length
+                    seq[insert_at:insert_at] = segment
+                    return True
+    return False
+
+
+def heuristic_tour(matrix, end_cost, time_budget=DEFAULT_TIME_BUDGET):
+    """최근접 이웃으로 시작해 시간 예산 안에서 2-opt / Or-opt 로 개선하는 함수"""
+    deadline = time.perf_counter() + time_budget
+    # 0번(출발점)을 맨 앞에 고정한 순서로 다룬다
+    seq = [0] + nearest_neighbour(matrix)
+    improved = True
+    while improved and time.perf_counter() <= deadline:
+        improved = (two_opt_pass(seq, matrix, end_cost, deadline)
+                    or or_opt_pass(seq, matrix, end_cost, deadline))
+    order = seq[1:]
+    return order, route_cost(order, matrix, end_cost)
+
+
+def plan_tour(area_data, start, structures, shops,
+              exact_limit=DEFAULT_EXACT_LIMIT, time_budget=DEFAULT_TIME_BUDGET):
+    """start 에서 모든 구조물을 방문하고 가장 유리한 카페에서 끝나는 경로를 구하는 함수
+
+    도달할 수 없는 구조물은 제외하고, 카페에 도달할 수 없으면 None 을 돌려준다.
+    time_budget 은 거리 행렬을 만드는 시간부터 세고, 남은 시간만 휴리스틱 개선에 쓴다.
+    행렬은 지점마다 BFS 를 끝까지 해야 해서 중간에 멈추지 않으므로, 지점이 많으면
+    행렬을 만드는 것만으로 예산을 넘을 수 있다.
+    """
+    deadline = time.perf_counter() + time_budget
+    grid = as_grid_map(area_data)
+    start = tuple(start)
+    stops = list(dict.fromkeys(tuple(p) for p in structures if tuple(p) != start))
+    points = [start] + stops
+
+    matrix, end_cost, end_shop, parents = build_distance_matrix(grid, points, shops)
+    if end_cost[0] == INF:
+        return None
+
+    # 출발점에서 도달할 수 없는 구조물 제외
+    keep = [0] + [i for i in range(1, len(points)) if matrix[0][i] != INF]
+    skipped = [points[i] for i in range(1, len(points)) if matrix[0][i] == INF]
+    if len(keep) != len(points):
+        points = [points[i] for i in keep]
+        matrix = [[matrix[i][j] for j in keep] for i in keep]
+        end_cost = [end_cost[i] for i in keep]
+        end_shop = [end_shop[i] for i in keep]
+        parents = [parents[i] for i in keep]
+
+    if len(points) - 1 <= exact_limit:
+        order, length = held_karp(matrix, end_cost)
+        method = 'exact'
+    else:
+        order, length = heuristic_tour(matrix, end_cost,
+                                       max(0.0, deadline - time.perf_counter()))
+        method = 'heuristic'
+
+    # 구간별 경로를 선행 셀 배열로 복원해 이어 붙이기
+    last = order[-1] if order else 0
+    shop = end_shop[last]
+    path = [start]
+    prev = 0
+    for point in order + [None]:
+        target = shop if point is None else points[point]
+        leg = reconstruct_path(grid, parents[prev], grid.cell_id(*target))
+        path.extend(leg[1:])
+        prev = point
+
+    return TourResult([points[i] for i in order], shop, path, int(length), method, skipped)
@@ -1,7 +1,13 @@
 # utils.py
 
+import hashlib
+import time
+import tracemalloc
+import numpy as np
 import pandas as pd
+from instrument import traced
 
+@traced('load')
 def load_data(area_map_path, area_struct_path, area_category_path):
     # 지정된 경로로부터 데이터를 불러오고 타입 변환하는 함수
 
@@ -30,6 +36,7 @@ def load_data(area_map_path, area_struct_path, area_category_path):
     return area_map, area_struct, area_category
 
 
+@traced('merge')
 def merge_data(area_map, area_struct, area_category, default_label="None"):
     # 공사 여부, 구조물 위치 정보, 구조물 유형 라벨 정보를 모두 병합하고 area 기준으로 정렬하는 함수
 
@@ -43,3 +50,161 @@ def merge_data(area_map, area_struct, area_category, default_label="None"):
     
     return merged_data
 
+
+
+def file_signature(paths):
+    # 입력 파일들의 내용으로 캐시 무효화용 해시를 만드는 함수
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+# 빠른 로딩 경로에서 사용할 컬럼별 자료형
+# 좌표는 int16 으로 읽으면 범위를 넘는 값이 오류 없이 뒤집히므로 int32 로 읽는다
+FAST_DTYPES = {
+    'x': 'int32',
+    'y': 'int32',
+    'ConstructionSite': 'uint8',
+    'category': 'uint8',
+    'area': 'int16',
+}
+
+
+# 청크 단위로 읽을 때의 자료형 (큰 지도는 area 도 int16 범위를 넘을 수 있다)
+STREAM_DTYPES = dict(FAST_DTYPES, area='int32')
+
+
+def _read_header(path):
+    # BOM과 공백을 제거한 헤더(컬럼명)만 읽는 함수
+    with open(path, encoding='utf-8-sig') as f:
+        return [name.strip() for name in f.readline().split(',')]
+
+
+def _read_csv_typed(path, dtypes, chunksize=None):
+    # 헤더 정리와 자료형 지정을 읽는 단계에서 한 번에 처리하는 함수
+    # chunksize 를 주면 DataFrame 대신 chunksize 행씩 읽는 반복자를 돌려준다
+    names = _read_header(path)
+    return pd.read_csv(
+        path,
+        header=0,
+        names=names,
+        encoding='utf-8-sig',
+        skipinitialspace=True,
+        dtype={name: dtypes[name] for name in names if name in dtypes},
+        chunksize=chunksize,
+    )
+
+
+@traced('load')
+def load_data_fast(area_map_path, area_struct_path, area_category_path):
+    # load_data 와 같은 데이터를 작은 정수형과 범주형 컬럼으로 읽는 함수
+
+    area_map = _read_csv_typed(area_map_path, FAST_DTYPES)
+    area_struct = _read_csv_typed(area_struct_path, FAST_DTYPES)
+    area_category = _read_csv_typed(area_category_path, FAST_DTYPES)
+    area_category['struct'] = area_category['struct'].str.strip().astype('category')
+
+    return area_map, area_struct, area_category
+
+
+@traced('merge')
+def merge_data_fast(area_map, area_struct, area_category, default_label="None"):
+    # merge_data 와 같은 결과를 DataFrame.merge 대신 격자 인덱싱으로 만드는 함수
+    # x, y 가 빈틈없는 격자를 이룬다는 점을 이용해 좌표를 배열 위치로 바로 바꾼다
+
+    map_x = area_map['x'].to_numpy(dtype=np.int64)
+    map_y = area_map['y'].to_numpy(dtype=np.int64)
+    struct_x = area_struct['x'].to_numpy(dtype=np.int64)
+    struct_y = area_struct['y'].to_numpy(dtype=np.int64)
+
+    min_x = min(map_x.min(), struct_x.min())
+    min_y = min(map_y.min(), struct_y.min())
+    width = max(map_x.max(), struct_x.max()) - min_x + 1
+    height = max(map_y.max(), struct_y.max()) - min_y + 1
+
+    # 좌표 -> area_struct 행 번호 (-1은 구조물 정보 없음)
+    row_of_cell = np.full(width * height, -1, dtype=np.int64)
+    row_of_cell[(struct_x - min_x) * height + (struct_y - min_y)] = np.arange(len(area_struct))
+    rows = row_of_cell[(map_x - min_x) * height + (map_y - min_y)]
+    has_struct = rows >= 0
+    rows = np.where(has_struct, rows, 0)
+
+    category = area_struct['category'].to_numpy()[rows]
+    category = np.where(has_struct, category, 0).astype(FAST_DTYPES['category'])
+    area = area_struct['area'].to_numpy()[rows]
+
+    # category -> 구조물 이름 코드 (없는 category 는 default_label)
+    labels = list(area_category['struct'].astype(str))
+    if default_label not in labels:
+        labels.append(default_label)
+    default_code = labels.index(default_label)
+    code_of_category = np.full(256, default_code, dtype=np.int16)
+    code_of_category[area_category['category'].to_numpy(dtype=np.int64)] = \
+        np.arange(len(area_category))
+    struct_codes = code_of_category[category]
+    struct = pd.Categorical.from_codes(struct_codes, categories=labels)
+
+    merged_data = pd.DataFrame({
+        'x': area_map['x'].to_numpy(),
+        'y': area_map['y'].to_numpy(),
+        'ConstructionSite': area_map['ConstructionSite'].to_numpy(),
+        'category': category,
+        'area': area,
+        'struct': struct,
+    })
+    if not has_struct.all():
+        # 구조물 정보가 없는 칸의 area 는 merge_data 와 같이 결측값으로 두고 정렬에서 마지막에 둔다
+        merged_data['area'] = pd.array(area, dtype='Int16')
+        merged_data.loc[~has_struct, 'area'] = pd.NA
+        area_key = np.where(has_struct, area, np.iinfo(np.int16).max)
+    else:
+        area_key = area
+
+    order = np.lexsort((map_y, map_x, area_key))
+    return merged_data.take(order).reset_index(drop=True)
+
+
+def compare_load_paths(area_map_path, area_struct_path, area_category_path, repeat=3):
+    # 기존 로딩/병합 경로와 빠른 경로의 소요 시간과 최대 메모리 사용량을 비교하는 함수
+    # 이미 추적 중이면 (main.py --memory 등) 호출한 쪽의 추적을 끄지 않고
+    # 최대값만 초기화해 시작 시점 사용량을 뺀 값을 쓴다
+    report = {}
+    paths = (area_map_path, area_struct_path, area_category_path)
+    owned = not tracemalloc.is_tracing()
+    for name, loader, merger in (('pandas', load_data, merge_data),
+                                 ('fast', load_data_fast, merge_data_fast)):
+        best = None
+        for _ in range(repeat):
+            if owned:
+                tracemalloc.start()
+            else:
+                tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            started = time.perf_counter()
+            merged = merger(*loader(*paths))
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            peak -= baseline
+            if owned:
+                tracemalloc.stop()
+            if best is None or elapsed < best[0]:
+                best = (elapsed, peak)
+        report[name] = {
+            'seconds': best[0],
+            'peak_bytes': best[1],
+            'result_bytes': int(merged.memory_usage(deep=True).sum()),
+        }
+    return report
+
+
+if __name__ == "__main__":
+    result = compare_load_paths('data/area_map.csv', 'data/area_struct.csv',
+                                'data/area_category.csv')
+    for name, stats in result.items():
+        print(f"{name:>6}: {stats['seconds'] * 1000:8.2f} ms, "
+              f"최대 메모리 {stats['peak_bytes'] / 1024:10.1f} KiB, "
+              f"결과 크기 {stats['result_bytes'] / 1024:8.1f} KiB")
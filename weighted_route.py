@@ -0,0 +1,138 @@
+# weighted_route.py
+
+from array import array
+import numpy as np
+from grid_map import as_grid_map
+from path_search import NO_PARENT, SearchStats, goal_cells, reconstruct_path
+from utils import FAST_DTYPES, _read_csv_typed, _read_header
+
+# area_map.csv 에 선택적으로 붙는 칸 이동 비용 컬럼 (1 ~ MAX_COST, 0은 지나갈 수 없음)
+COST_COLUMN = 'cost'
+DEFAULT_COST = 1
+MAX_COST = 255
+# 비용을 따로 주지 않은 건설현장을 지나가는 비용 (None 이면 기존처럼 지나갈 수 없음)
+DEFAULT_CONSTRUCTION_COST = 20
+BLOCKED = 0
+# load_costs 결과에서 cost 가 비어 있는 칸
+NO_COST = -1
+
+
+def build_cost_layer(area_data, costs=None, construction_cost=DEFAULT_CONSTRUCTION_COST):
+    """칸에 들어갈 때의 비용 레이어 (uint8, (행=y, 열=x)) 를 만드는 함수
+
+    costs 는 load_costs 가 만든 배열이며 NO_COST 칸과 costs 가 없을 때는 DEFAULT_COST 이다.
+    cost 를 직접 준 칸은 건설현장이라도 그 값(0 이면 막힌 칸)을 그대로 쓰고, 비용이 없는
+    건설현장만 construction_cost 로 지나간다. construction_cost 가 None 이면 막힌 칸(0)이다.
+    """
+    grid = as_grid_map(area_data)
+    layer = np.full((grid.height, grid.width), DEFAULT_COST, dtype=np.uint8)
+    unset = np.ones(layer.shape, dtype=bool)
+    if costs is not None:
+        unset = np.asarray(costs) == NO_COST
+        layer[~unset] = np.asarray(costs)[~unset]
+    blocked = (np.asarray(grid.passable) == 0) & unset
+    layer[blocked] = BLOCKED if construction_cost is None else construction_cost
+    return layer
+
+
+def load_costs(area_map_path, area_data):
+    """area_map.csv 의 cost 컬럼을 격자 모양 배열로 읽는 함수 (컬럼이 없으면 None)
+
+    cost 가 비어 있거나 파일에 없는 칸은 NO_COST(-1), 0은 지나갈 수 없는 칸이다.
+    """
+    if COST_COLUMN not in _read_header(area_map_path):
+        return None
+    grid = as_grid_map(area_data)
+    area_map = _read_csv_typed(area_map_path, FAST_DTYPES)
+    cost = area_map[COST_COLUMN].to_numpy(dtype=np.float64)
+    given = ~np.isnan(cost)
+    values = cost[given]
+    if ((values < 0) | (values > MAX_COST) | (values != np.round(values))).any():
+        raise ValueError(f"{area_map_path}: {COST_COLUMN} 값은 0 ~ {MAX_COST} 사이의 정수여야 합니다.")
+
+    layer = np.full((grid.height, grid.width), NO_COST, dtype=np.int16)
+    rows = area_map['y'].to_numpy(np.int64) - grid.min_y
+    cols = area_map['x'].to_numpy(np.int64) - grid.min_x
+    layer[rows[given], cols[given]] = values.astype(np.int16)
+    return layer
+
+
+def dijkstra_search(area_data, start, goals, cost_layer):
+    """칸마다 비용이 다른 격자에서 Dial(버킷) 큐로 가장 싼 목표까지의 경로를 찾는 함수
+
+    비용이 1 ~ MAX_COST 의 작은 정수이므로 힙 대신 비용 값으로 인덱싱하는
+    원형 버킷 큐를 쓴다. (경로 또는 None, 총비용 또는 None, 통계)를 돌려준다.
+    """
+    grid = as_grid_map(area_data)
+    stats = SearchStats()
+    if not grid.in_bounds(*start):
+        return None, None, stats
+
+    start_cell = grid.cell_id(*start)
+    targets = goal_cells(grid, goals)
+    stats.visited = 1
+    if start_cell in targets:
+        return [tuple(start)], 0, stats
+
+    cost = bytearray(np.ascontiguousarray(cost_layer, dtype=np.uint8).tobytes())
+    # 목표가 막힌 칸이면 도달할 수 없다
+    targets = {cell for cell in targets if cost[cell] != BLOCKED}
+    if not targets:
+        return None, None, stats
+
+    width, height, size = grid.width, grid.height, grid.size
+    # 큰 격자에서는 총비용이 int32 를 넘을 수 있어 64비트 배열을 쓴다
+    unreached = size * MAX_COST + 1
+    dist = array('q', [unreached]) * size
+    parent = array('i', [NO_PARENT]) * size
+    done = bytearray(size)
+    dist[start_cell] = 0
+
+    # 원형 버킷: 현재 거리 d 에서 꺼낸 칸의 이웃은 d + 1 ~ d + MAX_COST 에만 들어간다
+    slots = max(cost) + 1
+    buckets = [[] for _ in range(slots)]
+    buckets[0].append(start_cell)
+    pending = 1
+    current = 0
+
+    while pending:
+        bucket = buckets[current % slots]
+        while not bucket:
+            current += 1
+            bucket = buckets[current % slots]
+        cell = bucket.pop()
+        pending -= 1
+        if done[cell] or dist[cell] != current:
+            continue
+        done[cell] = 1
+        stats.expanded += 1
+        if cell in targets:
+            return reconstruct_path(grid, parent, cell), current, stats
+
+        row, col = divmod(cell, width)
+        # 기존 BFS 와 같은 이웃 순서: (0, 1), (0, -1), (1, 0), (-1, 0)
+        for nxt, inside in ((cell + width, row + 1 < height), (cell - width, row > 0),
+                            (cell + 1, col + 1 < width), (cell - 1, col > 0)):
+            if not inside or done[nxt]:
+                continue
+            step = cost[nxt]
+            if step == BLOCKED:
+                continue
+            next_dist = current + step
+            if next_dist < dist[nxt]:
+                if dist[nxt] == unreached:
+                    stats.visited += 1
+                dist[nxt] = next_dist
+                parent[nxt] = cell
+                buckets[next_dist % slots].append(nxt)
+                pending += 1
+        if pending > stats.frontier_peak:
+            stats.frontier_peak = pending
+
+    return None, None, stats
+
+
+def path_cost(path, cost_layer, area_data):
+    """경로의 총비용 (출발 칸을 뺀 나머지 칸 비용의 합) 을 계산하는 함수"""
+    grid = as_grid_map(area_data)
+    return sum(int(cost_layer[y - grid.min_y, x - grid.min_x]) for x, y in path[1:])